@@ -0,0 +1,6 @@
+"""
+Benchmark tooling for the BotWave backend.
+
+Run modules from the backend directory, e.g.
+    python -m bench.fake_whatsapp --port 8002
+"""
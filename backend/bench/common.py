@@ -0,0 +1,98 @@
+"""
+Shared helpers for the benchmark scripts: percentile summaries, JSON
+result files and disposable bench users.
+"""
+import json
+import math
+import platform
+import secrets
+import subprocess
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Dict, List, Optional
+
+RESULTS_DIR = Path(__file__).parent / 'results'
+BENCH_EMAIL_DOMAIN = 'bench.invalid'
+BENCH_PASSWORD = 'Bench@Load-2024'
+
+
+def percentile(sorted_values: List[float], p: float) -> Optional[float]:
+    """Nearest-rank percentile of an already sorted list"""
+    if not sorted_values:
+        return None
+    rank = max(1, math.ceil(p / 100 * len(sorted_values)))
+    return sorted_values[rank - 1]
+
+
+def summarize_ms(samples: List[float]) -> Dict[str, Optional[float]]:
+    """count/mean/p50/p95/p99/max of second-resolution samples, in milliseconds"""
+    ordered = sorted(s * 1000 for s in samples)
+    return {
+        'count': len(ordered),
+        'mean_ms': round(sum(ordered) / len(ordered), 3) if ordered else None,
+        'p50_ms': round(percentile(ordered, 50), 3) if ordered else None,
+        'p95_ms': round(percentile(ordered, 95), 3) if ordered else None,
+        'p99_ms': round(percentile(ordered, 99), 3) if ordered else None,
+        'max_ms': round(ordered[-1], 3) if ordered else None,
+    }
+
+
+def git_revision() -> Optional[str]:
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+            cwd=Path(__file__).parent, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def save_results(name: str, results: dict, output: Optional[str] = None) -> Path:
+    """Write results with run metadata to output, or bench/results/<name>-<timestamp>.json"""
+    now = datetime.now(timezone.utc)
+    if output:
+        path = Path(output)
+    else:
+        path = RESULTS_DIR / f'{name}-{now.strftime("%Y%m%dT%H%M%SZ")}.json'
+    path.parent.mkdir(parents=True, exist_ok=True)
+    document = {
+        'benchmark': name,
+        'recorded_at': now.isoformat(),
+        'git_revision': git_revision(),
+        'python': platform.python_version(),
+        'machine': platform.machine(),
+        **results,
+    }
+    path.write_text(json.dumps(document, indent=2, default=str) + '\n')
+    return path
+
+
+async def ensure_bench_users(conn, server, count: int, role: str = 'user', prefix: str = 'bench-user') -> List[dict]:
+    """
+    Create (or refresh) count users named <prefix>-<n>@bench.invalid sharing
+    BENCH_PASSWORD, and return them with a JWT for each.
+    """
+    password_hash = server.hash_password(BENCH_PASSWORD)
+    rows = await conn.fetch(
+        '''INSERT INTO users (email, password_hash, api_key, role, status, rate_limit)
+           SELECT e, $2, k, $3, 'active', 1000000 FROM unnest($1::text[], $4::text[]) AS t(e, k)
+           ON CONFLICT (email) DO UPDATE SET password_hash = EXCLUDED.password_hash, role = EXCLUDED.role, status = 'active'
+           RETURNING id, email, api_key, role''',
+        [f'{prefix}-{n}@{BENCH_EMAIL_DOMAIN}' for n in range(count)], password_hash, role,
+        [f'bench_{secrets.token_hex(16)}' for _ in range(count)]
+    )
+    users = []
+    for row in rows:
+        user_id = str(row['id'])
+        users.append({
+            'id': user_id,
+            'email': row['email'],
+            'api_key': row['api_key'],
+            'token': server.create_access_token(user_id, row['email'], row['role']),
+        })
+    return users
+
+
+async def delete_bench_users(conn) -> int:
+    result = await conn.execute('DELETE FROM users WHERE email LIKE $1', f'%@{BENCH_EMAIL_DOMAIN}')
+    return int(result.split()[-1])
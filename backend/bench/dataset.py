@@ -0,0 +1,280 @@
+"""
+Synthetic dataset generator for scale testing analytics and log queries.
+
+Generates users, message_logs and activity_logs with production-like skew
+and bulk-loads them with COPY (asyncpg copy_records_to_table):
+
+- Heavy senders: per-user volume follows a Zipf distribution, so a few
+  accounts send most messages.
+- Bursty days: weekday/weekend rhythm, gradual growth, and occasional
+  burst days at several times the normal volume.
+- Diurnal traffic, peaking late morning and evening IST.
+- Failure clusters: global outage windows and per-user bad days on top of
+  a low base failure rate.
+- Repeat recipients per user, with a share of international senders.
+
+The same --seed and --end-date always produce the same rows. Afterwards
+the analytics rollups, recipient sketches, message counters and per-user
+totals are rebuilt so the admin pages agree with the raw tables.
+
+Usage (from the backend directory, against a disposable database):
+    DATABASE_URL=postgresql://localhost/botwave_bench python -m bench.dataset \\
+        --users 100000 --messages 5000000 --activity 1000000 --days 180
+
+Synthetic users are named synth-<n>@synth.invalid. --replace deletes
+them, and their logs, before loading.
+"""
+import argparse
+import asyncio
+import itertools
+import math
+import os
+import random
+import time
+import uuid
+from datetime import date, datetime, timedelta, timezone
+from typing import Dict, List
+
+SYNTH_EMAIL_DOMAIN = 'synth.invalid'
+IST_OFFSET_SECONDS = 19800
+
+# Relative traffic per IST hour of day
+HOUR_WEIGHTS = [1, 0.5, 0.3, 0.2, 0.2, 0.4, 1, 2.5, 5, 7, 9, 10, 9.5, 8, 7.5, 7, 7.5, 8.5, 9.5, 9, 7, 5, 3.5, 2]
+# Day-of-week factors, Monday first
+WEEKDAY_FACTORS = [1.05, 1.1, 1.1, 1.05, 1.0, 0.75, 0.55]
+INTERNATIONAL_PREFIXES = ['+1', '+44', '+971', '+966', '+65', '+880', '+92', '+234', '+49']
+
+MESSAGE_TEMPLATES = [
+    'Your OTP is {code}. Do not share it with anyone.',
+    'Order #{order} has been shipped and will arrive in {days} days.',
+    'Hi! Your appointment is confirmed for tomorrow at {hour}:00.',
+    'Payment of Rs. {amount} received. Thank you!',
+    'Reminder: your subscription renews in {days} days.',
+    'Your ticket {order} has been updated. Reply HELP for support.',
+]
+
+ACTIVITY_ACTIONS = [
+    ('USER_LOGIN', 'User logged in', 60),
+    ('WHATSAPP_INITIALIZED', 'Initialized WhatsApp connection', 15),
+    ('WHATSAPP_DISCONNECTED', 'Disconnected WhatsApp', 9),
+    ('API_KEY_REGENERATED', 'User regenerated API key', 6),
+    ('PASSWORD_CHANGED', 'User changed their password', 5),
+    ('USER_UPDATED', 'Profile updated', 5),
+]
+
+MESSAGE_COLUMNS = [
+    'id', 'user_id', 'receiver_number', 'message_body', 'status', 'source', 'region',
+    'service_ms', 'total_ms', 'wa_message_id', 'delivery_ack', 'created_at',
+]
+ACTIVITY_COLUMNS = ['id', 'user_id', 'user_email', 'action', 'details', 'ip_address', 'created_at']
+USER_COLUMNS = ['id', 'email', 'password_hash', 'api_key', 'role', 'status', 'rate_limit', 'created_at']
+
+
+def rng_uuid(rng: random.Random) -> uuid.UUID:
+    return uuid.UUID(int=rng.getrandbits(128), version=4)
+
+
+def zipf_cum_weights(count: int, exponent: float) -> List[float]:
+    return list(itertools.accumulate(1 / (rank + 1) ** exponent for rank in range(count)))
+
+
+class SyntheticUser:
+    __slots__ = ('index', 'id', 'email', 'contacts', 'prefix', 'api_share', 'ip')
+
+    def __init__(self, index: int, rng: random.Random, heavy: bool):
+        self.index = index
+        self.id = rng_uuid(rng)
+        self.email = f'synth-{index}@{SYNTH_EMAIL_DOMAIN}'
+        self.contacts = max(3, int(rng.lognormvariate(math.log(400 if heavy else 30), 0.8)))
+        self.prefix = rng.choice(INTERNATIONAL_PREFIXES) if rng.random() < 0.08 else '+91'
+        self.api_share = 0.95 if heavy else 0.6
+        self.ip = f'10.{rng.randrange(256)}.{rng.randrange(256)}.{rng.randrange(1, 255)}'
+
+    def recipient(self, rng: random.Random) -> str:
+        # Zipf-ish reuse: low contact numbers are messaged far more often
+        contact = min(int(rng.paretovariate(1.2)) - 1, self.contacts - 1)
+        digits = (self.index * 7919 + contact * 104729) % 3_000_000_000 + 6_000_000_000
+        return f'{self.prefix}{digits}'
+
+
+class DatasetGenerator:
+    def __init__(self, args):
+        self.args = args
+        self.rng = random.Random(args.seed)
+        self.end = datetime(args.end_date.year, args.end_date.month, args.end_date.day, tzinfo=timezone.utc)
+        self.start = self.end - timedelta(days=args.days)
+        self.users: List[SyntheticUser] = []
+        # Shuffled ranks decouple sending volume from user index
+        self.sender_order: List[SyntheticUser] = []
+        self.sender_weights: List[float] = []
+        self.outages: List[tuple] = []
+
+    def build_users(self):
+        heavy_count = max(1, self.args.users // 100)
+        ranks = list(range(self.args.users))
+        self.rng.shuffle(ranks)
+        self.users = [SyntheticUser(n, self.rng, ranks[n] < heavy_count) for n in range(self.args.users)]
+        self.sender_order = sorted(self.users, key=lambda u: ranks[u.index])
+        self.sender_weights = zipf_cum_weights(len(self.users), self.args.zipf)
+
+    def user_records(self, password_hash: str):
+        for user in self.users:
+            roll = self.rng.random()
+            status = 'suspended' if roll < 0.04 else 'deactive' if roll < 0.06 else 'active'
+            created_at = self.start - timedelta(seconds=self.rng.uniform(0, 365 * 86400))
+            yield (user.id, user.email, password_hash, f'synth_{self.rng.getrandbits(128):032x}',
+                   'user', status, 30, created_at)
+
+    def daily_volumes(self) -> List[int]:
+        weights = []
+        for day in range(self.args.days):
+            growth = 0.6 + 0.8 * day / max(1, self.args.days - 1)
+            weekday = (self.start + timedelta(days=day)).weekday()
+            burst = self.rng.uniform(3, 8) if self.rng.random() < 0.04 else 1
+            weights.append(growth * WEEKDAY_FACTORS[weekday] * burst * self.rng.uniform(0.85, 1.15))
+        total = sum(weights)
+        return [round(self.args.messages * w / total) for w in weights]
+
+    def build_outages(self):
+        """A few multi-hour windows where most sends fail"""
+        for _ in range(max(1, self.args.days // 30)):
+            begins = self.start + timedelta(seconds=self.rng.uniform(0, self.args.days * 86400))
+            self.outages.append((begins, begins + timedelta(hours=self.rng.uniform(1, 3))))
+
+    def timestamp(self, day_start: datetime) -> datetime:
+        hour = self.rng.choices(range(24), HOUR_WEIGHTS)[0]
+        seconds = hour * 3600 + self.rng.uniform(0, 3600) - IST_OFFSET_SECONDS
+        return day_start + timedelta(seconds=seconds)
+
+    def failure_rate(self, user: SyntheticUser, day: int, created_at: datetime) -> float:
+        for begins, ends in self.outages:
+            if begins <= created_at < ends:
+                return 0.7
+        # Stable per-user bad days, independent of generation order
+        if hash((user.index, day, self.args.seed)) % 100 < 2:
+            return 0.5
+        return 0.03
+
+    def message_body(self) -> str:
+        template = self.rng.choice(MESSAGE_TEMPLATES)
+        return template.format(
+            code=self.rng.randrange(100000, 999999), order=self.rng.randrange(10 ** 6, 10 ** 7),
+            days=self.rng.randrange(1, 8), hour=self.rng.randrange(9, 19), amount=self.rng.randrange(99, 20000)
+        )
+
+    def day_messages(self, server, day: int, count: int, status_counts: Dict[str, int]):
+        day_start = self.start + timedelta(days=day)
+        senders = self.rng.choices(self.sender_order, cum_weights=self.sender_weights, k=count)
+        for user in senders:
+            created_at = self.timestamp(day_start)
+            failed = self.rng.random() < self.failure_rate(user, day, created_at)
+            status = 'failed' if failed else 'sent'
+            source = 'api' if self.rng.random() < user.api_share else 'web'
+            number = user.recipient(self.rng)
+            if failed and self.rng.random() < 0.4:
+                service_ms = None
+            else:
+                service_ms = int(self.rng.lognormvariate(math.log(180), 0.5))
+            total_ms = (service_ms or 0) + int(self.rng.lognormvariate(math.log(15), 0.6))
+            ack = None
+            wa_message_id = None
+            if not failed:
+                wa_message_id = f'{self.rng.getrandbits(80):020X}'
+                roll = self.rng.random()
+                ack = 3 if roll < 0.6 else 2 if roll < 0.9 else 1
+
+            user_id = str(user.id)
+            utc_day = created_at.date()
+            server.record_recipient(user_id, utc_day, number)
+            for metric, ms in (('service', service_ms), ('total', total_ms)):
+                if ms is not None:
+                    server.latency_rollup.add((user_id, utc_day, source, metric, server.latency_bucket(ms)))
+            status_counts[status] = status_counts.get(status, 0) + 1
+            yield (rng_uuid(self.rng), user.id, number, self.message_body(), status, source,
+                   server.classify_number(number), service_ms, total_ms, wa_message_id, ack, created_at)
+
+    def activity_records(self):
+        actions = [a for a, _, _ in ACTIVITY_ACTIONS]
+        details = {a: d for a, d, _ in ACTIVITY_ACTIONS}
+        weights = [w for _, _, w in ACTIVITY_ACTIONS]
+        # Activity is skewed too, but less than sending
+        cum_weights = zipf_cum_weights(len(self.users), self.args.zipf * 0.7)
+        for _ in range(self.args.activity):
+            user = self.rng.choices(self.sender_order, cum_weights=cum_weights)[0]
+            action = self.rng.choices(actions, weights)[0]
+            day_start = self.start + timedelta(days=self.rng.randrange(self.args.days))
+            yield (rng_uuid(self.rng), user.id, user.email, action, details[action], user.ip, self.timestamp(day_start))
+
+
+async def copy_chunks(conn, table: str, columns: List[str], records, chunk_size: int) -> int:
+    total = 0
+    while True:
+        chunk = list(itertools.islice(records, chunk_size))
+        if not chunk:
+            return total
+        await conn.copy_records_to_table(table, records=chunk, columns=columns)
+        total += len(chunk)
+
+
+async def run(args):
+    import server
+
+    started = time.perf_counter()
+    generator = DatasetGenerator(args)
+    generator.build_users()
+    generator.build_outages()
+    await server.migrate_schema()
+    pool = await server.get_db_pool()
+
+    async with pool.acquire() as conn:
+        if args.replace:
+            await conn.execute('DELETE FROM activity_logs WHERE user_email LIKE $1', f'%@{SYNTH_EMAIL_DOMAIN}')
+            deleted = await conn.execute('DELETE FROM users WHERE email LIKE $1', f'%@{SYNTH_EMAIL_DOMAIN}')
+            print(f'Removed {deleted.split()[-1]} previous synthetic users')
+        loaded = await copy_chunks(conn, 'users', USER_COLUMNS,
+                                   generator.user_records(server.hash_password('Synth@Data-2024')), args.chunk_size)
+        print(f'users: {loaded} rows ({time.perf_counter() - started:.1f}s)')
+
+        status_counts: Dict[str, int] = {}
+        loaded = 0
+        for day, count in enumerate(generator.daily_volumes()):
+            loaded += await copy_chunks(conn, 'message_logs', MESSAGE_COLUMNS,
+                                        generator.day_messages(server, day, count, status_counts), args.chunk_size)
+            # Sketches and latency rollups are flushed per day to bound memory
+            await server.flush_message_stats()
+            if day % 10 == 9 or day == args.days - 1:
+                print(f'message_logs: {loaded} rows through day {day + 1}/{args.days} ({time.perf_counter() - started:.1f}s)')
+
+        loaded = await copy_chunks(conn, 'activity_logs', ACTIVITY_COLUMNS, generator.activity_records(), args.chunk_size)
+        print(f'activity_logs: {loaded} rows ({time.perf_counter() - started:.1f}s)')
+
+        await conn.execute('ANALYZE users; ANALYZE message_logs; ANALYZE activity_logs')
+
+    await server.rebuild_message_stats(generator.start.date(), until=generator.end.date())
+    async with pool.acquire() as conn:
+        await conn.execute('DELETE FROM message_counters')
+    await server.seed_message_counters()
+    await server.close_db_pool()
+    print(f'Done in {time.perf_counter() - started:.1f}s: {status_counts}')
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Generate and bulk-load a synthetic dataset')
+    parser.add_argument('--users', type=int, default=100_000)
+    parser.add_argument('--messages', type=int, default=5_000_000)
+    parser.add_argument('--activity', type=int, default=1_000_000)
+    parser.add_argument('--days', type=int, default=180, help='Days of history ending at --end-date')
+    parser.add_argument('--end-date', type=date.fromisoformat, default=datetime.now(timezone.utc).date() + timedelta(days=1),
+                        help='Exclusive end of the generated range (YYYY-MM-DD); pin it to reproduce a dataset exactly')
+    parser.add_argument('--zipf', type=float, default=1.1, help='Sender skew exponent; higher is more concentrated')
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--chunk-size', type=int, default=50_000)
+    parser.add_argument('--replace', action='store_true', help='Delete previously generated synthetic users first')
+    args = parser.parse_args()
+    if not os.environ.get('DATABASE_URL'):
+        parser.error('DATABASE_URL must point at a disposable local Postgres')
+    asyncio.run(run(args))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,478 @@
+"""
+Fake whatsapp-service for load testing the backend without browsers.
+
+Implements the endpoints the backend calls (/send, /status, /qr,
+/initialize, /disconnect, /health, /admin/sessions, /sessions/export,
+/sessions/import) with the same response shapes as whatsapp-service/index.js,
+and posts qr_code, whatsapp_connected, whatsapp_disconnected and message_ack
+events back to the backend's internal event endpoint. Latency, error rates and
+initial session states are configurable.
+
+The service contract is followed where the backend depends on it: with
+--internal-secret every route requires X-Internal-Secret; /disconnect with
+keepAuth drains in-flight sends and keeps the login, which /initialize with
+resume (or an import) restores without a QR code, so hibernation and wake-up
+are exercised; /sessions/export and /sessions/import move a saved login
+between fakes, for rebalance runs. Saved logins are an in-memory phone number,
+not LocalAuth data.
+
+Usage (from the backend directory):
+    python -m bench.fake_whatsapp --port 8002 \\
+        --latency send=lognormal:150:0.4 --latency initialize=uniform:500:2000 \\
+        --error-rate send=0.02 --connected-fraction 0.8 \\
+        --backend-url http://127.0.0.1:8001
+
+Latency specs are fixed:MS, uniform:LO:HI, lognormal:MEDIAN:SIGMA or
+exponential:MEAN, all in milliseconds.
+"""
+import argparse
+import asyncio
+import gzip
+import hashlib
+import hmac
+import json
+import math
+import os
+import random
+import time
+import uuid
+from typing import Callable, Dict, List, Optional
+
+from aiohttp import ClientSession, ClientTimeout, web
+
+ENDPOINTS = ['send', 'status', 'qr', 'initialize', 'disconnect', 'health', 'sessions', 'export', 'import']
+# Longest a keepAuth disconnect or an export waits for in-flight sends, as in index.js
+DRAIN_TIMEOUT = 30
+SESSION_STATES = ['connected', 'disconnected', 'qr_ready']
+
+
+def parse_latency(spec: str, rng: random.Random) -> Callable[[], float]:
+    """Sampler returning seconds for a distribution spec such as 'lognormal:150:0.4'"""
+    kind, *params = spec.split(':')
+    values = [float(p) for p in params]
+    if kind == 'fixed':
+        return lambda: values[0] / 1000
+    if kind == 'uniform':
+        return lambda: rng.uniform(values[0], values[1]) / 1000
+    if kind == 'lognormal':
+        mu = math.log(values[0])
+        return lambda: rng.lognormvariate(mu, values[1]) / 1000
+    if kind == 'exponential':
+        return lambda: rng.expovariate(1 / values[0]) / 1000
+    raise ValueError(f'Unknown latency distribution: {kind}')
+
+
+def parse_assignments(items: List[str], cast) -> Dict[str, object]:
+    parsed = {}
+    for item in items:
+        endpoint, _, value = item.partition('=')
+        if endpoint not in ENDPOINTS:
+            raise ValueError(f'Unknown endpoint {endpoint!r}, expected one of {", ".join(ENDPOINTS)}')
+        parsed[endpoint] = cast(value)
+    return parsed
+
+
+def fake_phone_number(rng: random.Random) -> str:
+    return f'91{rng.randint(7000000000, 9999999999)}'
+
+
+class FakeSession:
+    def __init__(self, status: str, rng: random.Random):
+        self.status = status
+        self.qr_code: Optional[str] = f'fake-qr-{uuid.uuid4().hex}' if status == 'qr_ready' else None
+        self.phone_number: Optional[str] = fake_phone_number(rng) if status == 'connected' else None
+        self.inflight = 0
+        self.draining = False
+
+    @property
+    def connected(self) -> bool:
+        return self.status == 'connected'
+
+
+class FakeWhatsAppService:
+    """In-memory per-user sessions with simulated latency, failures and event callbacks"""
+
+    def __init__(
+        self,
+        latency: Dict[str, str],
+        error_rates: Dict[str, float],
+        connected_fraction: float = 1.0,
+        sessions: Optional[Dict[str, str]] = None,
+        backend_url: str = '',
+        internal_secret: str = '',
+        qr_delay: float = 1.0,
+        connect_delay: Optional[float] = None,
+        acks: bool = False,
+        seed: int = 0,
+    ):
+        self.rng = random.Random(seed)
+        self.latency = {endpoint: parse_latency(spec, self.rng) for endpoint, spec in latency.items()}
+        self.error_rates = error_rates
+        self.connected_fraction = connected_fraction
+        self.initial_states = sessions or {}
+        self.backend_url = backend_url.rstrip('/')
+        self.internal_secret = internal_secret
+        self.qr_delay = qr_delay
+        self.connect_delay = connect_delay
+        self.acks = acks
+        self.sessions: Dict[str, FakeSession] = {}
+        # user_id -> phone number of a login kept by a keepAuth disconnect or an import
+        self.saved_logins: Dict[str, Optional[str]] = {}
+        self.pending_events: List[dict] = []
+        self.flush_task: Optional[asyncio.Task] = None
+        self.tasks: set = set()
+        self.http: Optional[ClientSession] = None
+        self.started = time.time()
+        self.counts: Dict[str, int] = {endpoint: 0 for endpoint in ENDPOINTS}
+
+    def session_for(self, user_id: str) -> Optional[FakeSession]:
+        """Existing session, or the user's configured initial state on first sight"""
+        session = self.sessions.get(user_id)
+        if session is None:
+            state = self.initial_states.get(user_id)
+            if state is None:
+                # Stable per-user split so repeated runs see the same connected set
+                bucket = int(hashlib.md5(user_id.encode()).hexdigest()[:8], 16) / 0xFFFFFFFF
+                state = 'connected' if bucket < self.connected_fraction else 'disconnected'
+            if state == 'disconnected':
+                return None
+            session = self.sessions[user_id] = FakeSession(state, self.rng)
+        return session
+
+    async def simulate(self, endpoint: str) -> Optional[web.Response]:
+        """Sleep for the endpoint's latency and return an error response if it should fail"""
+        self.counts[endpoint] += 1
+        sampler = self.latency.get(endpoint)
+        if sampler:
+            await asyncio.sleep(sampler())
+        if self.rng.random() < self.error_rates.get(endpoint, 0):
+            return web.json_response({'success': False, 'error': 'Simulated failure'}, status=500)
+        return None
+
+    def spawn(self, coro):
+        task = asyncio.create_task(coro)
+        self.tasks.add(task)
+        task.add_done_callback(self.tasks.discard)
+
+    # ---- event callbacks, batched like emitToBackend ----
+
+    def emit(self, user_id: str, event: str, data: dict):
+        if not self.backend_url:
+            return
+        self.pending_events.append({'event': event, 'userId': user_id, 'data': data})
+        if self.flush_task is None or self.flush_task.done():
+            self.flush_task = asyncio.create_task(self.flush_events())
+
+    async def flush_events(self):
+        await asyncio.sleep(0.02)
+        while self.pending_events:
+            events, self.pending_events = self.pending_events, []
+            try:
+                async with self.http.post(
+                    f'{self.backend_url}/api/internal/ws-events', json=events,
+                    headers={'X-Internal-Secret': self.internal_secret}
+                ) as response:
+                    if response.status != 200:
+                        print(f'Backend rejected {len(events)} event(s): HTTP {response.status}')
+            except Exception as e:
+                print(f'Failed to send {len(events)} event(s) to backend: {e}')
+
+    async def run_login(self, user_id: str, session: FakeSession):
+        await asyncio.sleep(self.qr_delay)
+        if self.sessions.get(user_id) is not session:
+            return
+        session.status = 'qr_ready'
+        session.qr_code = f'fake-qr-{uuid.uuid4().hex}'
+        self.emit(user_id, 'qr_code', {'qr': session.qr_code, 'status': 'qr_ready'})
+        if self.connect_delay is None:
+            return
+        await asyncio.sleep(self.connect_delay)
+        if self.sessions.get(user_id) is not session:
+            return
+        session.status = 'connected'
+        session.qr_code = None
+        session.phone_number = fake_phone_number(self.rng)
+        self.emit(user_id, 'whatsapp_connected', {'status': 'connected', 'phoneNumber': session.phone_number})
+
+    async def run_resume(self, user_id: str, session: FakeSession, phone_number: Optional[str]):
+        """A saved login connects without a QR code once the browser has started"""
+        await asyncio.sleep(self.qr_delay)
+        if self.sessions.get(user_id) is not session:
+            return
+        session.status = 'connected'
+        session.phone_number = phone_number or fake_phone_number(self.rng)
+        self.emit(user_id, 'whatsapp_connected', {'status': 'connected', 'phoneNumber': session.phone_number})
+
+    def start_session(self, user_id: str, resume: bool) -> FakeSession:
+        session = self.sessions[user_id] = FakeSession('initializing', self.rng)
+        if resume and user_id in self.saved_logins:
+            self.spawn(self.run_resume(user_id, session, self.saved_logins[user_id]))
+        else:
+            # Like index.js, a fresh start discards any saved login
+            self.saved_logins.pop(user_id, None)
+            self.spawn(self.run_login(user_id, session))
+        return session
+
+    async def drain(self, session: FakeSession):
+        session.draining = True
+        deadline = time.monotonic() + DRAIN_TIMEOUT
+        while session.inflight > 0 and time.monotonic() < deadline:
+            await asyncio.sleep(0.1)
+
+    async def run_acks(self, user_id: str, message_id: str):
+        for ack in (1, 2, 3):
+            await asyncio.sleep(self.rng.uniform(0.05, 0.5) * ack)
+            self.emit(user_id, 'message_ack', {'messageId': message_id, 'ack': ack})
+
+    # ---- HTTP handlers ----
+
+    @web.middleware
+    async def require_internal_secret(self, request, handler):
+        if self.internal_secret and not hmac.compare_digest(
+            request.headers.get('X-Internal-Secret', ''), self.internal_secret
+        ):
+            return web.json_response({'error': 'Invalid internal secret'}, status=401)
+        return await handler(request)
+
+    async def health(self, request):
+        failure = await self.simulate('health')
+        if failure:
+            return failure
+        return web.json_response({
+            'status': 'ok',
+            'mode': 'fake',
+            'activeSessions': sum(1 for s in self.sessions.values() if s.connected),
+            'uptime': time.time() - self.started
+        })
+
+    async def status(self, request):
+        failure = await self.simulate('status')
+        if failure:
+            return failure
+        user_id = request.query.get('userId')
+        session = self.session_for(user_id) if user_id else None
+        if session is None:
+            return web.json_response({'status': 'disconnected', 'connected': False, 'qrAvailable': False, 'phoneNumber': None})
+        return web.json_response({
+            'status': session.status,
+            'connected': session.connected,
+            'qrAvailable': session.qr_code is not None,
+            'phoneNumber': session.phone_number
+        })
+
+    async def qr(self, request):
+        failure = await self.simulate('qr')
+        if failure:
+            return failure
+        user_id = request.query.get('userId')
+        if not user_id:
+            return web.json_response({'error': 'userId is required'}, status=400)
+        session = self.session_for(user_id)
+        if session and session.qr_code:
+            return web.json_response({'qr': session.qr_code, 'status': session.status})
+        return web.json_response({'error': 'QR code not available'}, status=404)
+
+    async def initialize(self, request):
+        failure = await self.simulate('initialize')
+        if failure:
+            return failure
+        body = await request.json()
+        user_id = body.get('userId')
+        if not user_id:
+            return web.json_response({'error': 'userId is required'}, status=400)
+        session = self.session_for(user_id)
+        if session and session.connected:
+            return web.json_response({'success': True, 'status': 'already_connected', 'phoneNumber': session.phone_number})
+        if session and session.status in ('qr_ready', 'initializing'):
+            return web.json_response({'success': True, 'status': session.status})
+        self.start_session(user_id, bool(body.get('resume')))
+        return web.json_response({'success': True, 'status': 'initializing'})
+
+    async def disconnect(self, request):
+        failure = await self.simulate('disconnect')
+        if failure:
+            return failure
+        body = await request.json()
+        user_id = body.get('userId')
+        if not user_id:
+            return web.json_response({'error': 'userId is required'}, status=400)
+        self.initial_states[user_id] = 'disconnected'
+        session = self.sessions.get(user_id)
+        if session is None:
+            return web.json_response({'success': True, 'message': 'No session to disconnect'})
+        if body.get('keepAuth'):
+            # Hibernation: in-flight sends finish, the browser stops, the login is kept
+            await self.drain(session)
+            if self.sessions.get(user_id) is session:
+                del self.sessions[user_id]
+            if session.connected:
+                self.saved_logins[user_id] = session.phone_number
+            return web.json_response({'success': True, 'message': 'Session stopped, auth data kept'})
+        del self.sessions[user_id]
+        self.saved_logins.pop(user_id, None)
+        self.emit(user_id, 'whatsapp_disconnected', {'status': 'disconnected', 'reason': 'logout'})
+        return web.json_response({'success': True, 'message': 'Disconnected successfully'})
+
+    async def send(self, request):
+        body = await request.json()
+        user_id, number, message = body.get('userId'), body.get('number'), body.get('message')
+        if not user_id:
+            return web.json_response({'error': 'userId is required'}, status=400)
+        if not number or not message:
+            return web.json_response({'error': 'number and message are required'}, status=400)
+        session = self.session_for(user_id)
+        if session is None or not session.connected:
+            return web.json_response({'error': 'WhatsApp not connected. Please scan QR code first.'}, status=400)
+        if session.draining:
+            return web.json_response({'success': False, 'error': 'Session is being moved, please retry'}, status=503)
+        # In flight for its simulated latency, which a draining disconnect or export waits out
+        session.inflight += 1
+        try:
+            failure = await self.simulate('send')
+        finally:
+            session.inflight -= 1
+        if failure:
+            return failure
+        message_id = uuid.uuid4().hex.upper()[:20]
+        if self.acks:
+            self.spawn(self.run_acks(user_id, message_id))
+        return web.json_response({
+            'success': True,
+            'to': number,
+            'message': 'Message sent successfully',
+            'data': {'id': message_id, 'timestamp': int(time.time())}
+        })
+
+    async def admin_sessions(self, request):
+        failure = await self.simulate('sessions')
+        if failure:
+            return failure
+        sessions = [
+            {'odlUserId': user_id, 'userId': user_id, 'status': s.status, 'connected': s.connected, 'phoneNumber': s.phone_number}
+            for user_id, s in self.sessions.items()
+        ]
+        return web.json_response({'sessions': sessions, 'total': len(sessions)})
+
+    async def export_session(self, request):
+        failure = await self.simulate('export')
+        if failure:
+            return failure
+        user_id = (await request.json()).get('userId')
+        if not user_id:
+            return web.json_response({'error': 'userId is required'}, status=400)
+        session = self.sessions.get(user_id)
+        if session is not None:
+            await self.drain(session)
+            if self.sessions.get(user_id) is session:
+                del self.sessions[user_id]
+            if session.connected:
+                self.saved_logins[user_id] = session.phone_number
+        if user_id not in self.saved_logins:
+            return web.json_response({'error': 'No saved session'}, status=404)
+        archive = gzip.compress(json.dumps({'userId': user_id, 'phoneNumber': self.saved_logins.pop(user_id)}).encode())
+        return web.Response(body=archive, content_type='application/gzip')
+
+    async def import_session(self, request):
+        failure = await self.simulate('import')
+        if failure:
+            return failure
+        user_id = request.query.get('userId')
+        archive = await request.read()
+        if not user_id or not archive:
+            return web.json_response({'error': 'userId and a session archive are required'}, status=400)
+        if user_id in self.sessions:
+            return web.json_response({'error': 'User already has a session on this node'}, status=409)
+        try:
+            saved = json.loads(gzip.decompress(archive))
+        except (OSError, ValueError) as e:
+            return web.json_response({'success': False, 'error': str(e)}, status=500)
+        self.saved_logins[user_id] = saved.get('phoneNumber')
+        if request.query.get('start') == 'false':
+            return web.json_response({'success': True, 'status': 'hibernated'})
+        session = self.start_session(user_id, resume=True)
+        # Like index.js, answer once the restored session is up
+        deadline = time.monotonic() + 60
+        while session.status == 'initializing' and time.monotonic() < deadline:
+            await asyncio.sleep(0.05)
+        return web.json_response({'success': True, 'status': session.status})
+
+    # ---- app lifecycle ----
+
+    async def on_startup(self, app):
+        self.http = ClientSession(timeout=ClientTimeout(total=5))
+
+    async def on_cleanup(self, app):
+        for task in list(self.tasks):
+            task.cancel()
+        await self.http.close()
+
+    def create_app(self) -> web.Application:
+        app = web.Application(middlewares=[self.require_internal_secret], client_max_size=1024 ** 3)
+        app.router.add_get('/health', self.health)
+        app.router.add_get('/status', self.status)
+        app.router.add_get('/qr', self.qr)
+        app.router.add_post('/initialize', self.initialize)
+        app.router.add_post('/disconnect', self.disconnect)
+        app.router.add_post('/send', self.send)
+        app.router.add_get('/admin/sessions', self.admin_sessions)
+        app.router.add_post('/sessions/export', self.export_session)
+        app.router.add_post('/sessions/import', self.import_session)
+        app.on_startup.append(self.on_startup)
+        app.on_cleanup.append(self.on_cleanup)
+        return app
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(description='Fake whatsapp-service for backend load tests')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8002)
+    parser.add_argument('--latency', action='append', default=[], metavar='ENDPOINT=SPEC',
+                        help='Latency distribution per endpoint, e.g. send=lognormal:150:0.4')
+    parser.add_argument('--error-rate', action='append', default=[], metavar='ENDPOINT=RATE',
+                        help='Fraction of requests answered with HTTP 500, e.g. send=0.02')
+    parser.add_argument('--connected-fraction', type=float, default=1.0,
+                        help='Share of unknown users that start connected; the rest start disconnected')
+    parser.add_argument('--sessions', help='JSON file mapping userId to connected, disconnected or qr_ready')
+    parser.add_argument('--backend-url', default=os.environ.get('BACKEND_URL', ''),
+                        help='Backend to post events to; events are dropped when empty')
+    parser.add_argument('--internal-secret', default=os.environ.get('INTERNAL_EVENT_SECRET', ''),
+                        help='Sent with events and required on every route, like index.js')
+    parser.add_argument('--qr-delay', type=float, default=1.0, help='Seconds from initialize to the first QR code')
+    parser.add_argument('--connect-delay', type=float, default=None,
+                        help='Seconds from QR code to a simulated scan; never connects when omitted')
+    parser.add_argument('--acks', action='store_true', help='Emit server, delivered and read acks after each send')
+    parser.add_argument('--seed', type=int, default=0)
+    return parser
+
+
+def service_from_args(args) -> FakeWhatsAppService:
+    sessions = {}
+    if args.sessions:
+        with open(args.sessions) as f:
+            sessions = json.load(f)
+        unknown = set(sessions.values()) - set(SESSION_STATES)
+        if unknown:
+            raise ValueError(f'Unknown session states: {", ".join(sorted(unknown))}')
+    return FakeWhatsAppService(
+        latency=parse_assignments(args.latency, str),
+        error_rates=parse_assignments(args.error_rate, float),
+        connected_fraction=args.connected_fraction,
+        sessions=sessions,
+        backend_url=args.backend_url,
+        internal_secret=args.internal_secret,
+        qr_delay=args.qr_delay,
+        connect_delay=args.connect_delay,
+        acks=args.acks,
+        seed=args.seed,
+    )
+
+
+def main():
+    args = build_parser().parse_args()
+    service = service_from_args(args)
+    print(f'Fake whatsapp-service listening on http://{args.host}:{args.port}')
+    web.run_app(service.create_app(), host=args.host, port=args.port, print=None)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,283 @@
+"""
+Socket.IO fan-out benchmark.
+
+For each client count, this starts a fresh uvicorn worker serving
+server:socket_app and connects N python-socketio clients over websockets.
+Each client authenticates with a real JWT, and events are then pushed
+through POST /api/internal/ws-event. It measures:
+
+- connect + authenticate time per client
+- server memory (RSS) per connected client
+- event delivery latency from the HTTP push to the client handler
+- churn cost, the time to drop and re-establish a share of the clients,
+  and the memory left behind afterwards
+
+Usage (from the backend directory, against a disposable database):
+    DATABASE_URL=postgresql://localhost/botwave_bench python -m bench.fanout \\
+        --clients 1000,5000,10000 --events 500
+
+Clients run in this process. At 10k clients the open-file limit must
+allow about twice that many descriptors; the script raises its soft limit
+to the hard limit, and the server inherits it.
+"""
+import argparse
+import asyncio
+import os
+import random
+import resource
+import subprocess
+import sys
+import time
+import uuid
+from pathlib import Path
+from typing import Dict, List, Optional
+
+import aiohttp
+import jwt
+import socketio
+
+from bench.common import save_results, summarize_ms
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+
+
+def server_rss_bytes(pid: int) -> int:
+    with open(f'/proc/{pid}/status') as f:
+        for line in f:
+            if line.startswith('VmRSS:'):
+                return int(line.split()[1]) * 1024
+    return 0
+
+
+def raise_file_limit():
+    soft, hard = resource.getrlimit(resource.RLIMIT_NOFILE)
+    if soft < hard:
+        resource.setrlimit(resource.RLIMIT_NOFILE, (hard, hard))
+    return resource.getrlimit(resource.RLIMIT_NOFILE)[0]
+
+
+class BenchServer:
+    """One uvicorn worker running the backend in a subprocess"""
+
+    def __init__(self, port: int, log_path: Optional[str]):
+        self.port = port
+        self.log_path = log_path
+        self.process: Optional[subprocess.Popen] = None
+        self.url = f'http://127.0.0.1:{port}'
+
+    async def start(self, http: aiohttp.ClientSession):
+        log = open(self.log_path, 'ab') if self.log_path else subprocess.DEVNULL
+        self.process = subprocess.Popen(
+            [sys.executable, '-m', 'uvicorn', 'server:socket_app', '--host', '127.0.0.1',
+             '--port', str(self.port), '--workers', '1', '--log-level', 'warning'],
+            cwd=BACKEND_DIR, stdout=log, stderr=log,
+        )
+        deadline = time.monotonic() + 60
+        while time.monotonic() < deadline:
+            if self.process.poll() is not None:
+                raise RuntimeError(f'Backend exited with status {self.process.returncode}')
+            try:
+                async with http.get(f'{self.url}/api/health/live') as response:
+                    if response.status == 200:
+                        return
+            except aiohttp.ClientError:
+                pass
+            await asyncio.sleep(0.25)
+        raise RuntimeError('Backend did not become live within 60s')
+
+    def rss(self) -> int:
+        return server_rss_bytes(self.process.pid)
+
+    def stop(self):
+        if self.process and self.process.poll() is None:
+            self.process.terminate()
+            try:
+                self.process.wait(timeout=15)
+            except subprocess.TimeoutExpired:
+                self.process.kill()
+
+
+class BenchClient:
+    """A Socket.IO client authenticated as one user, recording event arrival times"""
+
+    def __init__(self, user_id: str, token: str, arrivals: Dict[str, float]):
+        self.user_id = user_id
+        self.token = token
+        self.arrivals = arrivals
+        self.authenticated = asyncio.Event()
+        self.new_socket()
+
+    def new_socket(self):
+        self.sio = socketio.AsyncClient(reconnection=False)
+        self.sio.on('authenticated', self.on_authenticated)
+        self.sio.on('bench_event', self.on_bench_event)
+
+    async def on_authenticated(self, data):
+        self.authenticated.set()
+
+    async def on_bench_event(self, data):
+        self.arrivals.setdefault(data['id'], time.perf_counter())
+
+    async def connect(self, url: str, timeout: float):
+        self.authenticated.clear()
+        await self.sio.connect(url, socketio_path='/api/socket.io', transports=['websocket'], wait_timeout=timeout)
+        await self.sio.emit('authenticate', {'token': self.token})
+        await asyncio.wait_for(self.authenticated.wait(), timeout)
+
+    async def disconnect(self):
+        await self.sio.disconnect()
+
+
+async def connect_all(clients: List[BenchClient], url: str, parallel: int, timeout: float) -> dict:
+    """Connect and authenticate clients, at most parallel handshakes at a time"""
+    semaphore = asyncio.Semaphore(parallel)
+    durations: List[float] = []
+    failures = 0
+
+    async def connect(client: BenchClient):
+        nonlocal failures
+        async with semaphore:
+            started = time.perf_counter()
+            try:
+                await client.connect(url, timeout)
+                durations.append(time.perf_counter() - started)
+            except Exception:
+                failures += 1
+
+    started = time.perf_counter()
+    await asyncio.gather(*(connect(client) for client in clients))
+    return {'elapsed_s': round(time.perf_counter() - started, 3), 'failures': failures, 'per_client': summarize_ms(durations)}
+
+
+async def push_events(http: aiohttp.ClientSession, url: str, secret: str, user_ids: List[str], count: int,
+                      parallel: int, arrivals: Dict[str, float], rng: random.Random) -> dict:
+    """POST count events to random users and measure push-to-handler latency"""
+    semaphore = asyncio.Semaphore(parallel)
+    sent_at: Dict[str, float] = {}
+    errors = 0
+
+    async def push():
+        nonlocal errors
+        event_id = uuid.uuid4().hex
+        body = {'event': 'bench_event', 'userId': rng.choice(user_ids), 'data': {'id': event_id}}
+        async with semaphore:
+            sent_at[event_id] = time.perf_counter()
+            try:
+                async with http.post(f'{url}/api/internal/ws-event', json=body, headers={'X-Internal-Secret': secret}) as response:
+                    if response.status != 200:
+                        errors += 1
+            except aiohttp.ClientError:
+                errors += 1
+
+    await asyncio.gather(*(push() for _ in range(count)))
+    # Allow stragglers to arrive
+    deadline = time.perf_counter() + 5
+    while len(arrivals) < count - errors and time.perf_counter() < deadline:
+        await asyncio.sleep(0.05)
+    latencies = [arrivals[event_id] - sent for event_id, sent in sent_at.items() if event_id in arrivals]
+    return {'sent': count, 'push_errors': errors, 'delivered': len(latencies), 'latency': summarize_ms(latencies)}
+
+
+async def run_level(args, count: int, secret: str, jwt_secret: str) -> dict:
+    rng = random.Random(args.seed)
+    arrivals: Dict[str, float] = {}
+    user_ids = [str(uuid.UUID(int=rng.getrandbits(128), version=4)) for _ in range(max(1, count // args.clients_per_user))]
+    clients = []
+    for n in range(count):
+        user_id = user_ids[n % len(user_ids)]
+        token = jwt.encode({'sub': user_id, 'email': f'fanout-{n}@bench.invalid', 'role': 'user',
+                            'exp': int(time.time()) + 3600}, jwt_secret, algorithm='HS256')
+        clients.append(BenchClient(user_id, token, arrivals))
+
+    bench_server = BenchServer(args.port, args.server_log)
+    async with aiohttp.ClientSession(timeout=aiohttp.ClientTimeout(total=30)) as http:
+        await bench_server.start(http)
+        try:
+            await asyncio.sleep(1)
+            rss_idle = bench_server.rss()
+
+            connect = await connect_all(clients, bench_server.url, args.parallel, args.timeout)
+            connected = [c for c in clients if c.authenticated.is_set()]
+            await asyncio.sleep(1)
+            rss_connected = bench_server.rss()
+
+            delivery = await push_events(http, bench_server.url, secret, user_ids, args.events, args.parallel, arrivals, rng)
+
+            # Churn: drop a share of the clients and bring them straight back
+            churned = rng.sample(connected, int(len(connected) * args.churn))
+            started = time.perf_counter()
+            await asyncio.gather(*(c.disconnect() for c in churned))
+            disconnect_s = time.perf_counter() - started
+            for client in churned:
+                client.new_socket()
+            reconnect = await connect_all(churned, bench_server.url, args.parallel, args.timeout)
+            await asyncio.sleep(1)
+            rss_after_churn = bench_server.rss()
+
+            await asyncio.gather(*(c.disconnect() for c in clients if c.sio.connected), return_exceptions=True)
+            await asyncio.sleep(2)
+            rss_disconnected = bench_server.rss()
+        finally:
+            bench_server.stop()
+
+    result = {
+        'clients': count,
+        'users': len(user_ids),
+        'connect': connect,
+        'connected': len(connected),
+        'memory': {
+            'rss_idle_bytes': rss_idle,
+            'rss_connected_bytes': rss_connected,
+            'bytes_per_connection': round((rss_connected - rss_idle) / len(connected)) if connected else None,
+            'rss_after_churn_bytes': rss_after_churn,
+            'rss_disconnected_bytes': rss_disconnected,
+        },
+        'delivery': delivery,
+        'churn': {
+            'clients': len(churned),
+            'disconnect_s': round(disconnect_s, 3),
+            'reconnect': reconnect,
+            'per_client_ms': round((disconnect_s + reconnect['elapsed_s']) / len(churned) * 1000, 3) if churned else None,
+        },
+    }
+    latency = delivery['latency']
+    print(f'{count:>6} clients: connect p50 {connect["per_client"]["p50_ms"]} ms, '
+          f'{result["memory"]["bytes_per_connection"]} B/conn, delivery p50 {latency["p50_ms"]} ms '
+          f'p99 {latency["p99_ms"]} ms, churn {result["churn"]["per_client_ms"]} ms/client')
+    return result
+
+
+async def run(args) -> List[dict]:
+    from dotenv import load_dotenv
+    load_dotenv(BACKEND_DIR / '.env')
+    secret = os.environ.get('INTERNAL_EVENT_SECRET', '')
+    jwt_secret = os.environ.get('JWT_SECRET', 'your-secret-key-change-in-production')
+    return [await run_level(args, count, secret, jwt_secret) for count in args.clients]
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Socket.IO fan-out benchmark')
+    parser.add_argument('--clients', type=lambda v: [int(n) for n in v.split(',')], default=[1000, 5000, 10000])
+    parser.add_argument('--clients-per-user', type=int, default=1, help='Sockets sharing each user room')
+    parser.add_argument('--events', type=int, default=500, help='Events pushed per level')
+    parser.add_argument('--churn', type=float, default=0.1, help='Share of clients dropped and reconnected')
+    parser.add_argument('--parallel', type=int, default=200, help='Concurrent handshakes and event pushes')
+    parser.add_argument('--timeout', type=float, default=30)
+    parser.add_argument('--port', type=int, default=18001)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--server-log', help='Append backend output here instead of discarding it')
+    parser.add_argument('--output', help='Result file; defaults to bench/results/fanout-<timestamp>.json')
+    args = parser.parse_args()
+    if not os.environ.get('DATABASE_URL'):
+        parser.error('DATABASE_URL must point at a disposable local Postgres')
+
+    file_limit = raise_file_limit()
+    if file_limit < 2 * max(args.clients) + 100:
+        print(f'Warning: open-file limit {file_limit} is low for {max(args.clients)} clients')
+    levels = asyncio.run(run(args))
+    path = save_results('fanout', {'config': vars(args), 'levels': levels}, args.output)
+    print(f'Results saved to {path}')
+
+
+if __name__ == '__main__':
+    main()
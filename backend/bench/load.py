@@ -0,0 +1,250 @@
+"""
+End-to-end load generator for the backend's hot paths.
+
+Calls the ASGI socket_app in-process, with no HTTP server in between. It
+uses a local Postgres and bench.fake_whatsapp as the whatsapp-service, and
+reports req/s, latency percentiles, pool wait and errors per scenario.
+Numbers cover the application and database only; put a real uvicorn in
+front to include HTTP parsing.
+
+Usage (from the backend directory, against a disposable database):
+    DATABASE_URL=postgresql://localhost/botwave_bench python -m bench.load \\
+        --scenarios send_api,send_web,login,logs,analytics --concurrency 50 --duration 30
+
+Scenarios:
+    send_api   GET /api/send with an API key
+    send_web   POST /api/messages/send with a JWT
+    login      POST /api/auth/login (bcrypt verify)
+    logs       GET /api/messages/logs
+    analytics  Admin analytics endpoints, rotating between them
+"""
+import argparse
+import asyncio
+import importlib
+import itertools
+import json
+import os
+import random
+import secrets
+import time
+from typing import Callable, Dict, List, Optional, Tuple
+from urllib.parse import urlencode
+
+from aiohttp import web
+
+from bench.common import BENCH_PASSWORD, delete_bench_users, ensure_bench_users, save_results, summarize_ms
+from bench.fake_whatsapp import FakeWhatsAppService
+
+ANALYTICS_PATHS = [
+    ('/api/admin/analytics/overview', {}),
+    ('/api/admin/analytics/messages', {'days': 7}),
+    ('/api/admin/analytics/users-activity', {}),
+    ('/api/admin/analytics/latency', {'days': 7}),
+]
+
+
+async def asgi_request(app, method: str, path: str, params: Optional[dict] = None,
+                       headers: Optional[Dict[str, str]] = None, json_body=None) -> Tuple[int, bytes]:
+    """Send one HTTP request straight into an ASGI app and collect the response"""
+    body = json.dumps(json_body).encode() if json_body is not None else b''
+    raw_headers = [(b'host', b'bench')]
+    for name, value in (headers or {}).items():
+        raw_headers.append((name.lower().encode(), value.encode()))
+    if json_body is not None:
+        raw_headers += [(b'content-type', b'application/json'), (b'content-length', str(len(body)).encode())]
+    scope = {
+        'type': 'http', 'asgi': {'version': '3.0'}, 'http_version': '1.1',
+        'method': method, 'scheme': 'http', 'path': path, 'raw_path': path.encode(),
+        'query_string': urlencode(params or {}).encode(), 'root_path': '',
+        'headers': raw_headers, 'client': ('127.0.0.1', 50000), 'server': ('bench', 80),
+    }
+    request_sent = False
+    status = 0
+    chunks: List[bytes] = []
+
+    async def receive():
+        nonlocal request_sent
+        if not request_sent:
+            request_sent = True
+            return {'type': 'http.request', 'body': body, 'more_body': False}
+        # The client never disconnects early
+        await asyncio.Event().wait()
+
+    async def send(message):
+        nonlocal status
+        if message['type'] == 'http.response.start':
+            status = message['status']
+        elif message['type'] == 'http.response.body':
+            chunks.append(message.get('body', b''))
+
+    await app(scope, receive, send)
+    return status, b''.join(chunks)
+
+
+class TimedPool:
+    """Proxy for the asyncpg pool that records how long each acquire waited"""
+
+    def __init__(self, pool):
+        self.pool = pool
+        self.waits: List[float] = []
+
+    def acquire(self, *args, **kwargs):
+        return TimedAcquire(self, self.pool.acquire(*args, **kwargs))
+
+    def __getattr__(self, name):
+        return getattr(self.pool, name)
+
+
+class TimedAcquire:
+    def __init__(self, timed_pool: TimedPool, context):
+        self.timed_pool = timed_pool
+        self.context = context
+
+    async def __aenter__(self):
+        started = time.perf_counter()
+        conn = await self.context.__aenter__()
+        self.timed_pool.waits.append(time.perf_counter() - started)
+        return conn
+
+    async def __aexit__(self, *exc):
+        return await self.context.__aexit__(*exc)
+
+
+def build_scenarios(users: List[dict], admin: dict, rng: random.Random) -> Dict[str, Callable[[], tuple]]:
+    """Scenario name -> factory returning (method, path, params, headers, json_body) for the next request"""
+    user_cycle = itertools.cycle(users)
+    analytics_cycle = itertools.cycle(ANALYTICS_PATHS)
+    admin_headers = {'Authorization': f'Bearer {admin["token"]}'}
+
+    def number():
+        return f'+91{rng.randint(7000000000, 9999999999)}'
+
+    def send_api():
+        user = next(user_cycle)
+        return 'GET', '/api/send', {'api_key': user['api_key'], 'number': number(), 'msg': 'Load test message'}, None, None
+
+    def send_web():
+        user = next(user_cycle)
+        headers = {'Authorization': f'Bearer {user["token"]}'}
+        return 'POST', '/api/messages/send', None, headers, {'number': number(), 'message': 'Load test message'}
+
+    def login():
+        user = next(user_cycle)
+        return 'POST', '/api/auth/login', None, None, {'email': user['email'], 'password': BENCH_PASSWORD}
+
+    def logs():
+        user = next(user_cycle)
+        return 'GET', '/api/messages/logs', {'limit': 50}, {'Authorization': f'Bearer {user["token"]}'}, None
+
+    def analytics():
+        path, params = next(analytics_cycle)
+        return 'GET', path, params, admin_headers, None
+
+    return {'send_api': send_api, 'send_web': send_web, 'login': login, 'logs': logs, 'analytics': analytics}
+
+
+async def run_scenario(app, next_request: Callable[[], tuple], concurrency: int, duration: float, pool: TimedPool) -> dict:
+    """Closed-loop load: concurrency workers each issue requests back to back until duration elapses"""
+    latencies: List[float] = []
+    errors: Dict[str, int] = {}
+    pool.waits.clear()
+    deadline = time.perf_counter() + duration
+
+    async def worker():
+        while time.perf_counter() < deadline:
+            method, path, params, headers, json_body = next_request()
+            started = time.perf_counter()
+            try:
+                status, _ = await asgi_request(app, method, path, params, headers, json_body)
+            except Exception as e:
+                status = type(e).__name__
+            latencies.append(time.perf_counter() - started)
+            if not (isinstance(status, int) and 200 <= status < 300):
+                errors[str(status)] = errors.get(str(status), 0) + 1
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - started
+    return {
+        'requests': len(latencies),
+        'elapsed_s': round(elapsed, 3),
+        'requests_per_s': round(len(latencies) / elapsed, 1),
+        'latency': summarize_ms(latencies),
+        'pool_wait': summarize_ms(pool.waits),
+        'errors': errors,
+        'error_rate': round(sum(errors.values()) / len(latencies), 4) if latencies else None,
+    }
+
+
+async def run(args) -> dict:
+    # The backend sends the secret on every service call, as in production
+    internal_secret = os.environ.setdefault('INTERNAL_EVENT_SECRET', secrets.token_urlsafe(16))
+    fake = FakeWhatsAppService(
+        latency={'send': args.send_latency, 'status': 'fixed:1', 'health': 'fixed:1'},
+        error_rates={'send': args.send_error_rate},
+        connected_fraction=1.0,
+        internal_secret=internal_secret,
+        seed=args.seed,
+    )
+    runner = web.AppRunner(fake.create_app())
+    await runner.setup()
+    await web.TCPSite(runner, '127.0.0.1', args.fake_port).start()
+    # server reads its settings at import time
+    os.environ['WHATSAPP_SERVICE_URL'] = f'http://127.0.0.1:{args.fake_port}'
+    server = importlib.import_module('server')
+
+    results = {}
+    try:
+        async with server.lifespan(server.app):
+            pool = TimedPool(server.db_pool)
+            server.db_pool = pool
+            async with pool.pool.acquire() as conn:
+                users = await ensure_bench_users(conn, server, args.users)
+                admin = (await ensure_bench_users(conn, server, 1, role='admin', prefix='bench-admin'))[0]
+            scenarios = build_scenarios(users, admin, random.Random(args.seed))
+            try:
+                for name in args.scenarios:
+                    if args.warmup:
+                        await run_scenario(server.socket_app, scenarios[name], args.concurrency, args.warmup, pool)
+                    result = await run_scenario(server.socket_app, scenarios[name], args.concurrency, args.duration, pool)
+                    results[name] = result
+                    latency = result['latency']
+                    print(f'{name:<10} {result["requests_per_s"]:>9} req/s  p50 {latency["p50_ms"]} ms  '
+                          f'p95 {latency["p95_ms"]} ms  p99 {latency["p99_ms"]} ms  errors {sum(result["errors"].values())}')
+            finally:
+                server.db_pool = pool.pool
+                if not args.keep_users:
+                    async with pool.pool.acquire() as conn:
+                        await delete_bench_users(conn)
+    finally:
+        await runner.cleanup()
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Load-test the backend hot paths in-process')
+    parser.add_argument('--scenarios', type=lambda v: v.split(','), default=['send_api', 'send_web', 'login', 'logs', 'analytics'])
+    parser.add_argument('--concurrency', type=int, default=50)
+    parser.add_argument('--duration', type=float, default=30, help='Seconds per scenario')
+    parser.add_argument('--warmup', type=float, default=3, help='Unmeasured seconds before each scenario')
+    parser.add_argument('--users', type=int, default=200)
+    parser.add_argument('--send-latency', default='lognormal:150:0.4', help='Fake /send latency spec')
+    parser.add_argument('--send-error-rate', type=float, default=0.0)
+    parser.add_argument('--fake-port', type=int, default=18002)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--keep-users', action='store_true', help='Keep bench users and their logs afterwards')
+    parser.add_argument('--output', help='Result file; defaults to bench/results/load-<timestamp>.json')
+    args = parser.parse_args()
+    unknown = set(args.scenarios) - {'send_api', 'send_web', 'login', 'logs', 'analytics'}
+    if unknown:
+        parser.error(f'unknown scenarios: {", ".join(sorted(unknown))}')
+    if not os.environ.get('DATABASE_URL'):
+        parser.error('DATABASE_URL must point at a disposable local Postgres')
+
+    results = asyncio.run(run(args))
+    path = save_results('load', {'config': vars(args), 'scenarios': results}, args.output)
+    print(f'Results saved to {path}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,218 @@
+"""
+Microbenchmarks for the per-request helpers in server.py, compared against
+a stored baseline.
+
+Each benchmark is calibrated to run for about --min-time seconds per
+repeat, and its median time per call is compared with
+bench/baselines/micro.json. The run fails (exit status 1) when any helper
+is slower than its baseline by more than --threshold. The first run on a
+machine, or a run with --update-baseline, records the baseline instead.
+
+Usage (from the backend directory):
+    python -m bench.micro                      # compare against the baseline
+    python -m bench.micro --update-baseline    # record a new baseline
+    DATABASE_URL=postgresql://localhost/botwave_bench python -m bench.micro
+
+The database-backed helpers (get_current_user, verify_api_key and the
+record conversions) run only when DATABASE_URL is set. Without the backend
+dependencies installed, the whole suite is skipped.
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import statistics
+import sys
+import time
+from pathlib import Path
+from typing import Callable, Dict, List, Optional
+
+BASELINE_PATH = Path(__file__).parent / 'baselines' / 'micro.json'
+
+
+def calibrate(call: Callable[[int], float], min_time: float) -> int:
+    """Smallest power-of-ten loop count whose run takes at least min_time"""
+    loops = 1
+    while call(loops) < min_time and loops < 10 ** 7:
+        loops *= 10
+    return loops
+
+
+def measure(call: Callable[[int], float], min_time: float, repeats: int) -> dict:
+    """
+    call(loops) runs the benchmark loops times and returns elapsed seconds;
+    returns per-call timings in nanoseconds across repeats
+    """
+    loops = calibrate(call, min_time)
+    per_call = [call(loops) / loops * 1e9 for _ in range(repeats)]
+    return {
+        'loops': loops,
+        'median_ns': round(statistics.median(per_call), 1),
+        'min_ns': round(min(per_call), 1),
+        'stdev_ns': round(statistics.stdev(per_call), 1) if repeats > 1 else 0.0,
+    }
+
+
+def sync_runner(fn: Callable[[], object]) -> Callable[[int], float]:
+    def run(loops: int) -> float:
+        started = time.perf_counter()
+        for _ in range(loops):
+            fn()
+        return time.perf_counter() - started
+    return run
+
+
+def async_runner(loop: asyncio.AbstractEventLoop, fn) -> Callable[[int], float]:
+    async def batch(loops: int) -> float:
+        started = time.perf_counter()
+        for _ in range(loops):
+            await fn()
+        return time.perf_counter() - started
+    return lambda loops: loop.run_until_complete(batch(loops))
+
+
+def build_benchmarks(server, loop, database: bool) -> Dict[str, Callable[[int], float]]:
+    import jwt
+    from fastapi.security import HTTPAuthorizationCredentials
+
+    user_id = '00000000-0000-4000-8000-000000000000'
+    token = server.create_access_token(user_id, 'bench@bench.invalid', 'user')
+    password_hash = server.hash_password('Bench@Micro-2024')
+
+    benchmarks = {
+        'create_access_token': sync_runner(lambda: server.create_access_token(user_id, 'bench@bench.invalid', 'user')),
+        'jwt_decode': sync_runner(lambda: jwt.decode(token, server.JWT_SECRET, algorithms=[server.JWT_ALGORITHM])),
+        'hash_password': sync_runner(lambda: server.hash_password('Bench@Micro-2024')),
+        'verify_password': sync_runner(lambda: server.verify_password('Bench@Micro-2024', password_hash)),
+        'generate_strong_password': sync_runner(server.generate_strong_password),
+        'format_number_local': sync_runner(lambda: server.format_number('9876543210')),
+        'format_number_e164': sync_runner(lambda: server.format_number('+447700900123')),
+    }
+    if not database:
+        return benchmarks
+
+    from bench.common import ensure_bench_users
+
+    async def setup():
+        await server.migrate_schema()
+        pool = await server.get_db_pool()
+        async with pool.acquire() as conn:
+            user = (await ensure_bench_users(conn, server, 1, prefix='bench-micro'))[0]
+            records = await conn.fetch(
+                '''SELECT gen_random_uuid() AS id, 'user' || n || '@example.com' AS email, n AS rate_limit,
+                          'active' AS status, NOW() AS created_at
+                   FROM generate_series(1, 50) AS n'''
+            )
+        return user, records
+
+    user, records = loop.run_until_complete(setup())
+    credentials = HTTPAuthorizationCredentials(scheme='Bearer', credentials=user['token'])
+    benchmarks.update({
+        'get_current_user': async_runner(loop, lambda: server.get_current_user(credentials)),
+        'verify_api_key': async_runner(loop, lambda: server.verify_api_key(user['api_key'])),
+        'record_to_dict': sync_runner(lambda: server.record_to_dict(records[0])),
+        'records_to_list_50': sync_runner(lambda: server.records_to_list(records)),
+    })
+    return benchmarks
+
+
+def load_baseline() -> Optional[dict]:
+    if not BASELINE_PATH.exists():
+        return None
+    return json.loads(BASELINE_PATH.read_text())
+
+
+def save_baseline(results: Dict[str, dict], previous: Optional[dict] = None):
+    """Record results, keeping previous entries for benchmarks that were not run"""
+    BASELINE_PATH.parent.mkdir(parents=True, exist_ok=True)
+    benchmarks = dict(previous.get('benchmarks', {})) if previous else {}
+    benchmarks.update({name: {'median_ns': r['median_ns']} for name, r in results.items()})
+    document = {
+        'machine': platform.machine(),
+        'python': platform.python_version(),
+        'processor': platform.processor(),
+        'benchmarks': benchmarks,
+    }
+    BASELINE_PATH.write_text(json.dumps(document, indent=2) + '\n')
+
+
+def compare(results: Dict[str, dict], baseline: dict, threshold: float) -> List[str]:
+    """Print each benchmark against its baseline and return the names that regressed"""
+    regressions = []
+    recorded = baseline.get('benchmarks', {})
+    for name, result in results.items():
+        previous = recorded.get(name)
+        if previous is None:
+            print(f'{name:<26} {result["median_ns"]:>14,.0f} ns  (no baseline)')
+            continue
+        ratio = result['median_ns'] / previous['median_ns']
+        flag = 'REGRESSED' if ratio > 1 + threshold else ''
+        print(f'{name:<26} {result["median_ns"]:>14,.0f} ns  {ratio:6.2f}x baseline  {flag}')
+        if flag:
+            regressions.append(name)
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Microbenchmarks for per-request helpers')
+    parser.add_argument('--min-time', type=float, default=0.2, help='Minimum seconds per repeat')
+    parser.add_argument('--repeats', type=int, default=5)
+    parser.add_argument('--threshold', type=float, default=0.25, help='Allowed slowdown before failing, e.g. 0.25 = 25%%')
+    parser.add_argument('--only', type=lambda v: v.split(','), help='Comma-separated benchmark names')
+    parser.add_argument('--update-baseline', action='store_true')
+    parser.add_argument('--output', help='Also save full results with run metadata to this JSON file')
+    args = parser.parse_args()
+
+    # Decided before importing server, which would pull DATABASE_URL in from .env
+    database = bool(os.environ.get('DATABASE_URL'))
+    try:
+        import server
+    except ImportError as e:
+        print(f'Skipping microbenchmarks, backend dependencies are missing: {e}')
+        return 0
+
+    if not database:
+        print('DATABASE_URL not set, skipping database-backed benchmarks')
+
+    loop = asyncio.new_event_loop()
+    try:
+        benchmarks = build_benchmarks(server, loop, database)
+        if args.only:
+            benchmarks = {name: run for name, run in benchmarks.items() if name in args.only}
+        results = {name: measure(run, args.min_time, args.repeats) for name, run in benchmarks.items()}
+        if database:
+            from bench.common import delete_bench_users
+
+            async def teardown():
+                pool = await server.get_db_pool()
+                async with pool.acquire() as conn:
+                    await delete_bench_users(conn)
+                await server.close_db_pool()
+            loop.run_until_complete(teardown())
+    finally:
+        loop.close()
+
+    if args.output:
+        from bench.common import save_results
+        save_results('micro', {'config': vars(args), 'benchmarks': results}, args.output)
+
+    baseline = load_baseline()
+    if baseline is None or args.update_baseline:
+        save_baseline(results, baseline)
+        for name, result in results.items():
+            print(f'{name:<26} {result["median_ns"]:>14,.0f} ns')
+        print(f'Baseline written to {BASELINE_PATH}')
+        return 0
+
+    if baseline.get('machine') != platform.machine() or baseline.get('python') != platform.python_version():
+        print(f'Warning: baseline was recorded on {baseline.get("machine")} / Python {baseline.get("python")}')
+    regressions = compare(results, baseline, args.threshold)
+    if regressions:
+        print(f'{len(regressions)} benchmark(s) regressed more than {args.threshold:.0%}: {", ".join(regressions)}')
+        return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,39 @@
+"""
+Consistent hash ring for placing users on whatsapp-service nodes.
+
+Each node is hashed onto the ring at many virtual points, so users spread
+evenly and adding or removing a node moves only the users on the arcs it
+gains or loses (about 1/N of them) instead of reshuffling everyone.
+"""
+import bisect
+import hashlib
+from typing import Dict, List, Sequence
+
+
+def ring_hash(key: str) -> int:
+    return int.from_bytes(hashlib.md5(key.encode()).digest()[:8], 'big')
+
+
+class HashRing:
+    def __init__(self, nodes: Sequence[str], vnodes: int = 160):
+        if not nodes:
+            raise ValueError('HashRing needs at least one node')
+        self.nodes: List[str] = list(dict.fromkeys(nodes))
+        self.vnodes = vnodes
+        points = sorted((ring_hash(f'{node}#{i}'), node) for node in self.nodes for i in range(vnodes))
+        self._points = [point for point, _ in points]
+        self._owners = [node for _, node in points]
+
+    def node_for(self, key: str) -> str:
+        """First node clockwise from the key's position"""
+        index = bisect.bisect(self._points, ring_hash(key))
+        return self._owners[index % len(self._owners)]
+
+    def share(self) -> Dict[str, float]:
+        """Fraction of the hash space owned by each node"""
+        owned = dict.fromkeys(self.nodes, 0)
+        previous = self._points[-1] - 2 ** 64
+        for point, node in zip(self._points, self._owners):
+            owned[node] += point - previous
+            previous = point
+        return {node: size / 2 ** 64 for node, size in owned.items()}
@@ -0,0 +1,78 @@
+"""
+Maintenance commands for the BotWave backend.
+
+Usage (from the backend directory):
+    python manage.py migrate
+    python manage.py archive-logs --days 90
+    python manage.py backfill-rollups
+    python manage.py rebuild-rollups --since 2025-01-01
+"""
+import argparse
+import asyncio
+from datetime import date
+
+import server
+
+
+async def migrate(args):
+    # run() has already applied anything pending
+    print('Schema is up to date')
+
+
+async def archive_logs(args):
+    archived = await server.archive_message_logs(args.days, args.batch_size)
+    print(f'Archived {archived} message logs older than {args.days} days')
+
+
+async def backfill_rollups(args):
+    inserted = await server.rebuild_message_stats(args.since, missing_only=True)
+    if inserted:
+        print(f'Backfilled {inserted} message_stats_daily rows')
+    else:
+        print('Rollups already include every message sent before the upgrade')
+
+
+async def rebuild_rollups(args):
+    inserted = await server.rebuild_message_stats(args.since)
+    print(f'Rebuilt message_stats_daily with {inserted} rows')
+
+
+async def run(args):
+    try:
+        applied = await server.migrate_schema()
+        if applied:
+            print(f'Applied schema migrations {applied}')
+        await args.handler(args)
+    finally:
+        await server.close_db_pool()
+
+
+def main():
+    parser = argparse.ArgumentParser(description='BotWave maintenance commands')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    migrate_parser = subparsers.add_parser('migrate', help='Apply pending schema migrations')
+    migrate_parser.set_defaults(handler=migrate)
+
+    archive_parser = subparsers.add_parser('archive-logs', help='Move old message logs to the compressed archive')
+    archive_parser.add_argument('--days', type=int, default=server.MESSAGE_ARCHIVE_AFTER_DAYS or 90)
+    archive_parser.add_argument('--batch-size', type=int, default=server.MESSAGE_ARCHIVE_BATCH_SIZE)
+    archive_parser.set_defaults(handler=archive_logs)
+
+    for name, handler, help_text in [
+        ('backfill-rollups', backfill_rollups, 'Count messages sent before the upgrade into the rollups (once)'),
+        ('rebuild-rollups', rebuild_rollups, 'Recompute rollups for complete days, up to yesterday, from message_logs'),
+    ]:
+        rollup_parser = subparsers.add_parser(name, help=help_text)
+        rollup_parser.add_argument(
+            '--since', type=date.fromisoformat, default=None,
+            help='First day to recompute (YYYY-MM-DD); defaults to the oldest row still in message_logs'
+        )
+        rollup_parser.set_defaults(handler=handler)
+
+    args = parser.parse_args()
+    asyncio.run(run(args))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,335 @@
+"""
+Versioned schema migrations.
+
+scripts/schema.sql creates the original tables; everything added since is a
+numbered step here. Applied versions are recorded in schema_migrations, and
+the runner holds an advisory lock, so workers starting together apply each
+step exactly once and the rest find nothing pending. Waiting workers poll for
+the lock rather than block on it: a blocked lock request holds a snapshot,
+which CREATE INDEX CONCURRENTLY in the lock holder would wait on in turn.
+
+A step's SQL runs in one transaction with a short lock_timeout, so DDL that
+cannot get its lock fails the step instead of stalling traffic queued behind
+it. Indexes on existing tables are built with CREATE INDEX CONCURRENTLY after
+the transaction, since that cannot run inside one. Step SQL is idempotent, so
+a step whose index build failed is simply re-run on the next start.
+"""
+import asyncio
+import logging
+from typing import List, NamedTuple, Optional, Sequence
+
+logger = logging.getLogger(__name__)
+
+MIGRATION_LOCK_ID = 72610027
+LOCK_TIMEOUT = '5s'
+LOCK_POLL_INTERVAL = 0.5
+
+
+class Index(NamedTuple):
+    name: str
+    definition: str
+    # Skipped, with a notice, when this extension is not installed
+    extension: Optional[str] = None
+
+
+class Migration(NamedTuple):
+    version: int
+    description: str
+    sql: str = ''
+    indexes: Sequence[Index] = ()
+
+
+MIGRATIONS = [
+    Migration(1, 'Original schema', '''
+        CREATE TABLE IF NOT EXISTS users (
+            id UUID PRIMARY KEY DEFAULT gen_random_uuid(),
+            email VARCHAR(255) UNIQUE NOT NULL,
+            password_hash VARCHAR(255) NOT NULL,
+            plain_password VARCHAR(255),
+            api_key VARCHAR(255) UNIQUE NOT NULL,
+            role VARCHAR(50) DEFAULT 'user',
+            status VARCHAR(50) DEFAULT 'active',
+            rate_limit INTEGER DEFAULT 30,
+            force_password_change BOOLEAN DEFAULT FALSE,
+            created_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP
+        );
+        CREATE TABLE IF NOT EXISTS message_logs (
+            id UUID PRIMARY KEY DEFAULT gen_random_uuid(),
+            user_id UUID NOT NULL REFERENCES users(id) ON DELETE CASCADE,
+            receiver_number VARCHAR(50) NOT NULL,
+            message_body TEXT NOT NULL,
+            status VARCHAR(50) NOT NULL,
+            source VARCHAR(50) NOT NULL,
+            created_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP
+        );
+        CREATE TABLE IF NOT EXISTS activity_logs (
+            id UUID PRIMARY KEY DEFAULT gen_random_uuid(),
+            user_id UUID NOT NULL,
+            user_email VARCHAR(255) NOT NULL,
+            action VARCHAR(100) NOT NULL,
+            details TEXT,
+            ip_address VARCHAR(50),
+            created_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP
+        );
+        CREATE TABLE IF NOT EXISTS settings (
+            id VARCHAR(50) PRIMARY KEY DEFAULT 'global_settings',
+            default_rate_limit INTEGER DEFAULT 30,
+            max_rate_limit INTEGER DEFAULT 100,
+            enable_registration BOOLEAN DEFAULT TRUE,
+            maintenance_mode BOOLEAN DEFAULT FALSE,
+            updated_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP
+        );
+        INSERT INTO settings (id, default_rate_limit, max_rate_limit, enable_registration, maintenance_mode)
+        VALUES ('global_settings', 30, 100, TRUE, FALSE)
+        ON CONFLICT (id) DO NOTHING;
+    ''', indexes=[
+        Index('idx_users_email', 'ON users(email)'),
+        Index('idx_users_api_key', 'ON users(api_key)'),
+        Index('idx_message_logs_user_id', 'ON message_logs(user_id)'),
+        Index('idx_message_logs_created_at', 'ON message_logs(created_at)'),
+        Index('idx_activity_logs_user_id', 'ON activity_logs(user_id)'),
+        Index('idx_activity_logs_created_at', 'ON activity_logs(created_at)'),
+    ]),
+    # scope is 'all' for lifetime totals or a UTC date (YYYY-MM-DD) for daily totals;
+    # seeded from message_logs here, then kept current by the rollup flush
+    Migration(2, 'Message counters', '''
+        CREATE TABLE IF NOT EXISTS message_counters (
+            scope VARCHAR(32) NOT NULL,
+            status VARCHAR(50) NOT NULL,
+            count BIGINT NOT NULL DEFAULT 0,
+            PRIMARY KEY (scope, status)
+        );
+        INSERT INTO message_counters (scope, status, count)
+        SELECT 'all', status, COUNT(*) FROM message_logs GROUP BY status
+        UNION ALL
+        SELECT to_char(NOW() AT TIME ZONE 'UTC', 'YYYY-MM-DD'), status, COUNT(*)
+        FROM message_logs WHERE created_at >= date_trunc('day', NOW() AT TIME ZONE 'UTC') AT TIME ZONE 'UTC'
+        GROUP BY status
+        ON CONFLICT (scope, status) DO NOTHING;
+    '''),
+    Migration(3, 'Daily message rollup', '''
+        CREATE TABLE IF NOT EXISTS message_stats_daily (
+            user_id UUID NOT NULL REFERENCES users(id) ON DELETE CASCADE,
+            day DATE NOT NULL,
+            source VARCHAR(50) NOT NULL,
+            status VARCHAR(50) NOT NULL,
+            count BIGINT NOT NULL DEFAULT 0,
+            PRIMARY KEY (user_id, day, source, status)
+        );
+        CREATE INDEX IF NOT EXISTS idx_message_stats_daily_day ON message_stats_daily(day);
+    '''),
+    # Milliseconds: whatsapp-service round trip and total handler time. Histograms use
+    # log-scale buckets (see latency_bucket in server.py); metric is 'service' or 'total'
+    Migration(4, 'Send latency', '''
+        ALTER TABLE message_logs ADD COLUMN IF NOT EXISTS service_ms INTEGER;
+        ALTER TABLE message_logs ADD COLUMN IF NOT EXISTS total_ms INTEGER;
+        CREATE TABLE IF NOT EXISTS message_latency_daily (
+            user_id UUID NOT NULL REFERENCES users(id) ON DELETE CASCADE,
+            day DATE NOT NULL,
+            source VARCHAR(50) NOT NULL,
+            metric VARCHAR(16) NOT NULL,
+            bucket INTEGER NOT NULL,
+            count BIGINT NOT NULL DEFAULT 0,
+            PRIMARY KEY (user_id, day, source, metric, bucket)
+        );
+        CREATE INDEX IF NOT EXISTS idx_message_latency_daily_day ON message_latency_daily(day);
+    '''),
+    # Quarter-hour UTC buckets for timezone-aware analytics, and HyperLogLog
+    # sketches of distinct receivers per day (scope is a user id or 'all')
+    Migration(5, 'Quarter-hour rollup and recipient sketches', '''
+        CREATE TABLE IF NOT EXISTS message_stats_quarter_hourly (
+            bucket TIMESTAMP WITH TIME ZONE NOT NULL,
+            source VARCHAR(50) NOT NULL,
+            status VARCHAR(50) NOT NULL,
+            count BIGINT NOT NULL DEFAULT 0,
+            PRIMARY KEY (bucket, source, status)
+        );
+        CREATE TABLE IF NOT EXISTS recipient_sketches (
+            scope VARCHAR(36) NOT NULL,
+            day DATE NOT NULL,
+            registers BYTEA NOT NULL,
+            PRIMARY KEY (scope, day)
+        );
+    '''),
+    # Region codes from the phone-prefix trie, e.g. 'IN' or 'IN-JIO'
+    Migration(6, 'Recipient regions', '''
+        ALTER TABLE message_logs ADD COLUMN IF NOT EXISTS region VARCHAR(16);
+        CREATE TABLE IF NOT EXISTS message_stats_region_daily (
+            day DATE NOT NULL,
+            region VARCHAR(16) NOT NULL,
+            status VARCHAR(50) NOT NULL,
+            count BIGINT NOT NULL DEFAULT 0,
+            PRIMARY KEY (day, region, status)
+        );
+    '''),
+    # message_count is the lifetime total per user, for sorting the admin list
+    Migration(7, 'Admin user search', '''
+        ALTER TABLE users ADD COLUMN IF NOT EXISTS message_count BIGINT NOT NULL DEFAULT 0;
+        DO $$
+        BEGIN
+            CREATE EXTENSION IF NOT EXISTS pg_trgm;
+        EXCEPTION WHEN insufficient_privilege THEN
+            RAISE NOTICE 'pg_trgm unavailable, email substring search will not be indexed';
+        END $$;
+    ''', indexes=[
+        Index('idx_users_email_lower', 'ON users(lower(email) text_pattern_ops)'),
+        Index('idx_users_created_at_id', 'ON users(created_at DESC, id DESC)'),
+        Index('idx_users_status_created_at_id', 'ON users(status, created_at DESC, id DESC)'),
+        Index('idx_users_message_count_id', 'ON users(message_count DESC, id DESC)'),
+        Index('idx_users_email_trgm', 'ON users USING gin (lower(email) gin_trgm_ops)', extension='pg_trgm'),
+    ]),
+    # Socket.IO events too large for a single NOTIFY payload, referenced by id
+    Migration(8, 'Socket.IO payloads', '''
+        CREATE TABLE IF NOT EXISTS socketio_payloads (
+            id BIGSERIAL PRIMARY KEY,
+            payload TEXT NOT NULL,
+            created_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP
+        );
+        CREATE INDEX IF NOT EXISTS idx_socketio_payloads_created_at ON socketio_payloads(created_at);
+    '''),
+    # seq is the change sequence for live log streaming, assigned on insert and bumped
+    # on every delivery status change. It is added without a default and the default
+    # set afterwards, so existing rows keep NULL instead of the table being rewritten.
+    # delivery_ack is the latest WhatsApp ack (1 server, 2 delivered, 3 read, -1 error).
+    Migration(9, 'Message log streaming and delivery acks', '''
+        CREATE SEQUENCE IF NOT EXISTS message_logs_seq_seq;
+        ALTER TABLE message_logs ADD COLUMN IF NOT EXISTS seq BIGINT;
+        ALTER TABLE message_logs ALTER COLUMN seq SET DEFAULT nextval('message_logs_seq_seq');
+        ALTER SEQUENCE message_logs_seq_seq OWNED BY message_logs.seq;
+        ALTER TABLE message_logs ADD COLUMN IF NOT EXISTS wa_message_id VARCHAR(64);
+        ALTER TABLE message_logs ADD COLUMN IF NOT EXISTS delivery_ack SMALLINT;
+    ''', indexes=[
+        Index('idx_message_logs_user_id_seq', 'ON message_logs(user_id, seq)'),
+        Index('idx_message_logs_wa_message_id', 'ON message_logs(wa_message_id) WHERE wa_message_id IS NOT NULL'),
+    ]),
+    # whatsapp-service node holding each user's session (see HashRing in hash_ring.py);
+    # draining is set while a rebalance migrates the session to another node
+    Migration(10, 'WhatsApp service assignments', '''
+        CREATE TABLE IF NOT EXISTS whatsapp_assignments (
+            user_id UUID PRIMARY KEY REFERENCES users(id) ON DELETE CASCADE,
+            node VARCHAR(255) NOT NULL,
+            draining BOOLEAN NOT NULL DEFAULT FALSE,
+            assigned_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP
+        );
+        CREATE INDEX IF NOT EXISTS idx_whatsapp_assignments_node ON whatsapp_assignments(node);
+    '''),
+    # When each user last sent or checked WhatsApp; hibernated_at is set while
+    # the session's browser is stopped for idleness (its login is kept)
+    Migration(11, 'WhatsApp session hibernation', '''
+        CREATE TABLE IF NOT EXISTS whatsapp_activity (
+            user_id UUID PRIMARY KEY REFERENCES users(id) ON DELETE CASCADE,
+            last_active_at TIMESTAMP WITH TIME ZONE NOT NULL,
+            hibernated_at TIMESTAMP WITH TIME ZONE,
+            phone_number VARCHAR(32)
+        );
+        CREATE INDEX IF NOT EXISTS idx_whatsapp_activity_last_active_at ON whatsapp_activity(last_active_at);
+    '''),
+    # Bounds of the message log archive: rows created at or before archived_until may
+    # be archived, in day partitions from oldest_day on; newer rows are all in message_logs
+    Migration(12, 'Message log archive state', '''
+        CREATE TABLE IF NOT EXISTS message_archive_state (
+            id VARCHAR(50) PRIMARY KEY,
+            archived_until TIMESTAMP WITH TIME ZONE NOT NULL,
+            oldest_day DATE NOT NULL
+        );
+    '''),
+    # Live rollup counting covers sends from live_since on; manage.py backfill-rollups
+    # counts the earlier ones and clears it. Flushes drop pending counts for days
+    # before rebuilt_before, which rebuild-rollups recounted from message_logs.
+    Migration(13, 'Rollup rebuild state', '''
+        CREATE TABLE IF NOT EXISTS message_stats_state (
+            id VARCHAR(50) PRIMARY KEY,
+            rebuilt_before DATE,
+            live_since TIMESTAMP WITH TIME ZONE
+        );
+        INSERT INTO message_stats_state (id, live_since) VALUES ('rollups', NOW())
+        ON CONFLICT (id) DO NOTHING;
+    '''),
+    # Rows still waiting for classify_message_regions; new rows are classified on
+    # write, so this shrinks to nothing once older rows are filled in
+    Migration(14, 'Unclassified message regions', indexes=[
+        Index('idx_message_logs_region_null', 'ON message_logs(id) WHERE region IS NULL'),
+    ]),
+    # Admin users list sorted by messages within a status filter
+    Migration(15, 'Admin users by status and message count', indexes=[
+        Index('idx_users_status_message_count_id', 'ON users(status, message_count DESC, id DESC)'),
+    ]),
+    # Archive partitions per user, so reads visit only days that hold the user's rows.
+    # days_indexed stays false on an existing state row until the archiver has
+    # listed the partitions written before this table existed
+    Migration(16, 'Message log archive day index', '''
+        CREATE TABLE IF NOT EXISTS message_archive_days (
+            user_id UUID NOT NULL,
+            day DATE NOT NULL,
+            PRIMARY KEY (user_id, day)
+        );
+        ALTER TABLE message_archive_state ADD COLUMN IF NOT EXISTS days_indexed BOOLEAN NOT NULL DEFAULT FALSE;
+        ALTER TABLE message_archive_state ALTER COLUMN days_indexed SET DEFAULT TRUE;
+    '''),
+    # WhatsApp initialisation queue and slots shared by all backend workers; both
+    # are leases that the owning worker's crash lets lapse
+    Migration(17, 'Shared WhatsApp initialisation admission', '''
+        CREATE TABLE IF NOT EXISTS whatsapp_init_queue (
+            user_id UUID PRIMARY KEY,
+            node TEXT NOT NULL,
+            resume BOOLEAN NOT NULL DEFAULT FALSE,
+            queued_at TIMESTAMP WITH TIME ZONE NOT NULL DEFAULT NOW(),
+            expires_at TIMESTAMP WITH TIME ZONE NOT NULL
+        );
+        CREATE INDEX IF NOT EXISTS idx_whatsapp_init_queue_node ON whatsapp_init_queue(node, queued_at, user_id);
+        CREATE TABLE IF NOT EXISTS whatsapp_init_active (
+            user_id UUID PRIMARY KEY,
+            node TEXT NOT NULL,
+            lease_until TIMESTAMP WITH TIME ZONE NOT NULL
+        );
+        CREATE INDEX IF NOT EXISTS idx_whatsapp_init_active_node ON whatsapp_init_active(node);
+    '''),
+]
+
+
+async def build_index(conn, index: Index):
+    if index.extension and not await conn.fetchval('SELECT 1 FROM pg_extension WHERE extname = $1', index.extension):
+        logger.warning(f'[Migrations] {index.extension} is not installed, skipping {index.name}')
+        return
+    # An interrupted concurrent build leaves an invalid index behind that IF NOT EXISTS would keep
+    valid = await conn.fetchval(
+        'SELECT i.indisvalid FROM pg_class c JOIN pg_index i ON i.indexrelid = c.oid WHERE c.relname = $1',
+        index.name
+    )
+    if valid is False:
+        await conn.execute(f'DROP INDEX CONCURRENTLY IF EXISTS {index.name}')
+    await conn.execute(f'CREATE INDEX CONCURRENTLY IF NOT EXISTS {index.name} {index.definition}')
+
+
+async def apply_migrations(conn) -> List[int]:
+    """Apply pending migrations in order on conn; returns the versions applied"""
+    applied = []
+    while not await conn.fetchval('SELECT pg_try_advisory_lock($1)', MIGRATION_LOCK_ID):
+        await asyncio.sleep(LOCK_POLL_INTERVAL)
+    try:
+        await conn.execute('''
+            CREATE TABLE IF NOT EXISTS schema_migrations (
+                version INTEGER PRIMARY KEY,
+                description TEXT NOT NULL,
+                applied_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP
+            )
+        ''')
+        done = {row['version'] for row in await conn.fetch('SELECT version FROM schema_migrations')}
+        for migration in MIGRATIONS:
+            if migration.version in done:
+                continue
+            logger.info(f'[Migrations] Applying {migration.version}: {migration.description}')
+            async with conn.transaction():
+                await conn.execute(f"SET LOCAL lock_timeout = '{LOCK_TIMEOUT}'")
+                if migration.sql:
+                    await conn.execute(migration.sql)
+            for index in migration.indexes:
+                await build_index(conn, index)
+            await conn.execute(
+                'INSERT INTO schema_migrations (version, description) VALUES ($1, $2)',
+                migration.version, migration.description
+            )
+            applied.append(migration.version)
+    finally:
+        await conn.execute('SELECT pg_advisory_unlock($1)', MIGRATION_LOCK_ID)
+    return applied
@@ -0,0 +1,149 @@
+"""
+Socket.IO client manager relaying events between backend workers over
+Postgres LISTEN/NOTIFY, so an emit to a user's room reaches sockets held by
+any worker.
+
+Messages published within FLUSH_INTERVAL are packed into as few NOTIFY
+payloads as fit under Postgres' 8000 byte limit. A single message too large
+to fit (a QR code data URL, for instance) is parked in socketio_payloads and
+sent by reference instead.
+
+The same channel carries worker events (broadcast_worker_event), which are not
+for sockets but for a handler on every worker, to keep per-worker caches in step.
+"""
+import asyncio
+import json
+import logging
+from typing import Callable, List, Optional
+
+import asyncpg
+import socketio
+
+logger = logging.getLogger(__name__)
+
+MAX_NOTIFY_BYTES = 7800
+FLUSH_INTERVAL = 0.005
+PAYLOAD_RETENTION = '5 minutes'
+
+
+class AsyncPostgresManager(socketio.AsyncPubSubManager):
+    """Pub/sub client manager backed by a Postgres notification channel"""
+
+    name = 'asyncpostgres'
+
+    def __init__(self, url, channel='socketio', write_only=False, logger=None):
+        super().__init__(channel=channel, write_only=write_only, logger=logger)
+        self.url = url
+        self.pending: List[bytes] = []
+        self.flush_task: Optional[asyncio.Task] = None
+        self.publish_conn: Optional[asyncpg.Connection] = None
+        self.listen_conn: Optional[asyncpg.Connection] = None
+        self.notifications: asyncio.Queue = asyncio.Queue()
+        self.worker_event_handler: Optional[Callable[[str, dict], None]] = None
+
+    async def broadcast_worker_event(self, event: str, data: dict):
+        """Deliver event to worker_event_handler on every worker, this one included"""
+        await self._publish({'method': 'worker_event', 'event': event, 'data': data})
+
+    async def _publish(self, data):
+        self.pending.append(json.dumps(data, separators=(',', ':')).encode())
+        if self.flush_task is None or self.flush_task.done():
+            self.flush_task = asyncio.create_task(self._flush())
+
+    async def _flush(self):
+        await asyncio.sleep(FLUSH_INTERVAL)
+        while self.pending:
+            batch, self.pending = self.pending, []
+            for attempt in range(2):
+                try:
+                    await self._notify(batch)
+                    break
+                except (OSError, asyncpg.PostgresError, asyncpg.InterfaceError) as e:
+                    if self.publish_conn is not None:
+                        self.publish_conn.terminate()
+                        self.publish_conn = None
+                    if attempt:
+                        logger.error(f"[Socket.IO] Dropped {len(batch)} pub/sub messages: {e}")
+
+    async def _notify(self, batch: List[bytes]):
+        """Send batch in as few notifications as fit, removing what was sent so a retry never repeats it"""
+        conn = await self._connect(listen=False)
+        parked = False
+        chunk: List[bytes] = []
+        size = 2
+        for message in list(batch):
+            if len(message) + 2 > MAX_NOTIFY_BYTES:
+                ref = await conn.fetchval(
+                    'INSERT INTO socketio_payloads (payload) VALUES ($1) RETURNING id', message.decode()
+                )
+                message = json.dumps({'ref': ref}).encode()
+                parked = True
+            if chunk and size + len(message) + 1 > MAX_NOTIFY_BYTES:
+                await self._notify_chunk(conn, chunk)
+                del batch[:len(chunk)]
+                chunk, size = [], 2
+            chunk.append(message)
+            size += len(message) + 1
+        if chunk:
+            await self._notify_chunk(conn, chunk)
+            del batch[:len(chunk)]
+        if parked:
+            await conn.execute(
+                f"DELETE FROM socketio_payloads WHERE created_at < NOW() - INTERVAL '{PAYLOAD_RETENTION}'"
+            )
+
+    async def _notify_chunk(self, conn: asyncpg.Connection, chunk: List[bytes]):
+        payload = b'[' + b','.join(chunk) + b']'
+        await conn.execute('SELECT pg_notify($1, $2)', self.channel, payload.decode())
+
+    async def _listen(self):
+        while True:
+            try:
+                conn = await self._connect(listen=True)
+            except (OSError, asyncpg.PostgresError) as e:
+                logger.warning(f"[Socket.IO] Pub/sub listener connection failed: {e}")
+                await asyncio.sleep(1)
+                continue
+            try:
+                payload = await asyncio.wait_for(self.notifications.get(), timeout=5)
+            except asyncio.TimeoutError:
+                continue
+            for message in json.loads(payload):
+                if 'ref' in message:
+                    message = await self._fetch_parked(conn, message['ref'])
+                    if message is None:
+                        continue
+                if message.get('method') == 'worker_event':
+                    self._handle_worker_event(message)
+                    continue
+                yield message
+
+    def _handle_worker_event(self, message: dict):
+        if self.worker_event_handler is None:
+            return
+        try:
+            self.worker_event_handler(message['event'], message['data'])
+        except Exception as e:
+            logger.error(f"[Socket.IO] Worker event {message.get('event')} failed: {e}")
+
+    async def _fetch_parked(self, conn: asyncpg.Connection, ref: int) -> Optional[dict]:
+        try:
+            payload = await conn.fetchval('SELECT payload FROM socketio_payloads WHERE id = $1', ref)
+        except (OSError, asyncpg.PostgresError, asyncpg.InterfaceError) as e:
+            logger.warning(f"[Socket.IO] Could not load parked payload {ref}: {e}")
+            return None
+        return json.loads(payload) if payload else None
+
+    async def _connect(self, listen: bool) -> asyncpg.Connection:
+        conn = self.listen_conn if listen else self.publish_conn
+        if conn is None or conn.is_closed():
+            conn = await asyncpg.connect(self.url)
+            if listen:
+                await conn.add_listener(self.channel, self._on_notification)
+                self.listen_conn = conn
+            else:
+                self.publish_conn = conn
+        return conn
+
+    def _on_notification(self, conn, pid, channel, payload):
+        self.notifications.put_nowait(payload)
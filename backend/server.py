@@ -1,4 +1,5 @@
-from fastapi import FastAPI, APIRouter, HTTPException, Depends, Header, Query
+from fastapi import FastAPI, APIRouter, HTTPException, Depends, Header, Query, Response, WebSocket, WebSocketDisconnect
+from fastapi.responses import StreamingResponse, JSONResponse
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from dotenv import load_dotenv
 from starlette.middleware.cors import CORSMiddleware
@@ -7,32 +8,53 @@ import os
 import logging
 from pathlib import Path
 from pydantic import BaseModel, Field, ConfigDict, EmailStr
-from typing import List, Optional, Dict
+from typing import List, Optional, Dict, Any, Callable
 import uuid
-from datetime import datetime, timezone, timedelta
+from datetime import date, datetime, timezone, timedelta
+from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
 import bcrypt
 import jwt
 import secrets
 import aiohttp
-import subprocess
+import asyncio
+import time
+import math
+import hashlib
+import zlib
+import gzip
+import shutil
+import json
+import csv
+import io
+import base64
+import hmac
 from contextlib import asynccontextmanager
 import socketio
 
+from hash_ring import HashRing
+from migrations import apply_migrations
+from phone_prefixes import classify_number
+from pg_pubsub import AsyncPostgresManager
+
 ROOT_DIR = Path(__file__).parent
 load_dotenv(ROOT_DIR / '.env')
 
 # PostgreSQL connection settings
 DATABASE_URL = os.environ.get('DATABASE_URL')
 
+# Relay Socket.IO events between workers over Postgres when running more than one
+SOCKETIO_PUBSUB = os.environ.get('SOCKETIO_PUBSUB', 'false').lower() == 'true'
+
 # Socket.IO Server
 sio = socketio.AsyncServer(
     async_mode='asgi',
     cors_allowed_origins='*',
     logger=False,
-    engineio_logger=False
+    engineio_logger=False,
+    client_manager=AsyncPostgresManager(DATABASE_URL) if SOCKETIO_PUBSUB else None
 )
 
-# User session tracking: {user_id: set(sid1, sid2, ...)}
+# User session tracking for this worker: {user_id: set(sid1, sid2, ...)}
 user_sessions: Dict[str, set] = {}
 # SID to user mapping: {sid: user_id}
 sid_to_user: Dict[str, str] = {}
@@ -57,14 +79,60 @@ async def close_db_pool():
         await db_pool.close()
         db_pool = None
 
+# Shared HTTP client for background calls to whatsapp-service; every node route
+# requires the internal secret, so it goes on every request
+http_session: Optional[aiohttp.ClientSession] = None
+
+def get_http_session() -> aiohttp.ClientSession:
+    global http_session
+    if http_session is None or http_session.closed:
+        http_session = aiohttp.ClientSession(timeout=aiohttp.ClientTimeout(total=10), headers=service_headers())
+    return http_session
+
+async def close_http_session():
+    global http_session
+    if http_session and not http_session.closed:
+        await http_session.close()
+    http_session = None
+
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     # Startup
     await get_db_pool()
+    await migrate_schema()
     await create_default_admin()
     logger.info("Database pool initialized")
+    if not INTERNAL_EVENT_SECRET:
+        if INTERNAL_EVENTS_INSECURE:
+            logger.warning('INTERNAL_EVENT_SECRET is not set and INTERNAL_EVENTS_INSECURE is on: internal event endpoints accept anyone')
+        else:
+            logger.error('INTERNAL_EVENT_SECRET is not set: internal event endpoints will reject all WhatsApp service events')
+    if SOCKETIO_PUBSUB and not sio.manager_initialized:
+        # Listen from startup rather than the first socket, so worker events reach every worker
+        sio.manager_initialized = True
+        sio.manager.initialize()
+    background_tasks = [asyncio.create_task(message_stats_flush_loop())]
+    background_tasks.append(asyncio.create_task(system_status_loop()))
+    background_tasks.append(asyncio.create_task(health_probe_loop()))
+    background_tasks.append(asyncio.create_task(session_state_loop()))
+    background_tasks.append(asyncio.create_task(session_hibernation_loop()))
+    background_tasks.append(asyncio.create_task(init_admission_loop()))
+    if MESSAGE_ARCHIVE_AFTER_DAYS > 0:
+        background_tasks.append(asyncio.create_task(message_archive_loop()))
     yield
     # Shutdown
+    for task in background_tasks:
+        task.cancel()
+    try:
+        await flush_message_stats()
+    except Exception as e:
+        logger.error(f"Failed to flush message stats on shutdown: {e}")
+    try:
+        await flush_session_activity()
+    except Exception as e:
+        logger.error(f"Failed to flush session activity on shutdown: {e}")
+    await close_http_session()
+    await close_probe_connection()
     await close_db_pool()
     logger.info("Database pool closed")
 
@@ -92,9 +160,100 @@ async def health_check():
         "timestamp": datetime.now(timezone.utc).isoformat()
     }
 
+@api_router.get("/health/live")
+async def liveness_check():
+    """Liveness probe: the process is up and serving; touches no dependencies"""
+    return {"status": "ok"}
+
+# Readiness is answered from a cached database probe refreshed in the
+# background. The probe has its own connection, so a saturated request pool
+# shows up as a pool detail instead of failing every worker's readiness at once
+HEALTH_PROBE_INTERVAL = float(os.environ.get('HEALTH_PROBE_INTERVAL', '5'))
+HEALTH_PROBE_TIMEOUT = 2
+database_probe: Optional[dict] = None
+probe_conn: Optional[asyncpg.Connection] = None
+
+async def probe_database() -> dict:
+    global probe_conn
+    started = time.perf_counter()
+    try:
+        if probe_conn is None or probe_conn.is_closed():
+            probe_conn = await asyncpg.connect(
+                DATABASE_URL,
+                timeout=HEALTH_PROBE_TIMEOUT,
+                server_settings={'statement_timeout': str(HEALTH_PROBE_TIMEOUT * 1000)}
+            )
+        await probe_conn.fetchval('SELECT 1', timeout=HEALTH_PROBE_TIMEOUT)
+        result = {'ok': True, 'latency_ms': elapsed_ms(started)}
+    except Exception as e:
+        await close_probe_connection()
+        result = {'ok': False, 'latency_ms': elapsed_ms(started), 'error': str(e) or type(e).__name__}
+    result['checked_at'] = datetime.now(timezone.utc).isoformat()
+    return result
+
+async def close_probe_connection():
+    global probe_conn
+    conn, probe_conn = probe_conn, None
+    if conn is not None:
+        conn.terminate()
+
+async def health_probe_loop():
+    global database_probe
+    while True:
+        database_probe = await probe_database()
+        await asyncio.sleep(HEALTH_PROBE_INTERVAL)
+
+def pool_stats() -> dict:
+    if db_pool is None:
+        return {}
+    size = db_pool.get_size()
+    in_use = size - db_pool.get_idle_size()
+    max_size = db_pool.get_max_size()
+    return {
+        'size': size,
+        'in_use': in_use,
+        'max_size': max_size,
+        'saturation': round(in_use / max_size, 2),
+        'saturated': in_use >= max_size,
+    }
+
+def queue_depths() -> dict:
+    return {
+        'pending_rollup_keys': sum(len(rollup.counts) for rollup in message_rollups),
+        'pending_recipient_sketches': len(pending_recipient_sketches),
+    }
+
+@api_router.get("/health/ready")
+async def readiness_check():
+    """Readiness probe: cached dependency status; pool saturation and queue depth are reported, not gated on"""
+    probe = database_probe
+    stale = probe is None or (
+        datetime.now(timezone.utc) - datetime.fromisoformat(probe['checked_at'])
+    ).total_seconds() > 3 * HEALTH_PROBE_INTERVAL
+    ready = not stale and probe['ok']
+    
+    whatsapp = system_status_snapshot['whatsapp_service']['status'] if system_status_snapshot else 'unknown'
+    body = {
+        "status": "ready" if ready else "not_ready",
+        "database": {**(probe or {}), "stale": stale},
+        "whatsapp_service": {
+            "status": whatsapp,
+            "checked_at": system_status_snapshot['collected_at'] if system_status_snapshot else None
+        },
+        "pool": pool_stats(),
+        "queues": queue_depths(),
+        "timestamp": datetime.now(timezone.utc).isoformat()
+    }
+    return JSONResponse(body, status_code=200 if ready else 503)
+
 JWT_SECRET = os.environ.get('JWT_SECRET', 'your-secret-key-change-in-production')
 JWT_ALGORITHM = 'HS256'
 WHATSAPP_SERVICE_URL = os.environ.get('WHATSAPP_SERVICE_URL', 'http://localhost:8002')
+# Comma-separated whatsapp-service nodes to shard users across; defaults to WHATSAPP_SERVICE_URL
+WHATSAPP_SERVICE_URLS = [
+    url.strip().rstrip('/') for url in os.environ.get('WHATSAPP_SERVICE_URLS', WHATSAPP_SERVICE_URL).split(',') if url.strip()
+]
+WHATSAPP_SERVICE_VNODES = int(os.environ.get('WHATSAPP_SERVICE_VNODES', '160'))
 
 class User(BaseModel):
     model_config = ConfigDict(extra="ignore")
@@ -164,6 +323,18 @@ class MessageResponse(BaseModel):
     to: str
     message: str
 
+class UserFilter(BaseModel):
+    q: Optional[str] = None
+    match: str = Field('contains', pattern='^(prefix|contains)$')
+    status: Optional[str] = None
+    role: Optional[str] = None
+
+class BulkUserAction(BaseModel):
+    action: str = Field(pattern='^(status|rate_limit|role|delete)$')
+    value: Optional[Any] = None
+    ids: Optional[List[str]] = None
+    filter: Optional[UserFilter] = None
+
 class Settings(BaseModel):
     model_config = ConfigDict(extra="ignore")
     id: str = "global_settings"
@@ -256,6 +427,489 @@ async def log_activity(user_id: str, user_email: str, action: str, details: str,
             uuid.uuid4(), uuid.UUID(user_id), user_email, action, details, ip, datetime.now(timezone.utc)
         )
 
+# Display fields (email, role, status) of users for enriching admin views.
+# Not used for authentication, so a short staleness window is acceptable.
+USER_CACHE_TTL = float(os.environ.get('USER_CACHE_TTL', '300'))
+user_cache: Dict[str, tuple] = {}  # user_id -> (expires_at, {'email', 'role', 'status'})
+
+async def get_cached_users(conn, user_ids) -> Dict[str, dict]:
+    """Look up users by id, hitting the database once for all cache misses"""
+    now = time.monotonic()
+    found = {}
+    missing = []
+    for user_id in set(user_ids):
+        entry = user_cache.get(user_id)
+        if entry and entry[0] > now:
+            found[user_id] = entry[1]
+        else:
+            try:
+                missing.append(uuid.UUID(user_id))
+            except ValueError:
+                continue
+    
+    if missing:
+        rows = await conn.fetch('SELECT id, email, role, status FROM users WHERE id = ANY($1::uuid[])', missing)
+        for row in rows:
+            user_id = str(row['id'])
+            found[user_id] = {'email': row['email'], 'role': row['role'], 'status': row['status']}
+            user_cache[user_id] = (now + USER_CACHE_TTL, found[user_id])
+    return found
+
+def invalidate_cached_users(user_ids):
+    for user_id in user_ids:
+        user_cache.pop(str(user_id), None)
+
+async def log_message(
+    user_id: str,
+    receiver_number: str,
+    message_body: str,
+    status: str,
+    source: str,
+    message_id: Optional[uuid.UUID] = None,
+    service_ms: Optional[int] = None,
+    total_ms: Optional[int] = None,
+    wa_message_id: Optional[str] = None
+):
+    created_at = datetime.now(timezone.utc)
+    region = classify_number(receiver_number)
+    message_id = message_id or uuid.uuid4()
+    pool = await get_db_pool()
+    async with pool.acquire() as conn:
+        seq = await conn.fetchval(
+            '''INSERT INTO message_logs (id, user_id, receiver_number, message_body, status, source, region, service_ms, total_ms, wa_message_id, created_at)
+               VALUES ($1, $2, $3, $4, $5, $6, $7, $8, $9, $10, $11) RETURNING seq''',
+            message_id, uuid.UUID(user_id), receiver_number, message_body, status, source,
+            region, service_ms, total_ms, wa_message_id, created_at
+        )
+    day = created_at.date()
+    message_counter_rollup.add(('all', status))
+    message_counter_rollup.add((day.isoformat(), status))
+    daily_stats_rollup.add((user_id, day, source, status))
+    quarter_hour_rollup.add((quarter_hour_bucket(created_at), source, status))
+    region_rollup.add((day, region, status))
+    user_message_counts.add((user_id, day))
+    record_recipient(user_id, day, receiver_number)
+    for metric, ms in (('service', service_ms), ('total', total_ms)):
+        if ms is not None:
+            latency_rollup.add((user_id, day, source, metric, latency_bucket(ms)))
+    
+    await emit_to_user(user_id, 'message_logged', {
+        'seq': seq,
+        'id': str(message_id),
+        'receiver_number': receiver_number,
+        'message_body': message_body,
+        'status': status,
+        'source': source,
+        'created_at': created_at.isoformat()
+    })
+
+def elapsed_ms(started: float) -> int:
+    return int((time.perf_counter() - started) * 1000)
+
+# Message rollups: sends accumulate in memory and are flushed in batches
+MESSAGE_STATS_FLUSH_INTERVAL = float(os.environ.get('MESSAGE_STATS_FLUSH_INTERVAL', '5'))
+
+# Held shared by flushes of rollups that rebuild_message_stats recomputes, and
+# exclusively by the rebuild
+ROLLUP_LOCK_ID = 72610028
+
+class PendingRollup:
+    """
+    Counts keyed by a rollup table's dimensions, upserted in one statement per flush.
+    day_of maps a key to its UTC day for rollups rebuild_message_stats recomputes;
+    pending counts for days it has rebuilt are dropped, as the rebuild counted them.
+    """
+    
+    def __init__(self, table: str, columns: List[str], types: List[str], day_of: Optional[Callable[[tuple], date]] = None):
+        self.table = table
+        self.columns = columns
+        self.types = types
+        self.day_of = day_of
+        self.counts: Dict[tuple, int] = {}
+    
+    def add(self, key: tuple, count: int = 1):
+        self.counts[key] = self.counts.get(key, 0) + count
+    
+    async def flush(self, conn):
+        if not self.counts:
+            return
+        batch, self.counts = self.counts, {}
+        try:
+            async with conn.transaction():
+                if self.day_of:
+                    await conn.execute('SELECT pg_advisory_xact_lock_shared($1)', ROLLUP_LOCK_ID)
+                    rebuilt_before = await conn.fetchval("SELECT rebuilt_before FROM message_stats_state WHERE id = 'rollups'")
+                    if rebuilt_before:
+                        batch = {key: count for key, count in batch.items() if self.day_of(key) >= rebuilt_before}
+                if batch:
+                    await conn.execute(self.statement(), *self.arrays(batch))
+        except Exception:
+            for key, count in batch.items():
+                self.add(key, count)
+            raise
+    
+    def arrays(self, batch: Dict[tuple, int]) -> list:
+        arrays = []
+        for i, column_type in enumerate(self.types):
+            values = [key[i] for key in batch]
+            arrays.append([uuid.UUID(v) for v in values] if column_type == 'uuid' else values)
+        arrays.append(list(batch.values()))
+        return arrays
+    
+    def statement(self) -> str:
+        columns = ', '.join(self.columns)
+        placeholders = ', '.join(f'${i}::{t}[]' for i, t in enumerate(self.types + ['bigint'], start=1))
+        # Joining users drops counts for accounts deleted since the send
+        join = 'JOIN users u ON u.id = d.user_id' if 'user_id' in self.columns else ''
+        return f'''
+            INSERT INTO {self.table} ({columns}, count)
+            SELECT {', '.join('d.' + c for c in self.columns)}, d.count
+            FROM unnest({placeholders}) AS d({columns}, count)
+            {join}
+            ON CONFLICT ({columns})
+            DO UPDATE SET count = {self.table}.count + EXCLUDED.count
+        '''
+
+class PendingUserMessageCounts(PendingRollup):
+    """Lifetime per-user message totals, kept on users.message_count for indexed sorting"""
+    
+    def __init__(self):
+        # Keyed by day too, so counts for rebuilt days are dropped like the daily rollup's
+        super().__init__('users', ['id', 'day'], ['uuid', 'date'], day_of=lambda key: key[1])
+    
+    def statement(self) -> str:
+        return '''
+            UPDATE users u SET message_count = u.message_count + d.count
+            FROM (
+                SELECT id, SUM(count) AS count FROM unnest($1::uuid[], $2::date[], $3::bigint[]) AS t(id, day, count)
+                GROUP BY id
+            ) d
+            WHERE u.id = d.id
+        '''
+
+daily_stats_rollup = PendingRollup(
+    'message_stats_daily', ['user_id', 'day', 'source', 'status'], ['uuid', 'date', 'text', 'text'],
+    day_of=lambda key: key[1]
+)
+# Latencies are bucketed on a log scale with LATENCY_BUCKETS_PER_OCTAVE
+# buckets per doubling, so percentiles carry at most ~19% relative error
+LATENCY_BUCKETS_PER_OCTAVE = 4
+
+def latency_bucket(ms: int) -> int:
+    return int(LATENCY_BUCKETS_PER_OCTAVE * math.log2(max(ms, 0) + 1))
+
+def latency_bucket_upper_ms(bucket: int) -> float:
+    return round(2 ** ((bucket + 1) / LATENCY_BUCKETS_PER_OCTAVE) - 1, 1)
+
+latency_rollup = PendingRollup(
+    'message_latency_daily', ['user_id', 'day', 'source', 'metric', 'bucket'], ['uuid', 'date', 'text', 'text', 'int']
+)
+# Quarter-hour buckets line up with every real UTC offset (e.g. +05:30, +05:45),
+# so local days and hours for any timezone are exact sums of buckets
+quarter_hour_rollup = PendingRollup(
+    'message_stats_quarter_hourly', ['bucket', 'source', 'status'], ['timestamptz', 'text', 'text'],
+    day_of=lambda key: key[0].date()
+)
+
+def quarter_hour_bucket(value: datetime) -> datetime:
+    return value.replace(minute=value.minute - value.minute % 15, second=0, microsecond=0)
+
+region_rollup = PendingRollup(
+    'message_stats_region_daily', ['day', 'region', 'status'], ['date', 'text', 'text'],
+    day_of=lambda key: key[0]
+)
+
+user_message_counts = PendingUserMessageCounts()
+
+# Overview totals: scope is 'all' or a UTC date (YYYY-MM-DD)
+message_counter_rollup = PendingRollup('message_counters', ['scope', 'status'], ['text', 'text'])
+
+message_rollups = [
+    daily_stats_rollup, latency_rollup, quarter_hour_rollup, region_rollup, user_message_counts, message_counter_rollup
+]
+
+class HyperLogLog:
+    """
+    HyperLogLog distinct counter with 2**p one-byte registers.
+    At the default p=12 a sketch is 4 KB with ~1.6% standard error,
+    and two sketches merge losslessly by taking the register-wise max.
+    """
+    
+    P = 12
+    _INVERSE_POWERS = [2.0 ** -r for r in range(65)]
+    
+    def __init__(self, registers: Optional[bytes] = None):
+        self.m = 1 << self.P
+        self.registers = bytearray(registers) if registers else bytearray(self.m)
+    
+    def add(self, value: str):
+        x = int.from_bytes(hashlib.blake2b(value.encode('utf-8'), digest_size=8).digest(), 'big')
+        index = x >> (64 - self.P)
+        rest = x & ((1 << (64 - self.P)) - 1)
+        rank = (64 - self.P) - rest.bit_length() + 1
+        if rank > self.registers[index]:
+            self.registers[index] = rank
+    
+    def merge(self, other: 'HyperLogLog'):
+        self.registers = bytearray(map(max, self.registers, other.registers))
+    
+    def count(self) -> int:
+        m = self.m
+        alpha = 0.7213 / (1 + 1.079 / m)
+        estimate = alpha * m * m / sum(self._INVERSE_POWERS[r] for r in self.registers)
+        zeros = self.registers.count(0)
+        if estimate <= 2.5 * m and zeros:
+            # Linear counting is more accurate for small cardinalities
+            estimate = m * math.log(m / zeros)
+        return int(round(estimate))
+    
+    def to_bytes(self) -> bytes:
+        # Sparse sketches are mostly zero registers and compress to a few bytes
+        return zlib.compress(bytes(self.registers))
+    
+    @classmethod
+    def from_bytes(cls, data: bytes) -> 'HyperLogLog':
+        return cls(zlib.decompress(data))
+
+# Unique-recipient sketches per (scope, day); scope is a user id or 'all'
+pending_recipient_sketches: Dict[tuple, HyperLogLog] = {}
+RECIPIENT_SKETCH_LOCK_ID = 72610032
+
+def record_recipient(user_id: str, day, receiver_number: str):
+    for scope in (user_id, 'all'):
+        sketch = pending_recipient_sketches.get((scope, day))
+        if sketch is None:
+            sketch = pending_recipient_sketches[(scope, day)] = HyperLogLog()
+        sketch.add(receiver_number)
+
+async def flush_recipient_sketches(conn):
+    global pending_recipient_sketches
+    if not pending_recipient_sketches:
+        return
+    batch, pending_recipient_sketches = pending_recipient_sketches, {}
+    scopes = [key[0] for key in batch]
+    days = [key[1] for key in batch]
+    try:
+        # Read-merge-write, so flushes from different workers must not interleave
+        async with conn.transaction():
+            await conn.execute('SELECT pg_advisory_xact_lock($1)', RECIPIENT_SKETCH_LOCK_ID)
+            existing = await conn.fetch('''
+                SELECT s.scope, s.day, s.registers
+                FROM recipient_sketches s
+                JOIN unnest($1::text[], $2::date[]) AS k(scope, day) ON s.scope = k.scope AND s.day = k.day
+            ''', scopes, days)
+            merged = {key: HyperLogLog(sketch.registers) for key, sketch in batch.items()}
+            for row in existing:
+                merged[(row['scope'], row['day'])].merge(HyperLogLog.from_bytes(row['registers']))
+            await conn.execute('''
+                INSERT INTO recipient_sketches (scope, day, registers)
+                SELECT * FROM unnest($1::text[], $2::date[], $3::bytea[])
+                ON CONFLICT (scope, day) DO UPDATE SET registers = EXCLUDED.registers
+            ''', scopes, days, [merged[key].to_bytes() for key in batch])
+    except Exception:
+        for key, sketch in batch.items():
+            pending = pending_recipient_sketches.setdefault(key, HyperLogLog())
+            pending.merge(sketch)
+        raise
+
+async def load_recipient_sketches(conn, scopes: List[str], from_day) -> Dict[str, Dict]:
+    """{scope: {day: HyperLogLog}} for days >= from_day, including unflushed sends"""
+    rows = await conn.fetch(
+        'SELECT scope, day, registers FROM recipient_sketches WHERE scope = ANY($1::text[]) AND day >= $2',
+        scopes, from_day
+    )
+    sketches: Dict[str, Dict] = {scope: {} for scope in scopes}
+    for row in rows:
+        sketches[row['scope']][row['day']] = HyperLogLog.from_bytes(row['registers'])
+    for (scope, day), pending in list(pending_recipient_sketches.items()):
+        if scope in sketches and day >= from_day:
+            sketches[scope].setdefault(day, HyperLogLog()).merge(pending)
+    return sketches
+
+def merge_sketches(sketches) -> HyperLogLog:
+    merged = HyperLogLog()
+    for sketch in sketches:
+        merged.merge(sketch)
+    return merged
+
+async def flush_message_stats():
+    if not pending_recipient_sketches and not any(rollup.counts for rollup in message_rollups):
+        return
+    pool = await get_db_pool()
+    async with pool.acquire() as conn:
+        errors = []
+        for rollup in message_rollups:
+            try:
+                await rollup.flush(conn)
+            except Exception as e:
+                errors.append(f'{rollup.table}: {e}')
+        try:
+            await flush_recipient_sketches(conn)
+        except Exception as e:
+            errors.append(f'recipient_sketches: {e}')
+        if errors:
+            raise RuntimeError('; '.join(errors))
+
+async def message_stats_flush_loop():
+    while True:
+        await asyncio.sleep(MESSAGE_STATS_FLUSH_INTERVAL)
+        try:
+            await flush_message_stats()
+        except Exception as e:
+            logger.error(f'[Stats] Flush failed, will retry: {e}')
+
+async def classify_message_regions(batch_size: int = 5000) -> int:
+    """Fill message_logs.region for rows written before regions were recorded"""
+    classified = 0
+    last_id = uuid.UUID(int=0)
+    pool = await get_db_pool()
+    async with pool.acquire() as conn:
+        while True:
+            # Walks the primary key once, so each batch resumes where the last stopped instead of rescanning
+            rows = await conn.fetch(
+                'SELECT id, receiver_number FROM message_logs WHERE id > $1 AND region IS NULL ORDER BY id LIMIT $2',
+                last_id, batch_size
+            )
+            if not rows:
+                break
+            last_id = rows[-1]['id']
+            await conn.execute('''
+                UPDATE message_logs m SET region = c.region
+                FROM unnest($1::uuid[], $2::text[]) AS c(id, region)
+                WHERE m.id = c.id
+            ''', [r['id'] for r in rows], [classify_number(r['receiver_number']) for r in rows])
+            classified += len(rows)
+    return classified
+
+# message_logs rows matching {where} added to the rollups rebuild_message_stats maintains
+ROLLUP_INSERTS = [
+    '''INSERT INTO message_stats_daily (user_id, day, source, status, count)
+       SELECT user_id, (created_at AT TIME ZONE 'UTC')::date, source, status, COUNT(*)
+       FROM message_logs WHERE {where}
+       GROUP BY 1, 2, 3, 4
+       ON CONFLICT (user_id, day, source, status) DO UPDATE SET count = message_stats_daily.count + EXCLUDED.count''',
+    '''INSERT INTO message_stats_quarter_hourly (bucket, source, status, count)
+       SELECT
+           date_trunc('hour', created_at) + floor(EXTRACT(MINUTE FROM created_at) / 15) * INTERVAL '15 minutes',
+           source, status, COUNT(*)
+       FROM message_logs WHERE {where}
+       GROUP BY 1, 2, 3
+       ON CONFLICT (bucket, source, status) DO UPDATE SET count = message_stats_quarter_hourly.count + EXCLUDED.count''',
+    '''INSERT INTO message_stats_region_daily (day, region, status, count)
+       SELECT (created_at AT TIME ZONE 'UTC')::date, region, status, COUNT(*)
+       FROM message_logs WHERE {where}
+       GROUP BY 1, 2, 3
+       ON CONFLICT (day, region, status) DO UPDATE SET count = message_stats_region_daily.count + EXCLUDED.count''',
+]
+
+async def count_into_rollups(conn, where: str, *args) -> int:
+    """Add the message_logs rows matching where to the rollups; returns the daily rows written"""
+    results = [await conn.execute(statement.format(where=where), *args) for statement in ROLLUP_INSERTS]
+    return int(results[0].split()[-1])
+
+async def backfill_message_stats(conn, since_ts: Optional[datetime]) -> int:
+    """
+    Count rows written before live counting began (message_stats_state.live_since,
+    set by the migration that added it) into the rollups and user totals. Runs
+    once; the caller holds the rollup lock.
+    """
+    live_since = await conn.fetchval("SELECT live_since FROM message_stats_state WHERE id = 'rollups'")
+    if live_since is None:
+        return 0
+    where, args = ('created_at < $1 AND created_at >= $2', [live_since, since_ts]) if since_ts else ('created_at < $1', [live_since])
+    inserted = await count_into_rollups(conn, where, *args)
+    await conn.execute(f'''
+        UPDATE users u SET message_count = u.message_count + t.total
+        FROM (SELECT user_id, COUNT(*) AS total FROM message_logs WHERE {where} GROUP BY user_id) t
+        WHERE u.id = t.user_id
+    ''', *args)
+    await conn.execute("UPDATE message_stats_state SET live_since = NULL WHERE id = 'rollups'")
+    return inserted
+
+async def rebuild_message_stats(since=None, missing_only: bool = False, until=None) -> int:
+    """
+    With missing_only, count the rows sent before the upgrade that introduced
+    live rollups (once). Otherwise also recompute the daily, quarter-hour and
+    region rollups from message_logs for UTC days from `since` up to, not
+    including, `until` (default today, which only live flushes count). Days
+    before `since` (or before the oldest hot row) are left alone so rollups for
+    archived days survive. Per-user lifetime totals are adjusted by the change.
+    Holds the rollup lock exclusively; flushes afterwards drop pending counts
+    for the rebuilt days, since the rebuild already counted those sends.
+    """
+    await classify_message_regions()
+    until = until or datetime.now(timezone.utc).date()
+    pool = await get_db_pool()
+    async with pool.acquire() as conn:
+        async with conn.transaction():
+            await conn.execute('SELECT pg_advisory_xact_lock($1)', ROLLUP_LOCK_ID)
+            since_ts = datetime(since.year, since.month, since.day, tzinfo=timezone.utc) if since else None
+            inserted = await backfill_message_stats(conn, since_ts)
+            if missing_only:
+                return inserted
+            
+            if since is None:
+                oldest = await conn.fetchval('SELECT MIN(created_at) FROM message_logs')
+                if oldest is None:
+                    return inserted
+                since = oldest.astimezone(timezone.utc).date()
+                since_ts = datetime(since.year, since.month, since.day, tzinfo=timezone.utc)
+            if since >= until:
+                return inserted
+            until_ts = datetime(until.year, until.month, until.day, tzinfo=timezone.utc)
+            
+            # Lifetime totals also cover archived days, so adjust them by the recounted days' difference
+            await conn.execute('CREATE TEMP TABLE rebuilt_user_totals (user_id UUID, total BIGINT) ON COMMIT DROP')
+            await conn.execute('''
+                INSERT INTO rebuilt_user_totals
+                SELECT user_id, -SUM(count) FROM message_stats_daily WHERE day >= $1 AND day < $2 GROUP BY user_id
+            ''', since, until)
+            await conn.execute('DELETE FROM message_stats_daily WHERE day >= $1 AND day < $2', since, until)
+            await conn.execute('DELETE FROM message_stats_quarter_hourly WHERE bucket >= $1 AND bucket < $2', since_ts, until_ts)
+            await conn.execute('DELETE FROM message_stats_region_daily WHERE day >= $1 AND day < $2', since, until)
+            inserted = await count_into_rollups(conn, 'created_at >= $1 AND created_at < $2', since_ts, until_ts)
+            await conn.execute('''
+                INSERT INTO rebuilt_user_totals
+                SELECT user_id, SUM(count) FROM message_stats_daily WHERE day >= $1 AND day < $2 GROUP BY user_id
+            ''', since, until)
+            await conn.execute('''
+                UPDATE users u SET message_count = u.message_count + t.total
+                FROM (SELECT user_id, SUM(total) AS total FROM rebuilt_user_totals GROUP BY user_id HAVING SUM(total) <> 0) t
+                WHERE u.id = t.user_id
+            ''')
+            await conn.execute(
+                "UPDATE message_stats_state SET rebuilt_before = GREATEST(rebuilt_before, $1) WHERE id = 'rollups'", until
+            )
+    return inserted
+
+async def migrate_schema() -> List[int]:
+    """Apply pending migrations; workers starting together wait for the first to finish them"""
+    pool = await get_db_pool()
+    async with pool.acquire() as conn:
+        applied = await apply_migrations(conn)
+        backfill_pending = await conn.fetchval("SELECT live_since IS NOT NULL FROM message_stats_state WHERE id = 'rollups'")
+    if applied:
+        logger.info(f'Applied schema migrations {applied}')
+    if backfill_pending:
+        logger.warning('Rollups and users.message_count only count sends since the upgrade; run `python manage.py backfill-rollups`')
+    return applied
+
+async def seed_message_counters():
+    """Initialise empty message counters from message_logs (migration 2 does this on install)"""
+    today = datetime.now(timezone.utc).replace(hour=0, minute=0, second=0, microsecond=0)
+    pool = await get_db_pool()
+    async with pool.acquire() as conn:
+        if await conn.fetchval("SELECT 1 FROM message_counters WHERE scope = 'all' LIMIT 1"):
+            return
+        await conn.execute('''
+            INSERT INTO message_counters (scope, status, count)
+            SELECT 'all', status, COUNT(*) FROM message_logs GROUP BY status
+            UNION ALL
+            SELECT $2, status, COUNT(*) FROM message_logs WHERE created_at >= $1 GROUP BY status
+            ON CONFLICT (scope, status) DO NOTHING
+        ''', today, today.date().isoformat())
+    logger.info('Message counters seeded from message_logs')
+
 # Create default admin user
 async def create_default_admin():
     pool = await get_db_pool()
@@ -376,15 +1030,88 @@ async def get_me(user: dict = Depends(get_current_user)):
     )
 
 # Admin - Users Management
+USER_SORTS = {
+    # sort name -> (column, cursor value parser)
+    'created_at': ('u.created_at', datetime.fromisoformat),
+    'messages': ('u.message_count', int),
+}
+
+def encode_cursor(value, user_id) -> str:
+    raw = json.dumps([value.isoformat() if isinstance(value, datetime) else value, str(user_id)])
+    return base64.urlsafe_b64encode(raw.encode('utf-8')).decode('ascii')
+
+def decode_cursor(cursor: str, parse_value) -> tuple:
+    try:
+        value, user_id = json.loads(base64.urlsafe_b64decode(cursor.encode('ascii')))
+        return parse_value(value), uuid.UUID(user_id)
+    except (ValueError, TypeError):
+        raise HTTPException(status_code=400, detail='Invalid cursor')
+
+def escape_like(value: str) -> str:
+    return value.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
+
+def build_user_filters(q: Optional[str], match: str, status: Optional[str], role: Optional[str]) -> tuple:
+    """WHERE conditions and values for the users list filters, shared with bulk operations"""
+    conditions = []
+    values = []
+    if q:
+        # Prefix search uses idx_users_email_lower, substring search the trigram index
+        pattern = escape_like(q.lower()) + '%'
+        if match == 'contains':
+            pattern = '%' + pattern
+        values.append(pattern)
+        conditions.append(f'lower(u.email) LIKE ${len(values)}')
+    if status:
+        statuses = ['suspended', 'deactive'] if status in ('suspended', 'deactive') else [status]
+        values.append(statuses)
+        conditions.append(f'u.status = ANY(${len(values)}::text[])')
+    if role:
+        values.append(role)
+        conditions.append(f'u.role = ${len(values)}')
+    return conditions, values
+
 @api_router.get('/admin/users')
-async def get_all_users(admin: dict = Depends(get_admin_user), skip: int = 0, limit: int = 50):
+async def get_all_users(
+    admin: dict = Depends(get_admin_user),
+    skip: int = 0,
+    limit: int = 50,
+    q: Optional[str] = None,
+    match: str = Query('contains', pattern='^(prefix|contains)$'),
+    status: Optional[str] = None,
+    role: Optional[str] = None,
+    sort: str = Query('created_at', pattern='^(created_at|messages)$'),
+    cursor: Optional[str] = None
+):
+    sort_column, parse_cursor_value = USER_SORTS[sort]
+    conditions, values = build_user_filters(q, match, status, role)
+    filter_sql = f"WHERE {' AND '.join(conditions)}" if conditions else ''
+    
+    page_conditions = list(conditions)
+    page_values = list(values)
+    if cursor:
+        cursor_value, cursor_id = decode_cursor(cursor, parse_cursor_value)
+        page_values.extend([cursor_value, cursor_id])
+        page_conditions.append(f'({sort_column}, u.id) < (${len(page_values) - 1}, ${len(page_values)})')
+    page_where = f"WHERE {' AND '.join(page_conditions)}" if page_conditions else ''
+    page_values.append(limit)
+    offset_sql = ''
+    if not cursor and skip:
+        page_values.append(skip)
+        offset_sql = f'OFFSET ${len(page_values)}'
+    
     pool = await get_db_pool()
     async with pool.acquire() as conn:
         users = await conn.fetch(
-            'SELECT id, email, api_key, role, status, rate_limit, plain_password, created_at FROM users ORDER BY created_at DESC LIMIT $1 OFFSET $2',
-            limit, skip
+            f'''SELECT u.id, u.email, u.api_key, u.role, u.status, u.rate_limit, u.plain_password, u.message_count, u.created_at
+                FROM users u {page_where}
+                ORDER BY {sort_column} DESC, u.id DESC
+                LIMIT ${len(page_values) - (1 if offset_sql else 0)} {offset_sql}''',
+            *page_values
         )
-        total = await conn.fetchval('SELECT COUNT(*) FROM users')
+        # Counting the whole filtered set costs as much as an OFFSET scan, so only the first page does it
+        total = None
+        if not cursor:
+            total = await conn.fetchval(f'SELECT COUNT(*) FROM users u {filter_sql}', *values)
     
     users_list = []
     for u in users:
@@ -392,7 +1119,12 @@ async def get_all_users(admin: dict = Depends(get_admin_user), skip: int = 0, li
         user_dict['id'] = str(user_dict['id'])
         users_list.append(user_dict)
     
-    return {'users': users_list, 'total': total}
+    next_cursor = None
+    if len(users) == limit:
+        last = users[-1]
+        next_cursor = encode_cursor(last['created_at'] if sort == 'created_at' else last['message_count'], last['id'])
+    
+    return {'users': users_list, 'total': total, 'next_cursor': next_cursor}
 
 @api_router.get('/admin/users/{user_id}')
 async def get_user_by_id(user_id: str, admin: dict = Depends(get_admin_user)):
@@ -434,6 +1166,7 @@ async def update_user(user_id: str, updates: dict, admin: dict = Depends(get_adm
         values.append(uuid.UUID(user_id))
         query = f"UPDATE users SET {', '.join(set_clauses)} WHERE id = ${len(values)}"
         await conn.execute(query, *values)
+    invalidate_cached_users([user_id])
     
     await log_activity(admin['id'], admin['email'], 'USER_UPDATED', f'Updated user {target_user["email"]}: {update_data}')
     return {'success': True, 'message': 'User updated'}
@@ -450,10 +1183,72 @@ async def delete_user(user_id: str, admin: dict = Depends(get_admin_user)):
             raise HTTPException(status_code=404, detail='User not found')
         
         await conn.execute('DELETE FROM users WHERE id = $1', uuid.UUID(user_id))
+    invalidate_cached_users([user_id])
     
     await log_activity(admin['id'], admin['email'], 'USER_DELETED', f'Deleted user {target_user["email"]}')
     return {'success': True, 'message': 'User deleted'}
 
+BULK_ACTION_VALIDATORS = {
+    'status': lambda v: v in ('active', 'deactive', 'suspended'),
+    'role': lambda v: v in ('user', 'admin'),
+    'rate_limit': lambda v: isinstance(v, int) and not isinstance(v, bool) and v > 0,
+}
+
+@api_router.post('/admin/users/bulk')
+async def bulk_update_users(body: BulkUserAction, admin: dict = Depends(get_admin_user)):
+    """
+    Apply one status, rate limit, role or delete action to many users in a
+    single statement. Targets are either explicit ids or a users-list filter.
+    The calling admin is always excluded.
+    """
+    if (body.ids is None) == (body.filter is None):
+        raise HTTPException(status_code=400, detail='Provide either ids or filter')
+    if body.action != 'delete' and not BULK_ACTION_VALIDATORS[body.action](body.value):
+        raise HTTPException(status_code=400, detail=f'Invalid value for {body.action}')
+    
+    if body.ids is not None:
+        try:
+            conditions, values = ['u.id = ANY($1::uuid[])'], [[uuid.UUID(i) for i in body.ids]]
+        except ValueError:
+            raise HTTPException(status_code=400, detail='Invalid user id')
+    else:
+        conditions, values = build_user_filters(body.filter.q, body.filter.match, body.filter.status, body.filter.role)
+        if not conditions:
+            raise HTTPException(status_code=400, detail='Filter must not be empty')
+    values.append(uuid.UUID(admin['id']))
+    conditions.append(f'u.id <> ${len(values)}')
+    where = ' AND '.join(conditions)
+    
+    if body.action == 'delete':
+        query = f'DELETE FROM users u WHERE {where} RETURNING u.id, u.email'
+        action, describe = 'USER_DELETED', lambda email: f'Deleted user {email} (bulk)'
+    else:
+        values.append(body.value)
+        query = f'UPDATE users u SET {body.action} = ${len(values)} WHERE {where} RETURNING u.id, u.email'
+        change = {body.action: body.value}
+        action, describe = 'USER_UPDATED', lambda email: f'Updated user {email} (bulk): {change}'
+    
+    pool = await get_db_pool()
+    async with pool.acquire() as conn:
+        async with conn.transaction():
+            affected = await conn.fetch(query, *values)
+            if affected:
+                now = datetime.now(timezone.utc)
+                await conn.execute('''
+                    INSERT INTO activity_logs (id, user_id, user_email, action, details, created_at)
+                    SELECT * FROM unnest($1::uuid[], $2::uuid[], $3::text[], $4::text[], $5::text[], $6::timestamptz[])
+                ''',
+                    [uuid.uuid4() for _ in affected],
+                    [uuid.UUID(admin['id'])] * len(affected),
+                    [admin['email']] * len(affected),
+                    [action] * len(affected),
+                    [describe(r['email']) for r in affected],
+                    [now] * len(affected)
+                )
+    
+    invalidate_cached_users(r['id'] for r in affected)
+    return {'success': True, 'affected': len(affected), 'ids': [str(r['id']) for r in affected]}
+
 @api_router.post('/admin/users')
 async def create_user_by_admin(user_data: dict, admin: dict = Depends(get_admin_user)):
     email = user_data.get('email')
@@ -589,29 +1384,132 @@ async def change_password(password_data: PasswordChangeRequest, user: dict = Dep
     return {'success': True, 'message': 'Password changed successfully'}
 
 # Admin - Analytics
+class ResponseCache:
+    """
+    Keyed cache with stale-while-revalidate semantics.
+    Fresh entries are served as-is; stale ones are served while a single
+    background task recomputes them; concurrent misses share one computation.
+    """
+    
+    def __init__(self, ttl: float, stale_ttl: float, max_entries: int = 256):
+        self.ttl = ttl
+        self.stale_ttl = stale_ttl
+        self.max_entries = max_entries
+        self.entries: Dict[tuple, tuple] = {}  # key -> (computed_at, value)
+        self.inflight: Dict[tuple, asyncio.Task] = {}
+    
+    async def get(self, key: tuple, compute):
+        """Return (value, age_in_seconds)"""
+        entry = self.entries.get(key)
+        if entry:
+            age = time.monotonic() - entry[0]
+            if age < self.ttl:
+                return entry[1], age
+            if age < self.ttl + self.stale_ttl:
+                self._refresh(key, compute)
+                return entry[1], age
+        value = await asyncio.shield(self._refresh(key, compute))
+        return value, 0.0
+    
+    def _refresh(self, key: tuple, compute) -> asyncio.Task:
+        task = self.inflight.get(key)
+        if task is None:
+            task = asyncio.create_task(self._compute(key, compute))
+            task.add_done_callback(self._log_failure)
+            self.inflight[key] = task
+        return task
+    
+    async def _compute(self, key: tuple, compute):
+        try:
+            value = await compute()
+            if key not in self.entries and len(self.entries) >= self.max_entries:
+                oldest = min(self.entries, key=lambda k: self.entries[k][0])
+                del self.entries[oldest]
+            self.entries[key] = (time.monotonic(), value)
+            return value
+        finally:
+            self.inflight.pop(key, None)
+    
+    @staticmethod
+    def _log_failure(task: asyncio.Task):
+        if not task.cancelled() and task.exception():
+            logger.error(f'[Cache] Recomputation failed: {task.exception()}')
+
+ANALYTICS_CACHE_TTL = float(os.environ.get('ANALYTICS_CACHE_TTL', '10'))
+ANALYTICS_CACHE_STALE_TTL = float(os.environ.get('ANALYTICS_CACHE_STALE_TTL', '60'))
+analytics_cache = ResponseCache(ANALYTICS_CACHE_TTL, ANALYTICS_CACHE_STALE_TTL)
+
+async def cached_analytics(response: Response, key: tuple, compute):
+    value, age = await analytics_cache.get(key, compute)
+    response.headers['X-Cache-Age'] = str(int(age))
+    return value
+
+def parse_timezone(tz: str) -> ZoneInfo:
+    try:
+        return ZoneInfo(tz)
+    except (ZoneInfoNotFoundError, ValueError):
+        raise HTTPException(status_code=400, detail=f'Unknown timezone: {tz}')
+
+def local_midnight(tz: ZoneInfo, days_ago: int = 0) -> datetime:
+    """Start of the local day `days_ago` days before today in tz, as a UTC datetime"""
+    local_day = datetime.now(tz).date() - timedelta(days=days_ago)
+    return datetime(local_day.year, local_day.month, local_day.day, tzinfo=tz).astimezone(timezone.utc)
+
+async def count_messages_since(conn, since: datetime) -> int:
+    """Message count from quarter-hour buckets (since must be on a quarter hour)"""
+    count = await conn.fetchval(
+        'SELECT COALESCE(SUM(count), 0) FROM message_stats_quarter_hourly WHERE bucket >= $1', since
+    )
+    return count + sum(c for (bucket, _, _), c in list(quarter_hour_rollup.counts.items()) if bucket >= since)
+
 @api_router.get('/admin/analytics/overview')
-async def get_analytics_overview(admin: dict = Depends(get_admin_user)):
+async def get_analytics_overview(response: Response, admin: dict = Depends(get_admin_user), tz: str = 'UTC'):
+    zone = parse_timezone(tz)
+    return await cached_analytics(response, ('overview', tz), lambda: compute_analytics_overview(zone))
+
+async def compute_analytics_overview(zone: ZoneInfo):
+    today = datetime.now(timezone.utc).date().isoformat()
+    
     pool = await get_db_pool()
     async with pool.acquire() as conn:
-        total_users = await conn.fetchval('SELECT COUNT(*) FROM users')
-        active_users = await conn.fetchval("SELECT COUNT(*) FROM users WHERE status = 'active'")
-        deactive_users = await conn.fetchval("SELECT COUNT(*) FROM users WHERE status IN ('suspended', 'deactive')")
-        
-        total_messages = await conn.fetchval('SELECT COUNT(*) FROM message_logs')
-        sent_messages = await conn.fetchval("SELECT COUNT(*) FROM message_logs WHERE status = 'sent'")
-        failed_messages = await conn.fetchval("SELECT COUNT(*) FROM message_logs WHERE status = 'failed'")
-        
-        today = datetime.now(timezone.utc).replace(hour=0, minute=0, second=0, microsecond=0)
-        messages_today = await conn.fetchval(
-            'SELECT COUNT(*) FROM message_logs WHERE created_at >= $1',
+        users = await conn.fetchrow('''
+            SELECT
+                COUNT(*) AS total,
+                COUNT(*) FILTER (WHERE status = 'active') AS active,
+                COUNT(*) FILTER (WHERE status IN ('suspended', 'deactive')) AS deactive
+            FROM users
+        ''')
+        counters = await conn.fetch(
+            "SELECT scope, status, count FROM message_counters WHERE scope IN ('all', $1)",
             today
         )
+        # Daily counters are kept per UTC day; other timezones sum quarter-hour buckets
+        local_today = None if zone.key == 'UTC' else await count_messages_since(conn, local_midnight(zone))
+    
+    # Sends not yet flushed by this worker are added on top
+    totals: Dict[tuple, int] = {(row['scope'], row['status']): row['count'] for row in counters}
+    for key, count in list(message_counter_rollup.counts.items()):
+        if key[0] in ('all', today):
+            totals[key] = totals.get(key, 0) + count
+    
+    total_messages = sent_messages = failed_messages = messages_today = 0
+    for (scope, status), count in totals.items():
+        if scope == 'all':
+            total_messages += count
+            if status == 'sent':
+                sent_messages = count
+            elif status == 'failed':
+                failed_messages = count
+        else:
+            messages_today += count
+    if local_today is not None:
+        messages_today = local_today
     
     return {
         'users': {
-            'total': total_users,
-            'active': active_users,
-            'deactive': deactive_users
+            'total': users['total'],
+            'active': users['active'],
+            'deactive': users['deactive']
         },
         'messages': {
             'total': total_messages,
@@ -623,120 +1521,680 @@ async def get_analytics_overview(admin: dict = Depends(get_admin_user)):
     }
 
 @api_router.get('/admin/analytics/messages')
-async def get_message_analytics(admin: dict = Depends(get_admin_user), days: int = 7):
-    from_date = datetime.now(timezone.utc) - timedelta(days=days)
+async def get_message_analytics(response: Response, admin: dict = Depends(get_admin_user), days: int = 7, tz: str = 'UTC'):
+    zone = parse_timezone(tz)
+    if zone.key != 'UTC':
+        return await cached_analytics(response, ('messages', days, tz), lambda: compute_local_message_analytics(days, zone))
+    return await cached_analytics(response, ('messages', days), lambda: compute_message_analytics(days))
+
+async def compute_local_message_analytics(days: int, zone: ZoneInfo):
+    from_ts = local_midnight(zone, days)
     
     pool = await get_db_pool()
     async with pool.acquire() as conn:
         results = await conn.fetch('''
-            SELECT 
-                DATE(created_at) as date,
-                COUNT(*) as total,
-                SUM(CASE WHEN status = 'sent' THEN 1 ELSE 0 END) as sent,
-                SUM(CASE WHEN status = 'failed' THEN 1 ELSE 0 END) as failed
-            FROM message_logs 
-            WHERE created_at >= $1
-            GROUP BY DATE(created_at)
-            ORDER BY date
-        ''', from_date)
-    
-    return [{'_id': str(r['date']), 'total': r['total'], 'sent': r['sent'], 'failed': r['failed']} for r in results]
+            SELECT
+                (bucket AT TIME ZONE $2)::date AS day,
+                SUM(count) AS total,
+                COALESCE(SUM(count) FILTER (WHERE status = 'sent'), 0) AS sent,
+                COALESCE(SUM(count) FILTER (WHERE status = 'failed'), 0) AS failed
+            FROM message_stats_quarter_hourly
+            WHERE bucket >= $1
+            GROUP BY 1
+        ''', from_ts, zone.key)
+    
+    by_day = {r['day']: {'total': r['total'], 'sent': r['sent'], 'failed': r['failed']} for r in results}
+    for (bucket, source, status), count in list(quarter_hour_rollup.counts.items()):
+        if bucket < from_ts:
+            continue
+        stats = by_day.setdefault(bucket.astimezone(zone).date(), {'total': 0, 'sent': 0, 'failed': 0})
+        stats['total'] += count
+        if status in ('sent', 'failed'):
+            stats[status] += count
+    
+    return [{'_id': str(day), **by_day[day]} for day in sorted(by_day)]
 
+async def compute_message_analytics(days: int):
+    from_day = (datetime.now(timezone.utc) - timedelta(days=days)).date()
+    
+    pool = await get_db_pool()
+    async with pool.acquire() as conn:
+        results = await conn.fetch('''
+            SELECT
+                day,
+                SUM(count) AS total,
+                COALESCE(SUM(count) FILTER (WHERE status = 'sent'), 0) AS sent,
+                COALESCE(SUM(count) FILTER (WHERE status = 'failed'), 0) AS failed
+            FROM message_stats_daily
+            WHERE day >= $1
+            GROUP BY day
+        ''', from_day)
+    
+    by_day = {r['day']: {'total': r['total'], 'sent': r['sent'], 'failed': r['failed']} for r in results}
+    # Merge sends that have not been flushed to the rollup yet
+    for (user_id, day, source, status), count in list(daily_stats_rollup.counts.items()):
+        if day < from_day:
+            continue
+        stats = by_day.setdefault(day, {'total': 0, 'sent': 0, 'failed': 0})
+        stats['total'] += count
+        if status in ('sent', 'failed'):
+            stats[status] += count
+    
+    return [{'_id': str(day), **by_day[day]} for day in sorted(by_day)]
+
+# Only the quarter-hour rollup can be regrouped into local days, and it has no
+# user, region, latency or recipient breakdown; users-activity, recipients,
+# regions and latency therefore cover the last `days` UTC days, and the
+# dashboard labels them as such
 @api_router.get('/admin/analytics/users-activity')
-async def get_users_activity(admin: dict = Depends(get_admin_user), days: int = 7):
-    from_date = datetime.now(timezone.utc) - timedelta(days=days)
+async def get_users_activity(response: Response, admin: dict = Depends(get_admin_user), days: int = 7):
+    return await cached_analytics(response, ('users-activity', days), lambda: compute_users_activity(days))
+
+async def compute_users_activity(days: int):
+    from_day = (datetime.now(timezone.utc) - timedelta(days=days)).date()
+    
+    pending_by_user: Dict[str, int] = {}
+    for (user_id, day, source, status), count in list(daily_stats_rollup.counts.items()):
+        if day >= from_day:
+            pending_by_user[user_id] = pending_by_user.get(user_id, 0) + count
     
     pool = await get_db_pool()
     async with pool.acquire() as conn:
+        # Any user in the true top 10 without pending sends ranks within
+        # the first 10 + len(pending_by_user) rollup rows
         results = await conn.fetch('''
-            SELECT ml.user_id, COUNT(*) as message_count, u.email
-            FROM message_logs ml
-            LEFT JOIN users u ON ml.user_id = u.id
-            WHERE ml.created_at >= $1
-            GROUP BY ml.user_id, u.email
+            SELECT user_id, SUM(count) AS message_count
+            FROM message_stats_daily
+            WHERE day >= $1
+            GROUP BY user_id
             ORDER BY message_count DESC
-            LIMIT 10
-        ''', from_date)
+            LIMIT $2
+        ''', from_day, 10 + len(pending_by_user))
+        totals = {str(r['user_id']): r['message_count'] for r in results}
+        
+        if pending_by_user:
+            pending_totals = await conn.fetch('''
+                SELECT user_id, SUM(count) AS message_count
+                FROM message_stats_daily
+                WHERE day >= $1 AND user_id = ANY($2::uuid[])
+                GROUP BY user_id
+            ''', from_day, [uuid.UUID(u) for u in pending_by_user])
+            totals.update({str(r['user_id']): r['message_count'] for r in pending_totals})
+            for user_id, count in pending_by_user.items():
+                totals[user_id] = totals.get(user_id, 0) + count
+        
+        top_users = sorted(totals.items(), key=lambda item: item[1], reverse=True)[:10]
+        users = await get_cached_users(conn, [user_id for user_id, _ in top_users])
+        sketches = await load_recipient_sketches(conn, [user_id for user_id, _ in top_users], from_day)
+    
+    email_by_id = {user_id: u['email'] for user_id, u in users.items()}
+    return [
+        {
+            '_id': user_id,
+            'message_count': count,
+            'email': email_by_id.get(user_id) or 'Unknown',
+            'unique_recipients': merge_sketches(sketches[user_id].values()).count()
+        }
+        for user_id, count in top_users
+    ]
+
+@api_router.get('/admin/analytics/recipients')
+async def get_recipient_analytics(
+    response: Response,
+    admin: dict = Depends(get_admin_user),
+    days: int = 7,
+    user_id: Optional[str] = None
+):
+    try:
+        scope = str(uuid.UUID(user_id)) if user_id else 'all'
+    except ValueError:
+        raise HTTPException(status_code=400, detail='Invalid user_id')
+    return await cached_analytics(response, ('recipients', days, scope), lambda: compute_recipient_analytics(days, scope))
+
+async def compute_recipient_analytics(days: int, scope: str):
+    """Approximate unique recipients per day and over the whole range"""
+    from_day = (datetime.now(timezone.utc) - timedelta(days=days)).date()
+    
+    pool = await get_db_pool()
+    async with pool.acquire() as conn:
+        by_day = (await load_recipient_sketches(conn, [scope], from_day))[scope]
+    
+    return {
+        'scope': scope,
+        'unique_recipients': merge_sketches(by_day.values()).count(),
+        'days': [{'_id': str(day), 'unique_recipients': by_day[day].count()} for day in sorted(by_day)]
+    }
+
+@api_router.get('/admin/analytics/heatmap')
+async def get_message_heatmap(response: Response, admin: dict = Depends(get_admin_user), days: int = 28, tz: str = 'UTC'):
+    zone = parse_timezone(tz)
+    return await cached_analytics(response, ('heatmap', days, tz), lambda: compute_message_heatmap(days, zone))
+
+async def compute_message_heatmap(days: int, zone: ZoneInfo):
+    """Messages per local hour of day (0-23) and ISO weekday (1 = Monday)"""
+    from_ts = local_midnight(zone, days)
+    
+    pool = await get_db_pool()
+    async with pool.acquire() as conn:
+        results = await conn.fetch('''
+            SELECT
+                EXTRACT(ISODOW FROM bucket AT TIME ZONE $2)::int AS weekday,
+                EXTRACT(HOUR FROM bucket AT TIME ZONE $2)::int AS hour,
+                SUM(count) AS total,
+                COALESCE(SUM(count) FILTER (WHERE status = 'sent'), 0) AS sent,
+                COALESCE(SUM(count) FILTER (WHERE status = 'failed'), 0) AS failed
+            FROM message_stats_quarter_hourly
+            WHERE bucket >= $1
+            GROUP BY 1, 2
+        ''', from_ts, zone.key)
+    
+    cells = {(r['weekday'], r['hour']): {'total': r['total'], 'sent': r['sent'], 'failed': r['failed']} for r in results}
+    for (bucket, source, status), count in list(quarter_hour_rollup.counts.items()):
+        if bucket < from_ts:
+            continue
+        local = bucket.astimezone(zone)
+        cell = cells.setdefault((local.isoweekday(), local.hour), {'total': 0, 'sent': 0, 'failed': 0})
+        cell['total'] += count
+        if status in ('sent', 'failed'):
+            cell[status] += count
+    
+    return {
+        'tz': zone.key,
+        'days': days,
+        'cells': [{'weekday': weekday, 'hour': hour, **cells[(weekday, hour)]} for weekday, hour in sorted(cells)]
+    }
+
+@api_router.get('/admin/analytics/regions')
+async def get_region_analytics(response: Response, admin: dict = Depends(get_admin_user), days: int = 7):
+    return await cached_analytics(response, ('regions', days), lambda: compute_region_analytics(days))
+
+async def compute_region_analytics(days: int):
+    """Sent/failed per recipient region, busiest first"""
+    from_day = (datetime.now(timezone.utc) - timedelta(days=days)).date()
+    
+    pool = await get_db_pool()
+    async with pool.acquire() as conn:
+        results = await conn.fetch('''
+            SELECT
+                region,
+                SUM(count) AS total,
+                COALESCE(SUM(count) FILTER (WHERE status = 'sent'), 0) AS sent,
+                COALESCE(SUM(count) FILTER (WHERE status = 'failed'), 0) AS failed
+            FROM message_stats_region_daily
+            WHERE day >= $1
+            GROUP BY region
+        ''', from_day)
     
-    return [{'_id': str(r['user_id']), 'message_count': r['message_count'], 'email': r['email'] or 'Unknown'} for r in results]
+    by_region = {r['region']: {'total': r['total'], 'sent': r['sent'], 'failed': r['failed']} for r in results}
+    for (day, region, status), count in list(region_rollup.counts.items()):
+        if day < from_day:
+            continue
+        stats = by_region.setdefault(region, {'total': 0, 'sent': 0, 'failed': 0})
+        stats['total'] += count
+        if status in ('sent', 'failed'):
+            stats[status] += count
+    
+    regions = [
+        {
+            'region': region,
+            'country': region.split('-')[0],
+            **stats,
+            'failure_rate': round(stats['failed'] / stats['total'] * 100 if stats['total'] else 0, 2)
+        }
+        for region, stats in by_region.items()
+    ]
+    regions.sort(key=lambda r: r['total'], reverse=True)
+    return regions
+
+@api_router.get('/admin/analytics/latency')
+async def get_latency_analytics(
+    response: Response,
+    admin: dict = Depends(get_admin_user),
+    days: int = 7,
+    group_by: str = Query('source', pattern='^(user|source|day)$'),
+    metric: str = Query('total', pattern='^(total|service)$')
+):
+    return await cached_analytics(
+        response, ('latency', days, group_by, metric),
+        lambda: compute_latency_analytics(days, group_by, metric)
+    )
+
+def latency_summary(histogram: Dict[int, int]) -> dict:
+    """Percentiles and histogram from bucket counts; each percentile is its bucket's upper bound"""
+    total = sum(histogram.values())
+    buckets = sorted(histogram)
+    percentiles = {}
+    for name, q in (('p50', 0.5), ('p90', 0.9), ('p99', 0.99)):
+        cumulative = 0
+        for bucket in buckets:
+            cumulative += histogram[bucket]
+            if cumulative >= q * total:
+                percentiles[name] = latency_bucket_upper_ms(bucket)
+                break
+    return {
+        'count': total,
+        **percentiles,
+        'histogram': [{'le_ms': latency_bucket_upper_ms(b), 'count': histogram[b]} for b in buckets]
+    }
+
+async def compute_latency_analytics(days: int, group_by: str, metric: str):
+    from_day = (datetime.now(timezone.utc) - timedelta(days=days)).date()
+    group_column = {'user': 'user_id', 'source': 'source', 'day': 'day'}[group_by]
+    
+    pool = await get_db_pool()
+    async with pool.acquire() as conn:
+        results = await conn.fetch(f'''
+            SELECT {group_column} AS group_key, bucket, SUM(count) AS count
+            FROM message_latency_daily
+            WHERE day >= $1 AND metric = $2
+            GROUP BY 1, 2
+        ''', from_day, metric)
+    
+    histograms: Dict[str, Dict[int, int]] = {}
+    for r in results:
+        group = histograms.setdefault(str(r['group_key']), {})
+        group[r['bucket']] = group.get(r['bucket'], 0) + r['count']
+    for (user_id, day, source, row_metric, bucket), count in list(latency_rollup.counts.items()):
+        if day < from_day or row_metric != metric:
+            continue
+        group_key = {'user': user_id, 'source': source, 'day': str(day)}[group_by]
+        group = histograms.setdefault(group_key, {})
+        group[bucket] = group.get(bucket, 0) + count
+    
+    groups = [{'key': key, **latency_summary(histogram)} for key, histogram in histograms.items()]
+    if group_by == 'user' and groups:
+        async with pool.acquire() as conn:
+            users = await get_cached_users(conn, [g['key'] for g in groups])
+        for g in groups:
+            g['email'] = users[g['key']]['email'] if g['key'] in users else 'Unknown'
+    
+    groups.sort(key=lambda g: g['key'] if group_by == 'day' else -g['count'])
+    return {'metric': metric, 'group_by': group_by, 'groups': groups}
+
+# WhatsApp service nodes
+# Users are placed on nodes by a consistent hash ring. The placement is
+# stored in whatsapp_assignments, so a user stays with the node holding
+# their session until a rebalance migrates it there. Workers cache
+# assignments for SERVICE_ASSIGNMENT_TTL seconds; a migration marks the
+# user draining and waits that long before stopping the session, so no
+# worker is still routing to the old node when it goes.
+SERVICE_ASSIGNMENT_TTL = float(os.environ.get('SERVICE_ASSIGNMENT_TTL', '10'))
+SERVICE_MIGRATION_WAIT = float(os.environ.get('SERVICE_MIGRATION_WAIT', '90'))
+REBALANCE_CONCURRENCY = int(os.environ.get('REBALANCE_CONCURRENCY', '2'))
+service_ring = HashRing(WHATSAPP_SERVICE_URLS, WHATSAPP_SERVICE_VNODES)
+# user_id -> (node, draining, cached_at)
+service_assignments: Dict[str, tuple] = {}
+rebalance_task: Optional[asyncio.Task] = None
+rebalance_status: Optional[dict] = None
+
+def service_headers() -> dict:
+    return {'X-Internal-Secret': INTERNAL_EVENT_SECRET} if INTERNAL_EVENT_SECRET else {}
+
+async def load_service_assignment(user_id: str) -> tuple:
+    pool = await get_db_pool()
+    async with pool.acquire() as conn:
+        row = await conn.fetchrow('SELECT node, draining FROM whatsapp_assignments WHERE user_id = $1', user_id)
+        if row is None or row['node'] not in service_ring.nodes:
+            # First use, or the assigned node has been removed from WHATSAPP_SERVICE_URLS
+            row = await conn.fetchrow(
+                '''INSERT INTO whatsapp_assignments (user_id, node) VALUES ($1, $2)
+                   ON CONFLICT (user_id) DO UPDATE SET node = EXCLUDED.node, draining = FALSE, assigned_at = NOW()
+                   WHERE whatsapp_assignments.node <> ALL($3::text[])
+                   RETURNING node, draining''',
+                user_id, service_ring.node_for(user_id), service_ring.nodes
+            ) or await conn.fetchrow('SELECT node, draining FROM whatsapp_assignments WHERE user_id = $1', user_id)
+    entry = (row['node'], row['draining'], time.monotonic())
+    service_assignments[user_id] = entry
+    return entry
+
+async def service_url_for(user_id: str) -> str:
+    """Node holding user_id's session, waiting while a rebalance migrates it"""
+    if len(service_ring.nodes) == 1:
+        return service_ring.nodes[0]
+    entry = service_assignments.get(user_id)
+    if entry is None or time.monotonic() - entry[2] > SERVICE_ASSIGNMENT_TTL:
+        entry = await load_service_assignment(user_id)
+    deadline = time.monotonic() + SERVICE_MIGRATION_WAIT
+    while entry[1]:
+        if time.monotonic() > deadline:
+            raise HTTPException(status_code=503, detail='WhatsApp session is being moved to another server, please retry shortly')
+        await asyncio.sleep(0.5)
+        entry = await load_service_assignment(user_id)
+    return entry[0]
+
+async def fetch_node_sessions(node: str) -> List[dict]:
+    session = get_http_session()
+    async with session.get(f'{node}/admin/sessions', timeout=aiohttp.ClientTimeout(total=10)) as response:
+        sessions = (await response.json()).get('sessions', [])
+    for entry in sessions:
+        entry['node'] = node
+    return sessions
+
+async def fetch_all_sessions() -> tuple:
+    """Sessions listed by every node, and the nodes that could not be listed"""
+    results = await asyncio.gather(*(fetch_node_sessions(node) for node in service_ring.nodes), return_exceptions=True)
+    sessions: List[dict] = []
+    failed: List[str] = []
+    for node, result in zip(service_ring.nodes, results):
+        if isinstance(result, Exception):
+            failed.append(node)
+        else:
+            sessions.extend(result)
+    return sessions, failed
+
+async def record_service_assignments(sessions: List[dict]):
+    """Assign live sessions that have no assignment yet to the node they are on"""
+    listed = [(entry['userId'], entry['node']) for entry in sessions if entry.get('userId')]
+    if not listed:
+        return
+    pool = await get_db_pool()
+    async with pool.acquire() as conn:
+        await conn.execute(
+            '''INSERT INTO whatsapp_assignments (user_id, node)
+               SELECT u.id, s.node FROM unnest($1::uuid[], $2::text[]) AS s(user_id, node)
+               JOIN users u ON u.id = s.user_id
+               ON CONFLICT (user_id) DO NOTHING''',
+            [user_id for user_id, _ in listed], [node for _, node in listed]
+        )
+
+async def import_session(node: str, user_id: str, archive: bytes, start: bool = True):
+    """Unpack a session's auth data on node; start=False leaves a hibernated session stopped"""
+    params = {'userId': user_id} if start else {'userId': user_id, 'start': 'false'}
+    session = get_http_session()
+    async with session.post(
+        f'{node}/sessions/import', params=params, data=archive,
+        headers={'Content-Type': 'application/gzip'},
+        timeout=aiohttp.ClientTimeout(total=SERVICE_MIGRATION_WAIT)
+    ) as response:
+        if response.status != 200:
+            raise RuntimeError(f'import on {node} returned {response.status}')
+
+async def migrate_session(user_id: str, source: str, target: str) -> str:
+    """
+    Drain user_id's session on source and move it, with its LocalAuth data,
+    to target. Returns 'moved', 'reassigned' (nothing to move), 'skipped'
+    (already moving or moved elsewhere) or 'failed' (left on source).
+    """
+    pool = await get_db_pool()
+    async with pool.acquire() as conn:
+        claimed = await conn.fetchval(
+            '''UPDATE whatsapp_assignments SET draining = TRUE
+               WHERE user_id = $1 AND node = $2 AND NOT draining RETURNING user_id''',
+            user_id, source
+        )
+    if not claimed:
+        return 'skipped'
+    
+    node, outcome = source, 'failed'
+    try:
+        await asyncio.sleep(SERVICE_ASSIGNMENT_TTL)
+        archive = None
+        session = get_http_session()
+        try:
+            # The node stops the session once in-flight sends finish and returns its auth data
+            async with session.post(
+                f'{source}/sessions/export', json={'userId': user_id},
+                timeout=aiohttp.ClientTimeout(total=SERVICE_MIGRATION_WAIT)
+            ) as response:
+                if response.status == 200:
+                    archive = await response.read()
+                elif response.status != 404:
+                    raise RuntimeError(f'export on {source} returned {response.status}')
+        except aiohttp.ClientError:
+            # A removed node that has already shut down; the user reconnects on target
+            if source in service_ring.nodes:
+                raise
+        
+        if archive is not None:
+            start = user_id not in hibernated_sessions
+            try:
+                await import_session(target, user_id, archive, start)
+            except Exception:
+                await import_session(source, user_id, archive, start)
+                raise
+        node, outcome = target, 'moved' if archive is not None else 'reassigned'
+    except Exception as e:
+        logger.error(f'[Rebalance] Moving {user_id} from {source} to {target} failed: {e}')
+    finally:
+        async with pool.acquire() as conn:
+            await conn.execute(
+                'UPDATE whatsapp_assignments SET node = $2, draining = FALSE, assigned_at = NOW() WHERE user_id = $1',
+                user_id, node
+            )
+        service_assignments.pop(user_id, None)
+        session_states.pop(user_id, None)
+    return outcome
+
+async def plan_rebalance() -> List[tuple]:
+    """(user_id, source, target) for every assignment the ring now places elsewhere"""
+    pool = await get_db_pool()
+    async with pool.acquire() as conn:
+        rows = await conn.fetch('SELECT user_id, node FROM whatsapp_assignments WHERE NOT draining')
+    moves = []
+    for row in rows:
+        user_id = str(row['user_id'])
+        target = service_ring.node_for(user_id)
+        if row['node'] != target:
+            moves.append((user_id, row['node'], target))
+    return moves
+
+async def run_rebalance(moves: List[tuple]):
+    semaphore = asyncio.Semaphore(REBALANCE_CONCURRENCY)
+    
+    async def move(user_id: str, source: str, target: str):
+        async with semaphore:
+            outcome = await migrate_session(user_id, source, target)
+        rebalance_status[outcome] += 1
+    
+    try:
+        await asyncio.gather(*(move(*m) for m in moves))
+    finally:
+        rebalance_status['state'] = 'finished'
+        rebalance_status['finished_at'] = datetime.now(timezone.utc).isoformat()
+        logger.info(f'[Rebalance] Finished: {rebalance_status}')
 
 # Admin - System Status
-@api_router.get('/admin/system/status')
-async def get_system_status(admin: dict = Depends(get_admin_user)):
+# A background collector polls whatsapp-service and supervisord; the
+# endpoint only returns the latest snapshot.
+SYSTEM_STATUS_INTERVAL = float(os.environ.get('SYSTEM_STATUS_INTERVAL', '10'))
+system_status_snapshot: Optional[dict] = None
+system_status_lock = asyncio.Lock()
+
+async def fetch_whatsapp_health(node: str) -> tuple:
     try:
-        async with aiohttp.ClientSession() as session:
-            async with session.get(f'{WHATSAPP_SERVICE_URL}/health', timeout=aiohttp.ClientTimeout(total=5)) as response:
-                whatsapp_health = await response.json()
-                whatsapp_status = 'healthy' if response.status == 200 else 'unhealthy'
+        session = get_http_session()
+        async with session.get(f'{node}/health', timeout=aiohttp.ClientTimeout(total=5)) as response:
+            health = await response.json()
+            return ('healthy' if response.status == 200 else 'unhealthy'), health
     except Exception:
-        whatsapp_status = 'unreachable'
-        whatsapp_health = {}
+        return 'unreachable', {}
+
+async def collect_whatsapp_health() -> dict:
+    """Health of every node; overall 'degraded' when only some are healthy"""
+    results = await asyncio.gather(*(fetch_whatsapp_health(node) for node in service_ring.nodes))
+    pool = await get_db_pool()
+    async with pool.acquire() as conn:
+        rows = await conn.fetch(
+            'SELECT node, COUNT(*) AS assigned, COUNT(*) FILTER (WHERE draining) AS draining FROM whatsapp_assignments GROUP BY node'
+        )
+        hibernated = await conn.fetchval('SELECT COUNT(*) FROM whatsapp_activity WHERE hibernated_at IS NOT NULL')
+        starting = {row['node']: row['count'] for row in await conn.fetch(
+            'SELECT node, COUNT(*) FROM whatsapp_init_active WHERE lease_until > NOW() GROUP BY node'
+        )}
+        queued = {row['node']: row['count'] for row in await conn.fetch(
+            'SELECT node, COUNT(*) FROM whatsapp_init_queue WHERE expires_at > NOW() GROUP BY node'
+        )}
+    assigned = {row['node']: row for row in rows}
+    share = service_ring.share()
+    nodes = [{
+        'url': node,
+        'status': status,
+        'activeConnections': health.get('activeConnections', 0),
+        'assignedUsers': assigned[node]['assigned'] if node in assigned else 0,
+        'draining': assigned[node]['draining'] if node in assigned else 0,
+        'ringShare': round(share[node], 4),
+        'initializing': starting.get(node, 0),
+        'initQueued': queued.get(node, 0)
+    } for node, (status, health) in zip(service_ring.nodes, results)]
     
+    if len(results) == 1:
+        status, health = results[0]
+    else:
+        statuses = {status for status, _ in results}
+        if statuses == {'healthy'}:
+            status = 'healthy'
+        elif 'healthy' in statuses:
+            status = 'degraded'
+        else:
+            status = 'unreachable' if statuses == {'unreachable'} else 'unhealthy'
+        health = {
+            'activeConnections': sum(h.get('activeConnections', 0) for _, h in results),
+            'users': [user for _, h in results for user in h.get('users', [])]
+        }
+    return {
+        'status': status,
+        'health': health,
+        'nodes': nodes,
+        'sessions': {'active': sum(node['activeConnections'] for node in nodes), 'hibernated': hibernated}
+    }
+
+async def fetch_supervisor_services() -> list:
     try:
-        result = subprocess.run(['supervisorctl', 'status'], capture_output=True, text=True, timeout=5)
-        services = []
-        for line in result.stdout.split('\n'):
-            if line.strip():
-                parts = line.split()
-                if len(parts) >= 2:
-                    services.append({
-                        'name': parts[0],
-                        'status': parts[1],
-                        'uptime': ' '.join(parts[4:]) if len(parts) > 4 else 'N/A'
-                    })
+        process = await asyncio.create_subprocess_exec(
+            'supervisorctl', 'status',
+            stdout=asyncio.subprocess.PIPE,
+            stderr=asyncio.subprocess.DEVNULL
+        )
+        try:
+            stdout, _ = await asyncio.wait_for(process.communicate(), timeout=5)
+        except asyncio.TimeoutError:
+            process.kill()
+            await process.wait()
+            return []
     except Exception:
-        services = []
+        return []
     
-    return {
-        'whatsapp_service': {
-            'status': whatsapp_status,
-            'health': whatsapp_health
-        },
+    services = []
+    for line in stdout.decode('utf-8', errors='replace').split('\n'):
+        if line.strip():
+            parts = line.split()
+            if len(parts) >= 2:
+                services.append({
+                    'name': parts[0],
+                    'status': parts[1],
+                    'uptime': ' '.join(parts[4:]) if len(parts) > 4 else 'N/A'
+                })
+    return services
+
+async def collect_system_status() -> dict:
+    global system_status_snapshot
+    whatsapp_service, services = await asyncio.gather(collect_whatsapp_health(), fetch_supervisor_services())
+    system_status_snapshot = {
+        'whatsapp_service': whatsapp_service,
         'services': services,
         'database': 'postgresql',
-        'timestamp': datetime.now(timezone.utc).isoformat()
+        'collected_at': datetime.now(timezone.utc).isoformat()
     }
+    return system_status_snapshot
+
+async def system_status_loop():
+    while True:
+        try:
+            async with system_status_lock:
+                await collect_system_status()
+        except Exception as e:
+            logger.error(f'[Status] Collection failed: {e}')
+        await asyncio.sleep(SYSTEM_STATUS_INTERVAL)
+
+@api_router.get('/admin/system/status')
+async def get_system_status(admin: dict = Depends(get_admin_user)):
+    snapshot = system_status_snapshot
+    if snapshot is None:
+        # Only before the first collection finishes; concurrent callers share it
+        async with system_status_lock:
+            snapshot = system_status_snapshot or await collect_system_status()
+    return {**snapshot, 'timestamp': datetime.now(timezone.utc).isoformat()}
 
 # Admin - WhatsApp Sessions
 @api_router.get('/admin/whatsapp/sessions')
-async def get_whatsapp_sessions(admin: dict = Depends(get_admin_user)):
+async def get_whatsapp_sessions(
+    admin: dict = Depends(get_admin_user),
+    status: Optional[str] = None,
+    skip: int = 0,
+    limit: int = Query(100, ge=1, le=1000),
+    cursor: Optional[str] = None
+):
+    """Sessions ordered by user id; pass next_cursor back as cursor for the following page"""
     try:
-        timeout = aiohttp.ClientTimeout(total=10)
-        async with aiohttp.ClientSession(timeout=timeout) as session:
-            async with session.get(f'{WHATSAPP_SERVICE_URL}/admin/sessions') as response:
-                data = await response.json()
-                
-                pool = await get_db_pool()
-                enriched_sessions = []
-                for sess in data.get('sessions', []):
-                    user_id = sess.get('userId') or sess.get('odlUserId')
-                    if user_id:
-                        async with pool.acquire() as conn:
-                            user = await conn.fetchrow('SELECT email FROM users WHERE id = $1', uuid.UUID(user_id))
-                        sess['userEmail'] = user['email'] if user else 'Unknown'
-                    enriched_sessions.append(sess)
-                
-                return {
-                    'sessions': enriched_sessions,
-                    'total': len(enriched_sessions)
-                }
-    except aiohttp.ClientError:
-        return {'sessions': [], 'total': 0, 'error': 'WhatsApp service unavailable'}
+        sessions, failed = await fetch_all_sessions()
+        if len(failed) == len(service_ring.nodes):
+            return {'sessions': [], 'total': 0, 'error': 'WhatsApp service unavailable'}
+        
+        node_counts: Dict[str, int] = {}
+        for sess in sessions:
+            node_counts[sess['node']] = node_counts.get(sess['node'], 0) + 1
+        # Hibernated sessions have no browser on any node; list them from the activity table
+        listed = {sess.get('userId') for sess in sessions}
+        sessions += [
+            {'userId': user_id, 'status': 'hibernated', 'connected': False, 'phoneNumber': phone_number, 'node': None}
+            for user_id, phone_number in hibernated_sessions.items() if user_id not in listed
+        ]
+        status_counts: Dict[str, int] = {}
+        for sess in sessions:
+            status_counts[sess.get('status')] = status_counts.get(sess.get('status'), 0) + 1
+        if status:
+            sessions = [sess for sess in sessions if sess.get('status') == status]
+        sessions.sort(key=lambda sess: str(sess.get('userId') or sess.get('odlUserId') or ''))
+        remaining = sessions
+        if cursor:
+            remaining = [sess for sess in sessions if str(sess.get('userId') or sess.get('odlUserId') or '') > cursor]
+        elif skip:
+            remaining = sessions[skip:]
+        page = remaining[:limit]
+        
+        # Resolve emails only for the returned page, in one query for all cache misses
+        user_ids = [sess.get('userId') or sess.get('odlUserId') for sess in page]
+        pool = await get_db_pool()
+        async with pool.acquire() as conn:
+            users = await get_cached_users(conn, [user_id for user_id in user_ids if user_id])
+        for sess, user_id in zip(page, user_ids):
+            if user_id:
+                sess['userEmail'] = users[user_id]['email'] if user_id in users else 'Unknown'
+        
+        next_cursor = None
+        if len(remaining) > limit:
+            last = page[-1]
+            next_cursor = str(last.get('userId') or last.get('odlUserId') or '')
+        
+        return {
+            'sessions': page,
+            'total': len(sessions),
+            'next_cursor': next_cursor,
+            'status_counts': status_counts,
+            'nodes': [
+                {'url': node, 'reachable': node not in failed, 'sessions': node_counts.get(node, 0)}
+                for node in service_ring.nodes
+            ]
+        }
     except Exception as e:
         return {'sessions': [], 'total': 0, 'error': str(e)}
 
 @api_router.post('/admin/whatsapp/disconnect/{user_id}')
 async def admin_disconnect_user_whatsapp(user_id: str, admin: dict = Depends(get_admin_user)):
     try:
+        node = await service_url_for(user_id)
+        await clear_hibernation(user_id)
         timeout = aiohttp.ClientTimeout(total=10)
-        async with aiohttp.ClientSession(timeout=timeout) as session:
-            async with session.post(f'{WHATSAPP_SERVICE_URL}/disconnect', json={'userId': user_id}) as response:
+        async with aiohttp.ClientSession(timeout=timeout, headers=service_headers()) as session:
+            async with session.post(f'{node}/disconnect', json={'userId': user_id}) as response:
                 result = await response.json()
         
         await log_activity(admin['id'], admin['email'], 'WHATSAPP_DISCONNECTED', f'Admin disconnected WhatsApp for user {user_id}')
         return result
     except aiohttp.ClientError:
         raise HTTPException(status_code=503, detail='WhatsApp service unavailable')
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
@@ -744,6 +2202,37 @@ async def admin_disconnect_user_whatsapp(user_id: str, admin: dict = Depends(get
 async def admin_disconnect_whatsapp(admin: dict = Depends(get_admin_user)):
     return {'message': 'Use /admin/whatsapp/disconnect/{user_id} for per-user disconnect'}
 
+@api_router.post('/admin/whatsapp/rebalance')
+async def rebalance_whatsapp_sessions(admin: dict = Depends(get_admin_user), dry_run: bool = False):
+    """Move sessions to the node the ring now assigns them, e.g. after adding nodes"""
+    global rebalance_task, rebalance_status
+    if rebalance_task and not rebalance_task.done():
+        raise HTTPException(status_code=409, detail='A rebalance is already running')
+    
+    sessions, failed = await fetch_all_sessions()
+    if failed:
+        raise HTTPException(status_code=503, detail=f'WhatsApp service nodes unreachable: {", ".join(failed)}')
+    await record_service_assignments(sessions)
+    moves = await plan_rebalance()
+    by_target: Dict[str, int] = {}
+    for _, _, target in moves:
+        by_target[target] = by_target.get(target, 0) + 1
+    if dry_run:
+        return {'planned': len(moves), 'by_target': by_target}
+    
+    rebalance_status = {
+        'state': 'running', 'planned': len(moves), 'by_target': by_target,
+        'moved': 0, 'reassigned': 0, 'skipped': 0, 'failed': 0,
+        'started_at': datetime.now(timezone.utc).isoformat(), 'finished_at': None
+    }
+    rebalance_task = asyncio.create_task(run_rebalance(moves))
+    await log_activity(admin['id'], admin['email'], 'WHATSAPP_REBALANCED', f'Started moving {len(moves)} WhatsApp sessions')
+    return rebalance_status
+
+@api_router.get('/admin/whatsapp/rebalance')
+async def get_rebalance_status(admin: dict = Depends(get_admin_user)):
+    return rebalance_status or {'state': 'idle'}
+
 # Admin - Settings
 @api_router.get('/admin/settings')
 async def get_settings(admin: dict = Depends(get_admin_user)):
@@ -808,34 +2297,637 @@ async def get_activity_logs(admin: dict = Depends(get_admin_user), limit: int =
     return {'logs': logs_list, 'total': total}
 
 # WhatsApp Endpoints
-@api_router.post('/whatsapp/initialize')
-async def initialize_whatsapp(user: dict = Depends(get_current_user)):
+# WhatsApp session state cache: kept current by the service's qr_code,
+# whatsapp_connected and whatsapp_disconnected events and reconciled
+# periodically against /admin/sessions, so status and QR polls are answered
+# from memory. Entries older than SESSION_STATE_TTL fall back to the service.
+SESSION_STATE_TTL = float(os.environ.get('SESSION_STATE_TTL', '60'))
+SESSION_STATE_RECONCILE_INTERVAL = float(os.environ.get('SESSION_STATE_RECONCILE_INTERVAL', '30'))
+session_states: Dict[str, dict] = {}
+# When the last full reconcile finished; users missing from it have no session
+sessions_reconciled_at: Optional[float] = None
+
+def set_session_state(user_id: str, status: str, connected: bool, qr: Optional[str] = None, phone_number: Optional[str] = None):
+    session_states[user_id] = {
+        'status': status,
+        'connected': connected,
+        'qr': qr,
+        'phoneNumber': phone_number,
+        'updated_at': time.monotonic()
+    }
+
+def apply_session_event(user_id: str, event_type: str, data: dict):
+    if event_type == 'qr_code':
+        set_session_state(user_id, 'qr_ready', False, qr=data.get('qr'))
+    elif event_type == 'whatsapp_connected':
+        set_session_state(user_id, 'connected', True, phone_number=data.get('phoneNumber'))
+        hibernated_sessions.pop(user_id, None)
+    elif event_type == 'whatsapp_disconnected':
+        set_session_state(user_id, 'disconnected', False)
+    else:
+        return
+    # Any of these ends the startup, freeing the user's initialisation slot
+    for scheduler in init_schedulers.values():
+        scheduler.settle(user_id)
+
+def cached_session_state(user_id: str) -> Optional[dict]:
+    """Fresh cached state for a user, a disconnected state if a fresh reconcile did not list them, else None"""
+    now = time.monotonic()
+    state = session_states.get(user_id)
+    if state and now - state['updated_at'] < SESSION_STATE_TTL:
+        return state
+    if state is None and sessions_reconciled_at and now - sessions_reconciled_at < SESSION_STATE_TTL:
+        return {'status': 'disconnected', 'connected': False, 'qr': None, 'phoneNumber': None}
+    return None
+
+async def reconcile_session_states():
+    global sessions_reconciled_at
+    started = time.monotonic()
+    sessions, failed = await fetch_all_sessions()
+    if len(failed) == len(service_ring.nodes):
+        raise RuntimeError('no whatsapp-service node could be listed')
+    
+    listed = set()
+    for entry in sessions:
+        user_id = entry.get('userId')
+        listed.add(user_id)
+        state = session_states.get(user_id)
+        # An event received while the listing was in flight is newer than the listing
+        if state and state['updated_at'] > started:
+            continue
+        qr = state['qr'] if state and entry.get('status') == 'qr_ready' else None
+        set_session_state(user_id, entry.get('status'), bool(entry.get('connected')), qr, entry.get('phoneNumber'))
+    # Absent users are only known to have no session if every node answered
+    if not failed:
+        for user_id, state in list(session_states.items()):
+            if user_id not in listed and state['updated_at'] <= started:
+                del session_states[user_id]
+        sessions_reconciled_at = time.monotonic()
+    await record_service_assignments(sessions)
+
+async def session_state_loop():
+    while True:
+        try:
+            await reconcile_session_states()
+        except Exception as e:
+            logger.error(f'[Sessions] Reconcile failed: {e}')
+        await asyncio.sleep(SESSION_STATE_RECONCILE_INTERVAL)
+
+# WhatsApp initialisation admission
+# Every initialisation starts a Chromium instance, so at most
+# WHATSAPP_INIT_CONCURRENCY start at once per node across all backend
+# workers, first come first served. The queue (whatsapp_init_queue) and the
+# slots (whatsapp_init_active) live in Postgres: each worker starts only its
+# own users, and only when they are at the head of the node's queue and a slot
+# is free, under a per-node transaction lock. A slot is held until the session
+# shows a QR code, connects or disconnects, because the browser's startup cost
+# lands after /initialize returns; WHATSAPP_INIT_SLOT_TIMEOUT bounds a session
+# that never does. Queue entries and slots are leases, so those of a worker
+# that dies lapse. Waiting users get their place in line as
+# whatsapp_init_queued events.
+WHATSAPP_INIT_CONCURRENCY = int(os.environ.get('WHATSAPP_INIT_CONCURRENCY', '3'))
+WHATSAPP_INIT_QUEUE_LIMIT = int(os.environ.get('WHATSAPP_INIT_QUEUE_LIMIT', '500'))
+WHATSAPP_INIT_SLOT_TIMEOUT = float(os.environ.get('WHATSAPP_INIT_SLOT_TIMEOUT', '90'))
+# How often each worker retries admission for its queued users
+WHATSAPP_INIT_POLL_INTERVAL = float(os.environ.get('WHATSAPP_INIT_POLL_INTERVAL', '1'))
+INIT_LOCK_ID = 72610049
+# A queued entry its worker stopped refreshing lapses after this many seconds
+INIT_QUEUE_TTL = 15
+# Longer than a run can take (health check, /initialize, settling), so only a dead worker's slot lapses
+INIT_SLOT_LEASE = 2 * WHATSAPP_INIT_SLOT_TIMEOUT + 30
+# Refuse to start another browser when the host has less memory available than this
+WHATSAPP_INIT_MIN_AVAILABLE_MB = int(os.environ.get('WHATSAPP_INIT_MIN_AVAILABLE_MB', '512'))
+INIT_SETTLED_STATUSES = {'qr_ready', 'connected', 'disconnected', 'auth_failure', 'error'}
+
+def read_meminfo() -> Dict[str, int]:
+    """/proc/meminfo fields in bytes; empty where it is unavailable"""
     try:
-        async with aiohttp.ClientSession() as session:
-            try:
-                async with session.get(f'{WHATSAPP_SERVICE_URL}/health', timeout=aiohttp.ClientTimeout(total=5)) as health_response:
-                    if health_response.status != 200:
-                        raise HTTPException(status_code=503, detail='WhatsApp service is not healthy')
-            except Exception as e:
-                raise HTTPException(status_code=503, detail=f'WhatsApp service is unavailable: {str(e)}')
+        with open('/proc/meminfo') as f:
+            lines = f.read().splitlines()
+    except OSError:
+        return {}
+    fields = {}
+    for line in lines:
+        name, _, value = line.partition(':')
+        parts = value.split()
+        if parts and parts[0].isdigit():
+            fields[name] = int(parts[0]) * (1024 if parts[1:] == ['kB'] else 1)
+    return fields
+
+def check_init_memory(health: dict):
+    """Reject an initialisation when the node's host (from /health, else this host) is short of memory"""
+    available = (health.get('memory') or {}).get('availableBytes')
+    if available is None:
+        available = read_meminfo().get('MemAvailable')
+    if available is not None and available < WHATSAPP_INIT_MIN_AVAILABLE_MB * 1024 * 1024:
+        logger.warning(f'[Init] Rejecting initialisation, only {available // (1024 * 1024)} MB available')
+        raise HTTPException(status_code=503, detail='The server is low on memory, please try connecting again in a few minutes')
+
+class InitScheduler:
+    """This worker's side of the shared FIFO admission of session initialisations on one node"""
+    
+    def __init__(self, node: str):
+        self.node = node
+        self.waiting: Dict[str, tuple] = {}  # user_id -> (user, resume) for users this worker queued
+        self.active: Dict[str, asyncio.Event] = {}  # user_id -> set once the session settles
+        self.tasks: Dict[str, asyncio.Task] = {}
+        self.announced: Dict[str, int] = {}
+        self.lock = asyncio.Lock()
+    
+    async def submit(self, user: dict, resume: bool = False) -> int:
+        """Queue a start; resume restores the saved login of a hibernated session instead of showing a new QR"""
+        user_id = user['id']
+        pool = await get_db_pool()
+        async with pool.acquire() as conn:
+            queued = await conn.fetchval(
+                'SELECT COUNT(*) FROM whatsapp_init_queue WHERE node = $1 AND expires_at > NOW()', self.node
+            )
+            if queued >= WHATSAPP_INIT_QUEUE_LIMIT:
+                raise HTTPException(status_code=503, detail='Too many WhatsApp connections are starting, please try again in a minute')
+            # Already queued or starting through another worker: that worker carries on with it
+            owned = await conn.fetchval(
+                '''INSERT INTO whatsapp_init_queue (user_id, node, resume, queued_at, expires_at)
+                   SELECT $1, $2, $3, NOW(), NOW() + make_interval(secs => $4)
+                   WHERE NOT EXISTS (SELECT 1 FROM whatsapp_init_active WHERE user_id = $1 AND lease_until > NOW())
+                   ON CONFLICT (user_id) DO UPDATE
+                   SET node = EXCLUDED.node, resume = EXCLUDED.resume, queued_at = EXCLUDED.queued_at, expires_at = EXCLUDED.expires_at
+                   WHERE whatsapp_init_queue.expires_at <= NOW()
+                   RETURNING user_id''',
+                uuid.UUID(user_id), self.node, resume, INIT_QUEUE_TTL
+            )
+        if owned:
+            self.waiting[user_id] = (user, resume)
+            await self.admit()
+        return await init_position(user_id) or 0
+    
+    def settle(self, user_id: str):
+        event = self.active.get(user_id)
+        if event:
+            event.set()
+    
+    async def admit(self):
+        """Start this worker's users at the head of the node's queue while the node has free slots"""
+        async with self.lock:
+            if not self.waiting:
+                return
+            pool = await get_db_pool()
+            async with pool.acquire() as conn:
+                async with conn.transaction():
+                    await conn.execute('SELECT pg_advisory_xact_lock($1, hashtext($2))', INIT_LOCK_ID, self.node)
+                    await conn.execute(
+                        'DELETE FROM whatsapp_init_active WHERE node = $1 AND lease_until <= NOW()', self.node
+                    )
+                    await conn.execute(
+                        'DELETE FROM whatsapp_init_queue WHERE node = $1 AND expires_at <= NOW()', self.node
+                    )
+                    # Keep this worker's entries alive; any cancelled elsewhere are gone from the table
+                    kept = await conn.fetch(
+                        '''UPDATE whatsapp_init_queue SET expires_at = NOW() + make_interval(secs => $2)
+                           WHERE user_id = ANY($1::uuid[]) RETURNING user_id''',
+                        list(self.waiting), INIT_QUEUE_TTL
+                    )
+                    kept_ids = {str(row['user_id']) for row in kept}
+                    for user_id in [user_id for user_id in self.waiting if user_id not in kept_ids]:
+                        del self.waiting[user_id]
+                    busy = await conn.fetchval(
+                        'SELECT COUNT(*) FROM whatsapp_init_active WHERE node = $1', self.node
+                    )
+                    heads = await conn.fetch(
+                        '''SELECT user_id FROM whatsapp_init_queue WHERE node = $1
+                           ORDER BY queued_at, user_id LIMIT $2''',
+                        self.node, max(WHATSAPP_INIT_CONCURRENCY - busy, 0)
+                    )
+                    # Heads queued by other workers are started by them on their next pass
+                    admitted = [str(row['user_id']) for row in heads if str(row['user_id']) in self.waiting]
+                    if admitted:
+                        await conn.execute('DELETE FROM whatsapp_init_queue WHERE user_id = ANY($1::uuid[])', admitted)
+                        await conn.execute(
+                            '''INSERT INTO whatsapp_init_active (user_id, node, lease_until)
+                               SELECT user_id, $2, NOW() + make_interval(secs => $3) FROM unnest($1::uuid[]) AS a(user_id)
+                               ON CONFLICT (user_id) DO UPDATE SET node = EXCLUDED.node, lease_until = EXCLUDED.lease_until''',
+                            admitted, self.node, INIT_SLOT_LEASE
+                        )
+                positions = await conn.fetch(
+                    '''SELECT q.user_id, COUNT(*) AS position, (SELECT COUNT(*) FROM whatsapp_init_queue WHERE node = $2) AS queued
+                       FROM whatsapp_init_queue q
+                       JOIN whatsapp_init_queue o ON o.node = q.node AND (o.queued_at, o.user_id) <= (q.queued_at, q.user_id)
+                       WHERE q.user_id = ANY($1::uuid[])
+                       GROUP BY q.user_id''',
+                    [user_id for user_id in self.waiting if user_id not in admitted], self.node
+                )
+            for user_id in admitted:
+                user, resume = self.waiting.pop(user_id)
+                self.announced.pop(user_id, None)
+                self.active[user_id] = asyncio.Event()
+                self.tasks[user_id] = asyncio.create_task(self.run(user, resume))
+        await self.announce(positions)
+    
+    async def announce(self, positions):
+        """Tell waiting users whose place in line changed"""
+        for row in positions:
+            user_id = str(row['user_id'])
+            if self.announced.get(user_id) != row['position']:
+                self.announced[user_id] = row['position']
+                await emit_to_user(user_id, 'whatsapp_init_queued', {'position': row['position'], 'queued': row['queued']})
+    
+    async def run(self, user: dict, resume: bool):
+        user_id = user['id']
+        settled = self.active[user_id]
+        try:
+            await emit_to_user(user_id, 'whatsapp_init_queued', {'position': 0, 'queued': len(self.waiting)})
+            # Memory may have run low while this user waited
+            status, health = await fetch_whatsapp_health(self.node)
+            if status != 'healthy':
+                raise HTTPException(status_code=503, detail='WhatsApp service is unavailable')
+            check_init_memory(health)
             
-            async with session.post(f'{WHATSAPP_SERVICE_URL}/initialize', json={'userId': user['id']}) as response:
+            session = get_http_session()
+            async with session.post(
+                f'{self.node}/initialize', json={'userId': user_id, 'resume': resume},
+                timeout=aiohttp.ClientTimeout(total=WHATSAPP_INIT_SLOT_TIMEOUT)
+            ) as response:
                 data = await response.json()
-                await log_activity(user['id'], user['email'], 'WHATSAPP_INITIALIZED', 'Initialized WhatsApp connection')
-                return data
-    except HTTPException:
+            if not data.get('success'):
+                raise HTTPException(status_code=500, detail=data.get('error') or 'Failed to start WhatsApp')
+            if resume:
+                await log_activity(user_id, user['email'], 'WHATSAPP_RESUMED', 'Resumed hibernated WhatsApp session')
+            else:
+                await log_activity(user_id, user['email'], 'WHATSAPP_INITIALIZED', 'Initialized WhatsApp connection')
+            if data.get('status') == 'already_connected':
+                set_session_state(user_id, 'connected', True, phone_number=data.get('phoneNumber'))
+                await emit_to_user(user_id, 'whatsapp_connected', {'status': 'connected', 'phoneNumber': data.get('phoneNumber')})
+                return
+            
+            deadline = time.monotonic() + WHATSAPP_INIT_SLOT_TIMEOUT
+            while not settled.is_set() and data.get('status') not in INIT_SETTLED_STATUSES and time.monotonic() < deadline:
+                try:
+                    await asyncio.wait_for(settled.wait(), 2)
+                except asyncio.TimeoutError:
+                    # The session's events may reach another worker, so also ask the node
+                    try:
+                        async with session.get(
+                            f'{self.node}/status', params={'userId': user_id}, timeout=aiohttp.ClientTimeout(total=5)
+                        ) as response:
+                            data = await response.json()
+                    except aiohttp.ClientError:
+                        pass
+        except HTTPException as e:
+            await emit_to_user(user_id, 'whatsapp_init_rejected', {'error': e.detail})
+        except Exception as e:
+            logger.error(f'[Init] Initialisation for {user_id} failed: {e}')
+            await emit_to_user(user_id, 'whatsapp_init_rejected', {'error': 'Failed to start WhatsApp, please try again'})
+        finally:
+            self.active.pop(user_id, None)
+            self.tasks.pop(user_id, None)
+            try:
+                pool = await get_db_pool()
+                async with pool.acquire() as conn:
+                    await conn.execute('DELETE FROM whatsapp_init_active WHERE user_id = $1', uuid.UUID(user_id))
+            except Exception as e:
+                logger.error(f'[Init] Could not free the slot of {user_id}, it lapses with its lease: {e}')
+            await self.admit()
+
+init_schedulers: Dict[str, InitScheduler] = {}
+
+def init_scheduler_for(node: str) -> InitScheduler:
+    if node not in init_schedulers:
+        init_schedulers[node] = InitScheduler(node)
+    return init_schedulers[node]
+
+async def init_position(user_id: str) -> Optional[int]:
+    """0 while the user's session is starting, their place in their node's queue while waiting, else None; the same from every worker"""
+    pool = await get_db_pool()
+    async with pool.acquire() as conn:
+        return await conn.fetchval(
+            '''SELECT 0 FROM whatsapp_init_active WHERE user_id = $1 AND lease_until > NOW()
+               UNION ALL
+               (SELECT COUNT(*) FROM whatsapp_init_queue q
+                JOIN whatsapp_init_queue o ON o.node = q.node AND (o.queued_at, o.user_id) <= (q.queued_at, q.user_id)
+                WHERE q.user_id = $1 AND q.expires_at > NOW() AND o.expires_at > NOW()
+                HAVING COUNT(*) > 0)
+               LIMIT 1''',
+            uuid.UUID(user_id)
+        )
+
+async def cancel_initialisation(user_id: str):
+    """Drop a queued start, whichever worker queued it, or free this worker's slot for one that is starting"""
+    pool = await get_db_pool()
+    async with pool.acquire() as conn:
+        await conn.execute('DELETE FROM whatsapp_init_queue WHERE user_id = $1', uuid.UUID(user_id))
+    # A start running on another worker ends when its status poll sees the disconnect
+    for scheduler in init_schedulers.values():
+        scheduler.waiting.pop(user_id, None)
+        scheduler.settle(user_id)
+
+async def init_admission_loop():
+    while True:
+        for scheduler in list(init_schedulers.values()):
+            try:
+                await scheduler.admit()
+            except Exception as e:
+                logger.error(f'[Init] Admission on {scheduler.node} failed: {e}')
+        await asyncio.sleep(WHATSAPP_INIT_POLL_INTERVAL)
+
+# WhatsApp session hibernation
+# Sends and status calls record when each user last used WhatsApp; the
+# in-memory marks are written to whatsapp_activity every
+# WHATSAPP_HIBERNATE_INTERVAL seconds. When WHATSAPP_HIBERNATE_AFTER_MINUTES
+# is set, one worker at a time stops the browsers of sessions idle for
+# longer, keeping their LocalAuth data, and the next send resumes the
+# session through the initialisation queue while the message waits. Sends
+# write last_active_at directly, so a session in use is never idle to the
+# hibernating worker however stale its view of the others' activity.
+WHATSAPP_HIBERNATE_AFTER_MINUTES = float(os.environ.get('WHATSAPP_HIBERNATE_AFTER_MINUTES', '0'))
+WHATSAPP_HIBERNATE_INTERVAL = float(os.environ.get('WHATSAPP_HIBERNATE_INTERVAL', '60'))
+# Most sessions hibernated per run, longest idle first
+WHATSAPP_HIBERNATE_BATCH = int(os.environ.get('WHATSAPP_HIBERNATE_BATCH', '20'))
+WHATSAPP_WAKE_TIMEOUT = float(os.environ.get('WHATSAPP_WAKE_TIMEOUT', '60'))
+# Longer than the node's 30s drain of in-flight sends before it stops a hibernating browser
+WHATSAPP_HIBERNATE_DISCONNECT_TIMEOUT = float(os.environ.get('WHATSAPP_HIBERNATE_DISCONNECT_TIMEOUT', '45'))
+HIBERNATION_LOCK_ID = 72610034
+pending_activity: Dict[str, datetime] = {}
+# user_id -> phone number, for sessions hibernated by any worker (refreshed each interval)
+hibernated_sessions: Dict[str, Optional[str]] = {}
+waking_sessions: Dict[str, asyncio.Task] = {}
+
+def touch_session(user_id: str):
+    pending_activity[user_id] = datetime.now(timezone.utc)
+
+async def flush_session_activity():
+    global pending_activity
+    if not pending_activity:
+        return
+    batch, pending_activity = pending_activity, {}
+    try:
+        pool = await get_db_pool()
+        async with pool.acquire() as conn:
+            await conn.execute(
+                '''INSERT INTO whatsapp_activity (user_id, last_active_at)
+                   SELECT u.id, a.at FROM unnest($1::uuid[], $2::timestamptz[]) AS a(user_id, at)
+                   JOIN users u ON u.id = a.user_id
+                   ON CONFLICT (user_id) DO UPDATE
+                   SET last_active_at = GREATEST(whatsapp_activity.last_active_at, EXCLUDED.last_active_at)''',
+                list(batch), list(batch.values())
+            )
+    except Exception:
+        for user_id, at in batch.items():
+            if pending_activity.get(user_id, at) <= at:
+                pending_activity[user_id] = at
         raise
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
+
+async def load_hibernated_sessions():
+    global hibernated_sessions
+    pool = await get_db_pool()
+    async with pool.acquire() as conn:
+        rows = await conn.fetch('SELECT user_id, phone_number FROM whatsapp_activity WHERE hibernated_at IS NOT NULL')
+    hibernated_sessions = {str(row['user_id']): row['phone_number'] for row in rows}
+
+def apply_hibernation_event(event: str, data: dict):
+    """Keep this worker's hibernation and session caches in step with a change made by any worker"""
+    user_id = data['userId']
+    if event == 'session_hibernated':
+        hibernated_sessions[user_id] = data.get('phoneNumber')
+        session_states.pop(user_id, None)
+    elif event == 'session_woken':
+        hibernated_sessions.pop(user_id, None)
+
+if SOCKETIO_PUBSUB:
+    sio.manager.worker_event_handler = apply_hibernation_event
+
+async def broadcast_hibernation_event(event: str, data: dict):
+    apply_hibernation_event(event, data)
+    if SOCKETIO_PUBSUB:
+        await sio.manager.broadcast_worker_event(event, data)
+
+async def clear_hibernation(user_id: str):
+    pool = await get_db_pool()
+    async with pool.acquire() as conn:
+        await conn.execute('UPDATE whatsapp_activity SET hibernated_at = NULL WHERE user_id = $1', user_id)
+    await broadcast_hibernation_event('session_woken', {'userId': user_id})
+
+async def hibernate_session(conn, user_id: str, node: str, phone_number: Optional[str], cutoff: datetime) -> bool:
+    """
+    Stop an idle session's browser, keeping its LocalAuth data so wake_session
+    can resume it. The activity row stays locked until the node has disconnected,
+    so a send arriving meanwhile waits for it and then wakes the session. If the
+    disconnect call fails, the node's status decides whether the hibernation
+    stands.
+    """
+    if pending_activity.get(user_id, cutoff) > cutoff:
+        return False
+    transaction = conn.transaction()
+    await transaction.start()
+    try:
+        marked = await conn.fetchval(
+            '''UPDATE whatsapp_activity SET hibernated_at = NOW(), phone_number = $3
+               WHERE user_id = $1 AND last_active_at < $2 AND hibernated_at IS NULL RETURNING user_id''',
+            user_id, cutoff, phone_number
+        )
+        if not marked:
+            await transaction.rollback()
+            return False
+        session = get_http_session()
+        async with session.post(
+            f'{node}/disconnect', json={'userId': user_id, 'keepAuth': True},
+            timeout=aiohttp.ClientTimeout(total=WHATSAPP_HIBERNATE_DISCONNECT_TIMEOUT)
+        ) as response:
+            if response.status != 200:
+                raise RuntimeError(f'{node}/disconnect returned {response.status}')
+    except (asyncio.TimeoutError, aiohttp.ClientError, RuntimeError) as e:
+        # The node may have stopped the browser all the same; a send arriving
+        # meanwhile still waits on the locked row for the outcome
+        stopped = await session_stopped(node, user_id)
+        if not stopped:
+            await transaction.rollback()
+            if stopped is None:
+                # The node cannot say: resume from the kept login in case it did
+                # stop, rather than leave a plain initialize to discard it
+                email = await conn.fetchval('SELECT email FROM users WHERE id = $1', uuid.UUID(user_id))
+                await init_scheduler_for(node).submit({'id': user_id, 'email': email}, resume=True)
+                raise
+            return False
+        logger.warning(f'[Hibernate] {node}/disconnect failed for {user_id} ({e}), but the session has stopped')
+    except BaseException:
+        await transaction.rollback()
+        raise
+    await transaction.commit()
+    await broadcast_hibernation_event('session_hibernated', {'userId': user_id, 'phoneNumber': phone_number})
+    await emit_to_user(user_id, 'whatsapp_hibernated', {'status': 'hibernated', 'phoneNumber': phone_number})
+    return True
+
+async def session_stopped(node: str, user_id: str) -> Optional[bool]:
+    """Whether the node's session stopped within the drain window; None if the node cannot say"""
+    session = get_http_session()
+    deadline = time.monotonic() + WHATSAPP_HIBERNATE_DISCONNECT_TIMEOUT
+    while True:
+        try:
+            async with session.get(f'{node}/status', params={'userId': user_id}, timeout=aiohttp.ClientTimeout(total=5)) as response:
+                data = await response.json()
+        except (asyncio.TimeoutError, aiohttp.ClientError):
+            return None
+        if not data.get('connected'):
+            return True
+        if time.monotonic() >= deadline:
+            return False
+        await asyncio.sleep(1)
+
+async def hibernate_idle_sessions() -> int:
+    """Hibernate connected sessions idle for WHATSAPP_HIBERNATE_AFTER_MINUTES, longest idle first"""
+    sessions, _ = await fetch_all_sessions()
+    connected = {entry['userId']: entry for entry in sessions if entry.get('connected') and entry.get('userId')}
+    if not connected:
+        return 0
+    cutoff = datetime.now(timezone.utc) - timedelta(minutes=WHATSAPP_HIBERNATE_AFTER_MINUTES)
+    
+    hibernated = 0
+    # A dedicated connection holds the lock and does all the run's work, so the
+    # disconnect calls never hold pool connections while waiting on a node
+    conn = await asyncpg.connect(DATABASE_URL)
+    try:
+        if not await conn.fetchval('SELECT pg_try_advisory_lock($1)', HIBERNATION_LOCK_ID):
+            return 0
+    
+        # Sessions with no recorded use start their idle clock now
+        await conn.execute(
+            '''INSERT INTO whatsapp_activity (user_id, last_active_at)
+               SELECT u.id, NOW() FROM unnest($1::uuid[]) AS s(user_id) JOIN users u ON u.id = s.user_id
+               ON CONFLICT (user_id) DO NOTHING''',
+            list(connected)
+        )
+        idle = await conn.fetch(
+            '''SELECT user_id FROM whatsapp_activity
+               WHERE user_id = ANY($1::uuid[]) AND last_active_at < $2 AND hibernated_at IS NULL
+               ORDER BY last_active_at LIMIT $3''',
+            list(connected), cutoff, WHATSAPP_HIBERNATE_BATCH
+        )
+        for row in idle:
+            entry = connected[str(row['user_id'])]
+            try:
+                if await hibernate_session(conn, entry['userId'], entry['node'], entry.get('phoneNumber'), cutoff):
+                    hibernated += 1
+            except Exception as e:
+                logger.error(f'[Hibernate] Could not hibernate {entry["userId"]}: {e}')
+    finally:
+        # Closing the session releases the advisory lock
+        await conn.close()
+    return hibernated
+
+async def wake_session(user: dict) -> bool:
+    """Resume a hibernated session and wait until it connects; returns whether it did"""
+    user_id = user['id']
+    node = await service_url_for(user_id)
+    scheduler = init_scheduler_for(node)
+    if await init_position(user_id) is None:
+        await scheduler.submit(user, resume=True)
+    
+    connected = False
+    status = 'disconnected'
+    session = get_http_session()
+    deadline = time.monotonic() + WHATSAPP_WAKE_TIMEOUT
+    while time.monotonic() < deadline:
+        await asyncio.sleep(0.5)
+        state = session_states.get(user_id)
+        if state and state['connected']:
+            connected = True
+            break
+        try:
+            async with session.get(f'{node}/status', params={'userId': user_id}, timeout=aiohttp.ClientTimeout(total=5)) as response:
+                data = await response.json()
+        except aiohttp.ClientError:
+            continue
+        status = data.get('status')
+        if data.get('connected'):
+            connected = True
+            break
+        if status != 'initializing' and await init_position(user_id) is None:
+            break
+    
+    # Once the node has the session it is no longer hibernated, whether it
+    # connected or the saved login was rejected; if the start never happened
+    # (e.g. low memory) the next send tries again
+    if connected or status != 'disconnected':
+        await clear_hibernation(user_id)
+    return connected
+
+async def wake_if_hibernated(user: dict):
+    """Record a send and, if the user's session is hibernated, resume it first; concurrent sends share the wake"""
+    user_id = user['id']
+    # Written now rather than on this worker's next activity flush, and answered
+    # from the row rather than the session cache, which may predate a hibernation
+    # by another worker. A hibernation in progress holds the row until it is done.
+    pool = await get_db_pool()
+    async with pool.acquire() as conn:
+        hibernated = await conn.fetchval(
+            '''INSERT INTO whatsapp_activity (user_id, last_active_at) VALUES ($1, NOW())
+               ON CONFLICT (user_id) DO UPDATE
+               SET last_active_at = GREATEST(whatsapp_activity.last_active_at, EXCLUDED.last_active_at)
+               RETURNING hibernated_at IS NOT NULL''',
+            uuid.UUID(user_id)
+        )
+    if not hibernated:
+        return
+    task = waking_sessions.get(user_id)
+    if task is None:
+        task = waking_sessions[user_id] = asyncio.create_task(wake_session(user))
+        task.add_done_callback(lambda _: waking_sessions.pop(user_id, None))
+    await asyncio.shield(task)
+
+async def session_hibernation_loop():
+    while True:
+        try:
+            await flush_session_activity()
+            await load_hibernated_sessions()
+            if WHATSAPP_HIBERNATE_AFTER_MINUTES > 0:
+                hibernated = await hibernate_idle_sessions()
+                if hibernated:
+                    logger.info(f'[Hibernate] Hibernated {hibernated} idle WhatsApp sessions')
+        except Exception as e:
+            logger.error(f'[Hibernate] Run failed: {e}')
+        await asyncio.sleep(WHATSAPP_HIBERNATE_INTERVAL)
+
+@api_router.post('/whatsapp/initialize')
+async def initialize_whatsapp(user: dict = Depends(get_current_user)):
+    node = await service_url_for(user['id'])
+    scheduler = init_scheduler_for(node)
+    position = await init_position(user['id'])
+    if position is None:
+        state = cached_session_state(user['id'])
+        if state and state['connected']:
+            return {'success': True, 'status': 'already_connected', 'phoneNumber': state['phoneNumber']}
+        status, health = await fetch_whatsapp_health(node)
+        if status != 'healthy':
+            raise HTTPException(status_code=503, detail=f'WhatsApp service is {"unavailable" if status == "unreachable" else "not healthy"}')
+        check_init_memory(health)
+        session_states.pop(user['id'], None)
+        position = await scheduler.submit(user, resume=user['id'] in hibernated_sessions)
+    return {'success': True, 'status': 'queued' if position else 'initializing', 'position': position}
 
 @api_router.get('/whatsapp/status')
 async def whatsapp_status(user: dict = Depends(get_current_user)):
+    position = await init_position(user['id'])
+    if position:
+        return {'status': 'queued', 'connected': False, 'qrAvailable': False, 'phoneNumber': None, 'position': position}
+    state = cached_session_state(user['id'])
+    if position == 0 and (state is None or state['status'] == 'disconnected'):
+        return {'status': 'initializing', 'connected': False, 'qrAvailable': False, 'phoneNumber': None, 'position': 0}
+    touch_session(user['id'])
+    if user['id'] in hibernated_sessions and not (state and state['connected']):
+        return {'status': 'hibernated', 'connected': False, 'qrAvailable': False, 'phoneNumber': hibernated_sessions[user['id']]}
+    if state:
+        return {
+            'status': state['status'],
+            'connected': state['connected'],
+            'qrAvailable': state['status'] == 'qr_ready',
+            'phoneNumber': state['phoneNumber']
+        }
     try:
-        timeout = aiohttp.ClientTimeout(total=5)
-        async with aiohttp.ClientSession(timeout=timeout) as session:
-            async with session.get(f'{WHATSAPP_SERVICE_URL}/status?userId={user["id"]}') as response:
-                data = await response.json()
-                return data
+        node = await service_url_for(user['id'])
+        session = get_http_session()
+        async with session.get(f'{node}/status?userId={user["id"]}', timeout=aiohttp.ClientTimeout(total=5)) as response:
+            data = await response.json()
+            if response.status == 200:
+                set_session_state(user['id'], data.get('status'), bool(data.get('connected')), phone_number=data.get('phoneNumber'))
+            return data
     except aiohttp.ClientError:
         return {'status': 'disconnected', 'connected': False, 'error': 'WhatsApp service unavailable'}
     except Exception as e:
@@ -843,87 +2935,93 @@ async def whatsapp_status(user: dict = Depends(get_current_user)):
 
 @api_router.get('/whatsapp/qr')
 async def get_qr(user: dict = Depends(get_current_user)):
+    state = cached_session_state(user['id'])
+    if state and state['qr']:
+        return {'qr': state['qr'], 'status': state['status']}
+    if state and state['status'] != 'qr_ready':
+        raise HTTPException(status_code=404, detail='QR code not available')
     try:
-        timeout = aiohttp.ClientTimeout(total=10)
-        async with aiohttp.ClientSession(timeout=timeout) as session:
-            async with session.get(f'{WHATSAPP_SERVICE_URL}/qr?userId={user["id"]}') as response:
-                if response.status == 200:
-                    data = await response.json()
-                    return data
-                else:
-                    raise HTTPException(status_code=404, detail='QR code not available')
+        node = await service_url_for(user['id'])
+        session = get_http_session()
+        async with session.get(f'{node}/qr?userId={user["id"]}') as response:
+            if response.status == 200:
+                data = await response.json()
+                set_session_state(user['id'], 'qr_ready', False, qr=data.get('qr'))
+                return data
+            else:
+                raise HTTPException(status_code=404, detail='QR code not available')
     except aiohttp.ClientError:
         raise HTTPException(status_code=503, detail='WhatsApp service unavailable')
 
 @api_router.post('/whatsapp/disconnect')
 async def disconnect_whatsapp(user: dict = Depends(get_current_user)):
+    await cancel_initialisation(user['id'])
+    await clear_hibernation(user['id'])
     try:
+        node = await service_url_for(user['id'])
         timeout = aiohttp.ClientTimeout(total=10)
-        async with aiohttp.ClientSession(timeout=timeout) as session:
-            async with session.post(f'{WHATSAPP_SERVICE_URL}/disconnect', json={'userId': user['id']}) as response:
+        async with aiohttp.ClientSession(timeout=timeout, headers=service_headers()) as session:
+            async with session.post(f'{node}/disconnect', json={'userId': user['id']}) as response:
                 data = await response.json()
+                set_session_state(user['id'], 'disconnected', False)
                 await log_activity(user['id'], user['email'], 'WHATSAPP_DISCONNECTED', 'Disconnected WhatsApp')
                 return data
     except aiohttp.ClientError:
         raise HTTPException(status_code=503, detail='WhatsApp service unavailable')
 
+def format_number(number: str) -> str:
+    """Numbers without a country code are Indian"""
+    return number if number.startswith('+') else '+91' + number
+
 @api_router.post('/messages/send')
 async def send_message(msg: MessageSend, user: dict = Depends(get_current_user)):
-    formatted_number = msg.number
-    if not formatted_number.startswith('+'):
-        formatted_number = '+91' + formatted_number
+    started = time.perf_counter()
+    formatted_number = format_number(msg.number)
     
     message_id = uuid.uuid4()
+    service_started = None
     
     try:
+        node = await service_url_for(user['id'])
+        await wake_if_hibernated(user)
         timeout = aiohttp.ClientTimeout(total=30)
-        async with aiohttp.ClientSession(timeout=timeout) as session:
+        async with aiohttp.ClientSession(timeout=timeout, headers=service_headers()) as session:
+            service_started = time.perf_counter()
             async with session.post(
-                f'{WHATSAPP_SERVICE_URL}/send',
+                f'{node}/send',
                 json={'userId': user['id'], 'number': formatted_number, 'message': msg.message}
             ) as response:
                 result = await response.json()
+                service_ms = elapsed_ms(service_started)
                 
-                pool = await get_db_pool()
-                async with pool.acquire() as conn:
-                    if response.status == 200 and result.get('success'):
-                        await conn.execute(
-                            '''INSERT INTO message_logs (id, user_id, receiver_number, message_body, status, source, created_at)
-                               VALUES ($1, $2, $3, $4, $5, $6, $7)''',
-                            message_id, uuid.UUID(user['id']), formatted_number, msg.message, 'sent', 'web', datetime.now(timezone.utc)
-                        )
-                        return {'status': 'success', 'to': formatted_number, 'message': 'Message sent successfully'}
-                    else:
-                        await conn.execute(
-                            '''INSERT INTO message_logs (id, user_id, receiver_number, message_body, status, source, created_at)
-                               VALUES ($1, $2, $3, $4, $5, $6, $7)''',
-                            message_id, uuid.UUID(user['id']), formatted_number, msg.message, 'failed', 'web', datetime.now(timezone.utc)
-                        )
-                        error_msg = result.get('error', 'Failed to send message')
-                        raise HTTPException(status_code=400, detail=error_msg)
+                if response.status == 200 and result.get('success'):
+                    await log_message(
+                        user['id'], formatted_number, msg.message, 'sent', 'web', message_id, service_ms, elapsed_ms(started),
+                        (result.get('data') or {}).get('id')
+                    )
+                    return {'status': 'success', 'to': formatted_number, 'message': 'Message sent successfully'}
+                else:
+                    await log_message(user['id'], formatted_number, msg.message, 'failed', 'web', message_id, service_ms, elapsed_ms(started))
+                    error_msg = result.get('error', 'Failed to send message')
+                    raise HTTPException(status_code=400, detail=error_msg)
     except aiohttp.ClientError:
-        pool = await get_db_pool()
-        async with pool.acquire() as conn:
-            await conn.execute(
-                '''INSERT INTO message_logs (id, user_id, receiver_number, message_body, status, source, created_at)
-                   VALUES ($1, $2, $3, $4, $5, $6, $7)''',
-                message_id, uuid.UUID(user['id']), formatted_number, msg.message, 'failed', 'web', datetime.now(timezone.utc)
-            )
+        await log_message(
+            user['id'], formatted_number, msg.message, 'failed', 'web', message_id,
+            elapsed_ms(service_started) if service_started else None, elapsed_ms(started)
+        )
         raise HTTPException(status_code=503, detail='WhatsApp service unavailable')
     except HTTPException:
         raise
     except Exception as e:
-        pool = await get_db_pool()
-        async with pool.acquire() as conn:
-            await conn.execute(
-                '''INSERT INTO message_logs (id, user_id, receiver_number, message_body, status, source, created_at)
-                   VALUES ($1, $2, $3, $4, $5, $6, $7)''',
-                message_id, uuid.UUID(user['id']), formatted_number, msg.message, 'failed', 'web', datetime.now(timezone.utc)
-            )
+        await log_message(
+            user['id'], formatted_number, msg.message, 'failed', 'web', message_id,
+            elapsed_ms(service_started) if service_started else None, elapsed_ms(started)
+        )
         raise HTTPException(status_code=500, detail=str(e))
 
 @api_router.get('/send', response_model=MessageResponse)
 async def send_message_api(api_key: str = Query(...), number: str = Query(...), msg: str = Query(...)):
+    started = time.perf_counter()
     pool = await get_db_pool()
     async with pool.acquire() as conn:
         user = await conn.fetchrow('SELECT id, email, status FROM users WHERE api_key = $1', api_key)
@@ -937,77 +3035,81 @@ async def send_message_api(api_key: str = Query(...), number: str = Query(...),
     if user_dict.get('status') in ['suspended', 'deactive']:
         raise HTTPException(status_code=403, detail='Account is deactivated')
     
-    formatted_number = number
-    if not formatted_number.startswith('+'):
-        formatted_number = '+91' + formatted_number
+    formatted_number = format_number(number)
     
     message_id = uuid.uuid4()
+    service_started = None
     
     try:
+        node = await service_url_for(user_dict['id'])
+        await wake_if_hibernated(user_dict)
         timeout = aiohttp.ClientTimeout(total=30)
-        async with aiohttp.ClientSession(timeout=timeout) as session:
+        async with aiohttp.ClientSession(timeout=timeout, headers=service_headers()) as session:
+            service_started = time.perf_counter()
             async with session.post(
-                f'{WHATSAPP_SERVICE_URL}/send',
+                f'{node}/send',
                 json={'userId': user_dict['id'], 'number': formatted_number, 'message': msg}
             ) as response:
                 result = await response.json()
+                service_ms = elapsed_ms(service_started)
                 
-                pool = await get_db_pool()
-                async with pool.acquire() as conn:
-                    if response.status == 200 and result.get('success'):
-                        await conn.execute(
-                            '''INSERT INTO message_logs (id, user_id, receiver_number, message_body, status, source, created_at)
-                               VALUES ($1, $2, $3, $4, $5, $6, $7)''',
-                            message_id, uuid.UUID(user_dict['id']), formatted_number, msg, 'sent', 'api', datetime.now(timezone.utc)
-                        )
-                        return MessageResponse(status='success', to=formatted_number, message='Message sent.')
-                    else:
-                        await conn.execute(
-                            '''INSERT INTO message_logs (id, user_id, receiver_number, message_body, status, source, created_at)
-                               VALUES ($1, $2, $3, $4, $5, $6, $7)''',
-                            message_id, uuid.UUID(user_dict['id']), formatted_number, msg, 'failed', 'api', datetime.now(timezone.utc)
-                        )
-                        error_msg = result.get('error', 'Failed to send message')
-                        raise HTTPException(status_code=400, detail=error_msg)
+                if response.status == 200 and result.get('success'):
+                    await log_message(
+                        user_dict['id'], formatted_number, msg, 'sent', 'api', message_id, service_ms, elapsed_ms(started),
+                        (result.get('data') or {}).get('id')
+                    )
+                    return MessageResponse(status='success', to=formatted_number, message='Message sent.')
+                else:
+                    await log_message(user_dict['id'], formatted_number, msg, 'failed', 'api', message_id, service_ms, elapsed_ms(started))
+                    error_msg = result.get('error', 'Failed to send message')
+                    raise HTTPException(status_code=400, detail=error_msg)
     except aiohttp.ClientError:
-        pool = await get_db_pool()
-        async with pool.acquire() as conn:
-            await conn.execute(
-                '''INSERT INTO message_logs (id, user_id, receiver_number, message_body, status, source, created_at)
-                   VALUES ($1, $2, $3, $4, $5, $6, $7)''',
-                message_id, uuid.UUID(user_dict['id']), formatted_number, msg, 'failed', 'api', datetime.now(timezone.utc)
-            )
+        await log_message(
+            user_dict['id'], formatted_number, msg, 'failed', 'api', message_id,
+            elapsed_ms(service_started) if service_started else None, elapsed_ms(started)
+        )
         raise HTTPException(status_code=503, detail='WhatsApp service unavailable')
     except HTTPException:
         raise
     except Exception as e:
-        pool = await get_db_pool()
-        async with pool.acquire() as conn:
-            await conn.execute(
-                '''INSERT INTO message_logs (id, user_id, receiver_number, message_body, status, source, created_at)
-                   VALUES ($1, $2, $3, $4, $5, $6, $7)''',
-                message_id, uuid.UUID(user_dict['id']), formatted_number, msg, 'failed', 'api', datetime.now(timezone.utc)
-            )
+        await log_message(
+            user_dict['id'], formatted_number, msg, 'failed', 'api', message_id,
+            elapsed_ms(service_started) if service_started else None, elapsed_ms(started)
+        )
         raise HTTPException(status_code=500, detail=str(e))
 
 @api_router.get('/messages/logs')
 async def get_message_logs(
     user: dict = Depends(get_current_user),
     status: Optional[str] = None,
-    limit: int = 50
+    limit: int = 50,
+    from_date: Optional[datetime] = None,
+    to_date: Optional[datetime] = None
 ):
+    from_date = as_utc(from_date)
+    to_date = as_utc(to_date)
+    
+    conditions = ['user_id = $1']
+    values = [uuid.UUID(user['id'])]
+    if status:
+        values.append(status)
+        conditions.append(f'status = ${len(values)}')
+    if from_date:
+        values.append(from_date)
+        conditions.append(f'created_at >= ${len(values)}')
+    if to_date:
+        values.append(to_date)
+        conditions.append(f'created_at < ${len(values)}')
+    values.append(limit)
+    
     pool = await get_db_pool()
     async with pool.acquire() as conn:
-        if status:
-            logs = await conn.fetch(
-                'SELECT * FROM message_logs WHERE user_id = $1 AND status = $2 ORDER BY created_at DESC LIMIT $3',
-                uuid.UUID(user['id']), status, limit
-            )
-        else:
-            logs = await conn.fetch(
-                'SELECT * FROM message_logs WHERE user_id = $1 ORDER BY created_at DESC LIMIT $2',
-                uuid.UUID(user['id']), limit
-            )
+        logs = await conn.fetch(
+            f"SELECT * FROM message_logs WHERE {' AND '.join(conditions)} ORDER BY created_at DESC LIMIT ${len(values)}",
+            *values
+        )
+        # Read after the hot rows, so rows archived in between are covered by it
+        archived_days = await load_archive_days(conn, user['id'], from_date, to_date) if len(logs) < limit else []
     
     logs_list = []
     for log in logs:
@@ -1016,8 +3118,118 @@ async def get_message_logs(
         log_dict['user_id'] = str(log_dict['user_id'])
         logs_list.append(log_dict)
     
+    # Archived rows are older than the hot rows, so read them newest day first only to fill the page
+    seen = {log['id'] for log in logs_list}
+    for day in archived_days:
+        if len(logs_list) >= limit:
+            break
+        for log in await asyncio.to_thread(read_archive_day, user['id'], day, from_date, to_date, status):
+            if log['id'] not in seen:
+                seen.add(log['id'])
+                logs_list.append(log)
+    if len(logs_list) > len(logs):
+        logs_list.sort(key=lambda log: log['created_at'], reverse=True)
+        logs_list = logs_list[:limit]
+    
     return logs_list
 
+# Live log streaming: clients apply message_logged/message_status events and,
+# after reconnecting, fetch only the changes they missed
+MESSAGE_LOG_RESUME_LIMIT = 500
+
+@api_router.get('/messages/logs/since')
+async def get_message_logs_since(
+    seq: int = Query(..., ge=0),
+    limit: int = Query(MESSAGE_LOG_RESUME_LIMIT, ge=1, le=MESSAGE_LOG_RESUME_LIMIT),
+    user: dict = Depends(get_current_user)
+):
+    """
+    Logs inserted or updated after seq, oldest change first. seq is drawn when a
+    row is written, not when it commits, so a slow transaction can commit a seq
+    below one already served; clients resume from a window before their last
+    seq and de-duplicate by id.
+    """
+    pool = await get_db_pool()
+    async with pool.acquire() as conn:
+        rows = await conn.fetch(
+            '''SELECT id, receiver_number, message_body, status, source, delivery_ack, seq, created_at
+               FROM message_logs WHERE user_id = $1 AND seq > $2 ORDER BY seq LIMIT $3''',
+            uuid.UUID(user['id']), seq, limit + 1
+        )
+    
+    logs = []
+    for row in rows[:limit]:
+        log_dict = record_to_dict(row)
+        log_dict['id'] = str(log_dict['id'])
+        logs.append(log_dict)
+    
+    return {
+        'logs': logs,
+        'last_seq': logs[-1]['seq'] if logs else seq,
+        'has_more': len(rows) > limit
+    }
+
+@api_router.get('/messages/logs/export')
+async def export_message_logs(
+    user: dict = Depends(get_current_user),
+    status: Optional[str] = None,
+    from_date: Optional[datetime] = None,
+    to_date: Optional[datetime] = None
+):
+    """Stream the user's message logs as CSV, including archived ranges"""
+    from_date = as_utc(from_date)
+    to_date = as_utc(to_date)
+    columns = ['id', 'receiver_number', 'message_body', 'status', 'source', 'created_at']
+    
+    conditions = ['user_id = $1']
+    values = [uuid.UUID(user['id'])]
+    if status:
+        values.append(status)
+        conditions.append(f'status = ${len(values)}')
+    if from_date:
+        values.append(from_date)
+        conditions.append(f'created_at >= ${len(values)}')
+    if to_date:
+        values.append(to_date)
+        conditions.append(f'created_at < ${len(values)}')
+    query = f"SELECT {', '.join(columns)} FROM message_logs WHERE {' AND '.join(conditions)} ORDER BY created_at DESC"
+    
+    def to_csv(rows):
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        for row in rows:
+            writer.writerow([row[c].isoformat() if isinstance(row[c], datetime) else str(row[c]) for c in columns])
+        return buffer.getvalue()
+    
+    async def generate():
+        yield ','.join(columns) + '\r\n'
+        seen = set()
+        pool = await get_db_pool()
+        async with pool.acquire() as conn:
+            async with conn.transaction():
+                batch = []
+                async for row in conn.cursor(query, *values, prefetch=1000):
+                    seen.add(str(row['id']))
+                    batch.append(row)
+                    if len(batch) >= 1000:
+                        yield to_csv(batch)
+                        batch = []
+                if batch:
+                    yield to_csv(batch)
+            archived_days = await load_archive_days(conn, user['id'], from_date, to_date)
+        for day in archived_days:
+            archived = await asyncio.to_thread(read_archive_day, user['id'], day, from_date, to_date, status)
+            archived = [log for log in archived if log['id'] not in seen]
+            seen.update(log['id'] for log in archived)
+            if archived:
+                yield to_csv(archived)
+    
+    return StreamingResponse(
+        generate(),
+        media_type='text/csv',
+        headers={'Content-Disposition': 'attachment; filename="message_logs.csv"'}
+    )
+
 @api_router.post('/keys/regenerate')
 async def regenerate_api_key(user: dict = Depends(get_current_user)):
     new_key = secrets.token_urlsafe(32)
@@ -1029,6 +3241,217 @@ async def regenerate_api_key(user: dict = Depends(get_current_user)):
     await log_activity(user['id'], user['email'], 'API_KEY_REGENERATED', 'User regenerated API key')
     return {'api_key': new_key, 'message': 'API key regenerated successfully'}
 
+# ============================================
+# Message Log Archive
+# ============================================
+# Rows older than MESSAGE_ARCHIVE_AFTER_DAYS are moved out of Postgres into
+# gzip-compressed JSONL files partitioned as <day>/<user_id>.jsonl.gz.
+# message_archive_state records the newest archived created_at and the
+# oldest partition day, and message_archive_days each user's partitions; both
+# advance in the same transaction that deletes a batch, so every row is
+# readable from message_logs, the archive, or both. Partition files are
+# rewritten whole and renamed into place, so readers never see a partial batch.
+
+MESSAGE_ARCHIVE_DIR = Path(os.environ.get('MESSAGE_ARCHIVE_DIR', ROOT_DIR / 'archive' / 'message_logs'))
+MESSAGE_ARCHIVE_AFTER_DAYS = int(os.environ.get('MESSAGE_ARCHIVE_AFTER_DAYS', '0'))
+MESSAGE_ARCHIVE_BATCH_SIZE = int(os.environ.get('MESSAGE_ARCHIVE_BATCH_SIZE', '5000'))
+MESSAGE_ARCHIVE_INTERVAL = int(os.environ.get('MESSAGE_ARCHIVE_INTERVAL', '3600'))
+ARCHIVE_LOCK_ID = 72610026
+
+def as_utc(value: Optional[datetime]) -> Optional[datetime]:
+    if value is not None and value.tzinfo is None:
+        return value.replace(tzinfo=timezone.utc)
+    return value
+
+def _json_default(value):
+    if isinstance(value, datetime):
+        return value.isoformat()
+    return str(value)
+
+def archive_partition_path(day, user_id: str) -> Path:
+    return MESSAGE_ARCHIVE_DIR / day.isoformat() / f'{user_id}.jsonl.gz'
+
+def archive_days(state: tuple, from_date: Optional[datetime], to_date: Optional[datetime]) -> list:
+    """Every calendar day that can hold archived rows in [from_date, to_date), newest first"""
+    archived_until, oldest_day = state
+    last = min(to_date, archived_until) if to_date else archived_until
+    last_day = last.astimezone(timezone.utc).date()
+    first_day = max(from_date.astimezone(timezone.utc).date(), oldest_day) if from_date else oldest_day
+    return [last_day - timedelta(days=i) for i in range((last_day - first_day).days + 1)]
+
+async def load_archive_days(conn, user_id: str, from_date: Optional[datetime], to_date: Optional[datetime]) -> list:
+    """Partition days holding the user's archived rows in [from_date, to_date), newest first"""
+    state = await conn.fetchrow(
+        "SELECT archived_until, oldest_day, days_indexed FROM message_archive_state WHERE id = 'message_logs'"
+    )
+    if state is None:
+        return []
+    if not state['days_indexed']:
+        # Partitions from before the day index; the archiver lists them on its next run
+        return archive_days((state['archived_until'], state['oldest_day']), from_date, to_date)
+    rows = await conn.fetch(
+        '''SELECT day FROM message_archive_days
+           WHERE user_id = $1 AND ($2::date IS NULL OR day >= $2) AND ($3::date IS NULL OR day <= $3)
+           ORDER BY day DESC''',
+        uuid.UUID(user_id),
+        from_date.astimezone(timezone.utc).date() if from_date else None,
+        to_date.astimezone(timezone.utc).date() if to_date else None
+    )
+    return [row['day'] for row in rows]
+
+def list_archive_partitions() -> list:
+    """(user_id, day) of every partition file on disk"""
+    partitions = []
+    if not MESSAGE_ARCHIVE_DIR.exists():
+        return partitions
+    for day_dir in MESSAGE_ARCHIVE_DIR.iterdir():
+        try:
+            day = date.fromisoformat(day_dir.name)
+        except ValueError:
+            continue
+        for path in day_dir.glob('*.jsonl.gz'):
+            partitions.append((uuid.UUID(path.name[:-len('.jsonl.gz')]), day))
+    return partitions
+
+def write_archive_batch(rows) -> list:
+    """
+    Add rows to their day/user partitions and fsync before the caller deletes
+    them; returns the (user_id, day) partitions written
+    """
+    partitions: Dict[tuple, list] = {}
+    for row in rows:
+        row_dict = record_to_dict(row)
+        key = (row_dict['created_at'].astimezone(timezone.utc).date(), str(row_dict['user_id']))
+        partitions.setdefault(key, []).append(row_dict)
+    
+    for (day, user_id), partition_rows in partitions.items():
+        path = archive_partition_path(day, user_id)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        # The existing members are copied and the batch added as a new gzip member
+        # (gzip.open reads multi-member files transparently), then the copy replaces
+        # the partition, so a concurrent read sees the old file or the new one
+        tmp_path = path.with_name(path.name + '.tmp')
+        with open(tmp_path, 'wb') as raw:
+            if path.exists():
+                with open(path, 'rb') as existing:
+                    shutil.copyfileobj(existing, raw)
+            with gzip.GzipFile(fileobj=raw, mode='ab') as gz:
+                for row_dict in partition_rows:
+                    gz.write((json.dumps(row_dict, default=_json_default) + '\n').encode('utf-8'))
+            raw.flush()
+            os.fsync(raw.fileno())
+        os.replace(tmp_path, path)
+    
+    for day_dir in {archive_partition_path(day, user_id).parent for day, user_id in partitions}:
+        dir_fd = os.open(day_dir, os.O_RDONLY)
+        try:
+            os.fsync(dir_fd)
+        finally:
+            os.close(dir_fd)
+    return [(uuid.UUID(user_id), day) for day, user_id in partitions]
+
+def read_archive_day(
+    user_id: str, day, from_date: Optional[datetime] = None, to_date: Optional[datetime] = None, status: Optional[str] = None
+) -> list:
+    """A user's archived logs for one day within [from_date, to_date), newest first"""
+    path = archive_partition_path(day, user_id)
+    if not path.exists():
+        return []
+    
+    logs = []
+    seen = set()
+    with gzip.open(path, 'rt', encoding='utf-8') as f:
+        for line in read_complete_lines(f, path):
+            log = json.loads(line)
+            created_at = datetime.fromisoformat(log['created_at'])
+            # A crash between fsync and DELETE can archive the same row twice
+            if log['id'] in seen:
+                continue
+            if (from_date and created_at < from_date) or (to_date and created_at >= to_date):
+                continue
+            if status and log['status'] != status:
+                continue
+            seen.add(log['id'])
+            log['created_at'] = created_at
+            logs.append(log)
+    
+    logs.sort(key=lambda log: log['created_at'], reverse=True)
+    return logs
+
+def read_complete_lines(f, path: Path):
+    """Lines of a partition, stopping at a truncated tail left by a crash in an older append-in-place write"""
+    try:
+        for line in f:
+            if not line.endswith('\n'):
+                break
+            yield line
+    except (EOFError, gzip.BadGzipFile, zlib.error) as e:
+        logger.warning(f'[Archive] Ignoring truncated tail of {path}: {e}')
+
+async def index_archive_partitions(conn):
+    """List partitions written before message_archive_days existed into it, once"""
+    if await conn.fetchval("SELECT days_indexed FROM message_archive_state WHERE id = 'message_logs'") is not False:
+        return
+    partitions = await asyncio.to_thread(list_archive_partitions)
+    async with conn.transaction():
+        await conn.execute(
+            '''INSERT INTO message_archive_days (user_id, day)
+               SELECT * FROM unnest($1::uuid[], $2::date[]) ON CONFLICT DO NOTHING''',
+            [user_id for user_id, _ in partitions], [day for _, day in partitions]
+        )
+        await conn.execute("UPDATE message_archive_state SET days_indexed = TRUE WHERE id = 'message_logs'")
+    logger.info(f'[Archive] Indexed {len(partitions)} existing archive partitions')
+
+async def archive_message_logs(older_than_days: int, batch_size: int = MESSAGE_ARCHIVE_BATCH_SIZE) -> int:
+    """Move message logs older than the given number of days to the archive, in bounded batches"""
+    today = datetime.now(timezone.utc).replace(hour=0, minute=0, second=0, microsecond=0)
+    cutoff = today - timedelta(days=older_than_days)
+    archived = 0
+    
+    pool = await get_db_pool()
+    async with pool.acquire() as conn:
+        # Only one worker may write archive partitions at a time
+        if not await conn.fetchval('SELECT pg_try_advisory_lock($1)', ARCHIVE_LOCK_ID):
+            logger.info('[Archive] Another archiver is running, skipping')
+            return 0
+        try:
+            await index_archive_partitions(conn)
+            while True:
+                rows = await conn.fetch(
+                    'SELECT * FROM message_logs WHERE created_at < $1 ORDER BY created_at LIMIT $2',
+                    cutoff, batch_size
+                )
+                if not rows:
+                    break
+                partitions = await asyncio.to_thread(write_archive_batch, rows)
+                async with conn.transaction():
+                    await conn.execute('DELETE FROM message_logs WHERE id = ANY($1::uuid[])', [r['id'] for r in rows])
+                    await conn.execute(
+                        '''INSERT INTO message_archive_days (user_id, day)
+                           SELECT * FROM unnest($1::uuid[], $2::date[]) ON CONFLICT DO NOTHING''',
+                        [user_id for user_id, _ in partitions], [day for _, day in partitions]
+                    )
+                    await conn.execute('''
+                        INSERT INTO message_archive_state (id, archived_until, oldest_day) VALUES ('message_logs', $1, $2)
+                        ON CONFLICT (id) DO UPDATE SET
+                            archived_until = GREATEST(message_archive_state.archived_until, EXCLUDED.archived_until),
+                            oldest_day = LEAST(message_archive_state.oldest_day, EXCLUDED.oldest_day)
+                    ''', rows[-1]['created_at'], rows[0]['created_at'].astimezone(timezone.utc).date())
+                archived += len(rows)
+        finally:
+            await conn.execute('SELECT pg_advisory_unlock($1)', ARCHIVE_LOCK_ID)
+    
+    logger.info(f'[Archive] Archived {archived} message logs older than {cutoff.date()}')
+    return archived
+
+async def message_archive_loop():
+    while True:
+        try:
+            await archive_message_logs(MESSAGE_ARCHIVE_AFTER_DAYS)
+        except Exception as e:
+            logger.error(f'[Archive] Archive run failed: {e}')
+        await asyncio.sleep(MESSAGE_ARCHIVE_INTERVAL)
+
 # ============================================
 # Socket.IO Event Handlers
 # ============================================
@@ -1090,25 +3513,135 @@ async def emit_to_user(user_id: str, event: str, data: dict):
     await sio.emit(event, data, room=room)
     logger.info(f"[Socket.IO] Emitted '{event}' to user {user_id}")
 
-# Internal API endpoint for WhatsApp service to send events
-@api_router.post('/internal/ws-event')
+# Internal event ingestion from the WhatsApp service. Without a secret the
+# endpoints refuse everything, unless INTERNAL_EVENTS_INSECURE opts out for
+# local development; otherwise anyone reaching the port could push events
+# into any user's room
+INTERNAL_EVENT_SECRET = os.environ.get('INTERNAL_EVENT_SECRET', '')
+INTERNAL_EVENTS_INSECURE = os.environ.get('INTERNAL_EVENTS_INSECURE', 'false').lower() == 'true'
+# Events made obsolete by any later event for the same user in a batch
+SUPERSEDED_EVENTS = {'qr_code'}
+
+def internal_secret_valid(secret: Optional[str]) -> bool:
+    if not INTERNAL_EVENT_SECRET:
+        return INTERNAL_EVENTS_INSECURE
+    return hmac.compare_digest(secret or '', INTERNAL_EVENT_SECRET)
+
+async def verify_internal_secret(x_internal_secret: Optional[str] = Header(None)):
+    if not internal_secret_valid(x_internal_secret):
+        raise HTTPException(status_code=401, detail='Invalid internal secret')
+
+def coalesce_events(events: List[dict]) -> List[dict]:
+    """Drop events superseded by a later one for the same user, e.g. a burst of QR refreshes"""
+    last_index = {event.get('userId'): index for index, event in enumerate(events)}
+    return [
+        event for index, event in enumerate(events)
+        if event.get('event') not in SUPERSEDED_EVENTS or last_index[event.get('userId')] == index
+    ]
+
+# whatsapp-web.js message ack levels; a log's ack only ever moves forward
+DELIVERY_ACKS = {-1: 'error', 1: 'server', 2: 'delivered', 3: 'read', 4: 'played'}
+
+async def record_message_ack(user_id: str, data: dict):
+    """Store a delivery ack and tell the user's dashboards which log changed"""
+    ack = data.get('ack')
+    wa_message_id = data.get('messageId')
+    if ack not in DELIVERY_ACKS or not wa_message_id:
+        return
+    pool = await get_db_pool()
+    async with pool.acquire() as conn:
+        row = await conn.fetchrow(
+            '''UPDATE message_logs
+               SET delivery_ack = $1, seq = nextval(pg_get_serial_sequence('message_logs', 'seq'))
+               WHERE wa_message_id = $2 AND user_id = $3 AND (delivery_ack IS NULL OR delivery_ack < $1)
+               RETURNING id, seq''',
+            ack, wa_message_id, uuid.UUID(user_id)
+        )
+    if row:
+        await emit_to_user(user_id, 'message_status', {'seq': row['seq'], 'id': str(row['id']), 'delivery_ack': ack})
+
+def valid_event(event_data) -> bool:
+    return (
+        isinstance(event_data, dict)
+        and isinstance(event_data.get('event'), str) and bool(event_data['event'])
+        and isinstance(event_data.get('userId'), str) and bool(event_data['userId'])
+        and isinstance(event_data.get('data', {}), dict)
+    )
+
+async def dispatch_events(events: List[Any]) -> int:
+    """Apply and broadcast events; a malformed event or failing handler is logged and skipped"""
+    valid = []
+    for event_data in events:
+        if valid_event(event_data):
+            valid.append(event_data)
+        else:
+            logger.warning(f"[Socket.IO] Ignoring malformed internal event: {event_data!r:.200}")
+    delivered = 0
+    for event_data in coalesce_events(valid):
+        event_type = event_data['event']
+        user_id = event_data['userId']
+        data = event_data.get('data', {})
+        try:
+            if event_type == 'message_ack':
+                await record_message_ack(user_id, data)
+            else:
+                apply_session_event(user_id, event_type, data)
+                await emit_to_user(user_id, event_type, data)
+        except Exception as e:
+            logger.error(f"[Socket.IO] Failed to handle {event_type} for user {user_id}: {e}")
+            continue
+        delivered += 1
+    return delivered
+
+@api_router.post('/internal/ws-event', dependencies=[Depends(verify_internal_secret)])
 async def receive_whatsapp_event(event_data: dict):
     """
     Receive events from WhatsApp service and broadcast via Socket.IO
-    Events: qr_code, whatsapp_connected, whatsapp_disconnected
+    Events: qr_code, whatsapp_connected, whatsapp_disconnected, message_ack
     """
     event_type = event_data.get('event')
     user_id = event_data.get('userId')
-    data = event_data.get('data', {})
     
-    if not event_type or not user_id:
+    if not valid_event(event_data):
         raise HTTPException(status_code=400, detail='Missing event or userId')
     
     # Emit to user's room via Socket.IO
-    await emit_to_user(user_id, event_type, data)
+    await dispatch_events([event_data])
     
     return {'success': True, 'event': event_type, 'userId': user_id}
 
+@api_router.post('/internal/ws-events', dependencies=[Depends(verify_internal_secret)])
+async def receive_whatsapp_events(events: List[Any]):
+    """Receive a batch of WhatsApp service events, coalesced per user before broadcast"""
+    delivered = await dispatch_events(events)
+    return {'success': True, 'received': len(events), 'delivered': delivered}
+
+@api_router.websocket('/internal/ws-events/stream')
+async def stream_whatsapp_events(websocket: WebSocket):
+    """
+    Persistent channel for WhatsApp service events; each frame is a JSON array of
+    events. Bad frames and events are logged and skipped, so one bad item never
+    closes the channel and pushes the node back to HTTP.
+    """
+    if not internal_secret_valid(websocket.headers.get('x-internal-secret')):
+        await websocket.close(code=1008)
+        return
+    await websocket.accept()
+    try:
+        while True:
+            frame = await websocket.receive_text()
+            try:
+                events = json.loads(frame)
+            except ValueError as e:
+                logger.error(f"[Socket.IO] Skipping unparseable event frame: {e}")
+                continue
+            try:
+                await dispatch_events(events if isinstance(events, list) else [events])
+            except Exception as e:
+                logger.error(f"[Socket.IO] Failed to dispatch event frame: {e}")
+    except WebSocketDisconnect:
+        pass
+
 # Include router
 app.include_router(api_router)
 
@@ -1119,6 +3652,7 @@ app.add_middleware(
     allow_origins=os.environ.get('CORS_ORIGINS', '*').split(','),
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Cache-Age"],
 )
 
 # Create Socket.IO ASGI app wrapping FastAPI
@@ -89,6 +89,30 @@ class TestAdminUsers:
         assert isinstance(data["users"], list)
         assert data["total"] >= 1  # At least admin user exists
         
+    def test_search_users_by_email(self):
+        """Test email substring search and status filter"""
+        response = requests.get(f"{BASE_URL}/api/admin/users?q=admin&status=active", headers=self.headers)
+        assert response.status_code == 200
+        
+        data = response.json()
+        assert all("admin" in u["email"].lower() for u in data["users"])
+        assert all(u["status"] == "active" for u in data["users"])
+        
+    def test_users_cursor_pagination(self):
+        """Test cursor pages sorted by message volume do not overlap"""
+        first = requests.get(f"{BASE_URL}/api/admin/users?sort=messages&limit=2", headers=self.headers)
+        assert first.status_code == 200
+        
+        data = first.json()
+        if data["next_cursor"]:
+            second = requests.get(
+                f"{BASE_URL}/api/admin/users?sort=messages&limit=2&cursor={data['next_cursor']}",
+                headers=self.headers
+            )
+            assert second.status_code == 200
+            first_ids = {u["id"] for u in data["users"]}
+            assert not first_ids & {u["id"] for u in second.json()["users"]}
+        
     def test_create_user(self):
         """Test creating a new user via admin"""
         test_email = f"TEST_admin_created_{os.urandom(4).hex()}@test.com"
@@ -114,6 +138,45 @@ class TestAdminUsers:
         created_user = next((u for u in users if u["email"] == test_email), None)
         assert created_user is not None, "Created user not found"
         
+    def test_bulk_update_users(self):
+        """Test changing the rate limit of several users in one call"""
+        user_ids = []
+        for _ in range(2):
+            create_response = requests.post(f"{BASE_URL}/api/admin/users", headers=self.headers, json={
+                "email": f"TEST_bulk_{os.urandom(4).hex()}@test.com",
+                "password": "TestPass@123"
+            })
+            assert create_response.status_code == 200
+            user_ids.append(create_response.json()["user_id"])
+        
+        response = requests.post(f"{BASE_URL}/api/admin/users/bulk", headers=self.headers, json={
+            "action": "rate_limit",
+            "value": 77,
+            "ids": user_ids
+        })
+        assert response.status_code == 200
+        assert response.json()["affected"] == 2
+        
+        for user_id in user_ids:
+            user = requests.get(f"{BASE_URL}/api/admin/users/{user_id}", headers=self.headers).json()
+            assert user["rate_limit"] == 77
+        
+        delete_response = requests.post(f"{BASE_URL}/api/admin/users/bulk", headers=self.headers, json={
+            "action": "delete",
+            "ids": user_ids
+        })
+        assert delete_response.status_code == 200
+        assert delete_response.json()["affected"] == 2
+        
+    def test_bulk_update_rejects_empty_filter(self):
+        """Test bulk operations refuse to target every user"""
+        response = requests.post(f"{BASE_URL}/api/admin/users/bulk", headers=self.headers, json={
+            "action": "status",
+            "value": "deactive",
+            "filter": {}
+        })
+        assert response.status_code == 400
+        
     def test_update_user(self):
         """Test updating a user"""
         # First create a user
@@ -210,6 +273,68 @@ class TestAdminAnalytics:
         
         data = response.json()
         assert isinstance(data, list)
+        
+    def test_get_recipient_analytics(self):
+        """Test approximate unique recipients per day"""
+        response = requests.get(f"{BASE_URL}/api/admin/analytics/recipients?days=7", headers=self.headers)
+        assert response.status_code == 200
+        
+        data = response.json()
+        assert data["scope"] == "all"
+        assert data["unique_recipients"] >= 0
+        assert isinstance(data["days"], list)
+        
+    def test_get_region_analytics(self):
+        """Test sent/failed breakdown by recipient region"""
+        response = requests.get(f"{BASE_URL}/api/admin/analytics/regions?days=30", headers=self.headers)
+        assert response.status_code == 200
+        
+        for region in response.json():
+            assert region["sent"] + region["failed"] <= region["total"]
+            assert 0 <= region["failure_rate"] <= 100
+        
+    def test_get_message_analytics_with_timezone(self):
+        """Test message analytics bucketed by local (IST) days"""
+        response = requests.get(f"{BASE_URL}/api/admin/analytics/messages?days=7&tz=Asia/Kolkata", headers=self.headers)
+        assert response.status_code == 200
+        assert isinstance(response.json(), list)
+        
+    def test_get_message_heatmap(self):
+        """Test hour-of-day by weekday heatmap"""
+        response = requests.get(f"{BASE_URL}/api/admin/analytics/heatmap?days=28&tz=Asia/Kolkata", headers=self.headers)
+        assert response.status_code == 200
+        
+        data = response.json()
+        assert data["tz"] == "Asia/Kolkata"
+        for cell in data["cells"]:
+            assert 1 <= cell["weekday"] <= 7
+            assert 0 <= cell["hour"] <= 23
+        
+    def test_analytics_invalid_timezone(self):
+        """Test unknown timezones are rejected"""
+        response = requests.get(f"{BASE_URL}/api/admin/analytics/heatmap?tz=Mars/Olympus", headers=self.headers)
+        assert response.status_code == 400
+        
+    def test_get_latency_analytics(self):
+        """Test fetching send latency percentiles per source"""
+        response = requests.get(f"{BASE_URL}/api/admin/analytics/latency?days=7&group_by=source", headers=self.headers)
+        assert response.status_code == 200
+        
+        data = response.json()
+        assert data["group_by"] == "source"
+        for group in data["groups"]:
+            assert "p50" in group and "p90" in group and "p99" in group
+            assert sum(b["count"] for b in group["histogram"]) == group["count"]
+        
+    def test_analytics_cache_age_header(self):
+        """Test analytics responses are cached and report their age"""
+        first = requests.get(f"{BASE_URL}/api/admin/analytics/messages?days=30", headers=self.headers)
+        second = requests.get(f"{BASE_URL}/api/admin/analytics/messages?days=30", headers=self.headers)
+        assert first.status_code == 200
+        assert second.status_code == 200
+        assert "X-Cache-Age" in second.headers
+        assert int(second.headers["X-Cache-Age"]) >= 0
+        assert second.json() == first.json()
 
 
 class TestAdminSystem:
@@ -237,6 +362,28 @@ class TestAdminSystem:
         assert "whatsapp_service" in data
         assert "database" in data
         assert "timestamp" in data
+    
+    def test_system_status_session_counts(self):
+        """Test that system status reports active and hibernated WhatsApp sessions"""
+        response = requests.get(f"{BASE_URL}/api/admin/system/status", headers=self.headers)
+        assert response.status_code == 200
+        
+        sessions = response.json()["whatsapp_service"]["sessions"]
+        assert sessions["active"] >= 0
+        assert sessions["hibernated"] >= 0
+    
+    def test_health_live_and_ready(self):
+        """Test liveness and cached readiness probes"""
+        response = requests.get(f"{BASE_URL}/api/health/live")
+        assert response.status_code == 200
+        assert response.json()["status"] == "ok"
+        
+        response = requests.get(f"{BASE_URL}/api/health/ready")
+        assert response.status_code in [200, 503]
+        data = response.json()
+        assert data["status"] in ["ready", "not_ready"]
+        assert "saturation" in data["pool"]
+        assert "pending_rollup_keys" in data["queues"]
 
 
 class TestAdminWhatsApp:
@@ -262,6 +409,28 @@ class TestAdminWhatsApp:
         
         data = response.json()
         assert "global_session" in data
+        
+    def test_get_whatsapp_sessions_filtered(self):
+        """Test filtering and paginating WhatsApp sessions by status"""
+        response = requests.get(f"{BASE_URL}/api/admin/whatsapp/sessions?status=connected&limit=5", headers=self.headers)
+        assert response.status_code == 200
+        
+        data = response.json()
+        assert len(data["sessions"]) <= 5
+        assert all(s["status"] == "connected" for s in data["sessions"])
+
+    def test_rebalance_dry_run(self):
+        """Test planning a session rebalance without moving anything"""
+        response = requests.post(f"{BASE_URL}/api/admin/whatsapp/rebalance?dry_run=true", headers=self.headers)
+        assert response.status_code in [200, 503]
+
+        if response.status_code == 200:
+            data = response.json()
+            assert data["planned"] == sum(data["by_target"].values())
+
+        response = requests.get(f"{BASE_URL}/api/admin/whatsapp/rebalance", headers=self.headers)
+        assert response.status_code == 200
+        assert "state" in response.json()
 
 
 class TestAdminSettings:
@@ -101,6 +101,22 @@ class TestWhatsAppInitialize:
         else:
             print("WhatsApp service unavailable (503)")
 
+    def test_initialize_reports_queue_position(self):
+        """Test that initialization reports whether it is queued or starting"""
+        response = requests.post(f"{BASE_URL}/api/whatsapp/initialize", headers=self.headers)
+        if response.status_code == 503:
+            pytest.skip("WhatsApp service unavailable or low on memory")
+        assert response.status_code == 200
+        
+        data = response.json()
+        assert data["status"] in ["queued", "initializing", "already_connected"]
+        if data["status"] == "queued":
+            assert data["position"] >= 1
+        
+        status = requests.get(f"{BASE_URL}/api/whatsapp/status", headers=self.headers).json()
+        if status["status"] == "queued":
+            assert status["position"] >= 1
+
 
 class TestWhatsAppQRCode:
     """Test WhatsApp QR code endpoint"""
@@ -414,6 +430,21 @@ class TestMessageLogs:
         for log in data:
             if "status" in log:
                 assert log["status"] == "sent", f"Expected status 'sent', got '{log['status']}'"
+    
+    def test_get_message_logs_since(self):
+        """Test resuming message logs from a sequence number"""
+        response = requests.get(f"{BASE_URL}/api/messages/logs/since?seq=0&limit=5", headers=self.headers)
+        assert response.status_code == 200
+        
+        data = response.json()
+        assert len(data["logs"]) <= 5
+        seqs = [log["seq"] for log in data["logs"]]
+        assert seqs == sorted(seqs), "Expected logs in sequence order"
+        
+        # Resuming from the returned cursor never repeats a log
+        response = requests.get(f"{BASE_URL}/api/messages/logs/since?seq={data['last_seq']}", headers=self.headers)
+        assert response.status_code == 200
+        assert all(log["seq"] > data["last_seq"] for log in response.json()["logs"])
 
 
 class TestAPIKeyManagement:
@@ -18,6 +18,7 @@ export default function Dashboard({ user }) {
   const [phoneNumber, setPhoneNumber] = useState(null);
   const [loading, setLoading] = useState(false);
   const [isInitializing, setIsInitializing] = useState(false);
+  const [queuePosition, setQueuePosition] = useState(null);
   const [initialCheckDone, setInitialCheckDone] = useState(false);
   const [socketConnected, setSocketConnected] = useState(false);
   const socketRef = useRef(null);
@@ -78,6 +79,30 @@ export default function Dashboard({ user }) {
       }
     });
 
+    // Place in line while connections are being started one batch at a time
+    socket.on('whatsapp_init_queued', (data) => {
+      setQueuePosition(data.position);
+      setStatus(data.position > 0 ? 'queued' : 'initializing');
+      setIsInitializing(true);
+    });
+
+    socket.on('whatsapp_init_rejected', (data) => {
+      setStatus('disconnected');
+      setQueuePosition(null);
+      setIsInitializing(false);
+      alert(data.error || 'Could not start WhatsApp. Please try again.');
+    });
+
+    // Idle session stopped to save resources; it wakes on the next send
+    socket.on('whatsapp_hibernated', (data) => {
+      setStatus('hibernated');
+      setQrCode(null);
+      setIsInitializing(false);
+      if (data.phoneNumber) {
+        setPhoneNumber(data.phoneNumber);
+      }
+    });
+
     // Real-time WhatsApp disconnected event
     socket.on('whatsapp_disconnected', (data) => {
       console.log('[Socket.IO] WhatsApp disconnected:', data);
@@ -138,6 +163,7 @@ export default function Dashboard({ user }) {
       
       const currentStatus = response.data.status;
       setStatus(currentStatus);
+      setQueuePosition(currentStatus === 'queued' ? response.data.position : null);
       
       // Set phone number if available
       if (response.data.phoneNumber) {
@@ -199,7 +225,10 @@ export default function Dashboard({ user }) {
         headers: { Authorization: `Bearer ${token}` }
       });
       
-      if (response.data.status === 'connected' || response.data.status === 'already_connected') {
+      if (response.data.status === 'queued') {
+        setStatus('queued');
+        setQueuePosition(response.data.position);
+      } else if (response.data.status === 'connected' || response.data.status === 'already_connected') {
         setStatus('connected');
         setIsInitializing(false);
         if (response.data.phoneNumber) {
@@ -208,7 +237,7 @@ export default function Dashboard({ user }) {
       }
     } catch (error) {
       if (error.response?.status === 503) {
-        alert('WhatsApp service is temporarily unavailable. Please try again.');
+        alert(error.response.data?.detail || 'WhatsApp service is temporarily unavailable. Please try again.');
       }
       setStatus('disconnected');
       setIsInitializing(false);
@@ -296,17 +325,19 @@ export default function Dashboard({ user }) {
           <>
             <div style={{ marginBottom: '24px' }}>
               <div style={{ display: 'flex', alignItems: 'center', gap: '12px', flexWrap: 'wrap' }}>
-                <span className={`status-badge ${status === 'connected' || status === 'authenticated' ? 'connected' : (status === 'qr_ready' || status === 'initializing') ? 'qr_ready' : 'disconnected'}`} data-testid="connection-status">
+                <span className={`status-badge ${status === 'connected' || status === 'authenticated' || status === 'hibernated' ? 'connected' : (status === 'qr_ready' || status === 'initializing' || status === 'queued') ? 'qr_ready' : 'disconnected'}`} data-testid="connection-status">
                   {(status === 'connected' || status === 'authenticated') && '🟢 Connected'}
+                  {status === 'hibernated' && '💤 Sleeping'}
                   {status === 'disconnected' && '🔴 Disconnected'}
-                  {(status === 'qr_ready' || isInitializing) && '🟡 Waiting for QR Scan'}
+                  {(status === 'qr_ready' || (isInitializing && status !== 'queued')) && '🟡 Waiting for QR Scan'}
+                  {status === 'queued' && '🟡 Queued'}
                   {status === 'initializing' && !isInitializing && '🟡 Initializing...'}
                   {status === 'checking' && '🟡 Checking...'}
                   {status === 'disconnecting' && '🟡 Disconnecting...'}
                 </span>
                 
                 {/* Show connected phone number */}
-                {(status === 'connected' || status === 'authenticated') && phoneNumber && (
+                {(status === 'connected' || status === 'authenticated' || status === 'hibernated') && phoneNumber && (
                   <span style={{ 
                     padding: '8px 16px', 
                     background: '#dcfce7', 
@@ -340,10 +371,12 @@ export default function Dashboard({ user }) {
           </div>
         )}
 
-        {(status === 'initializing' || (isInitializing && !qrCode)) && (
+        {(status === 'initializing' || status === 'queued' || (isInitializing && !qrCode)) && (
           <div>
-            <div className="alert alert-info">
-              🔄 Initializing WhatsApp connection... QR code will appear in 5-10 seconds.
+            <div className="alert alert-info" data-testid="initializing-message">
+              {status === 'queued' && queuePosition
+                ? `⏳ Waiting for a free slot to start WhatsApp... You are #${queuePosition} in line.`
+                : '🔄 Initializing WhatsApp connection... QR code will appear in 5-10 seconds.'}
             </div>
             <div style={{ textAlign: 'center', padding: '40px' }}>
               <div style={{ display: 'inline-block' }}>
@@ -385,8 +418,13 @@ export default function Dashboard({ user }) {
           </div>
         )}
 
-        {(status === 'connected' || status === 'authenticated') && (
+        {(status === 'connected' || status === 'authenticated' || status === 'hibernated') && (
           <div>
+            {status === 'hibernated' ? (
+              <div className="alert alert-info" data-testid="hibernated-message">
+                💤 Your WhatsApp session is sleeping after a period of inactivity. It stays logged in and wakes up automatically when you send your next message.
+              </div>
+            ) : (
             <div className="alert alert-success" data-testid="connected-message">
               ✓ WhatsApp is connected and ready to send messages!
               {phoneNumber && (
@@ -395,6 +433,7 @@ export default function Dashboard({ user }) {
                 </div>
               )}
             </div>
+            )}
             <div style={{ display: 'flex', gap: '12px', marginTop: '20px' }}>
               <Link to="/send-message">
                 <button className="btn btn-primary" data-testid="send-message-button">
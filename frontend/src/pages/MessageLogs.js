@@ -1,26 +1,61 @@
-import { useState, useEffect } from 'react';
+import { useState, useEffect, useRef, useCallback } from 'react';
 import axios from 'axios';
+import { io } from 'socket.io-client';
 import Layout from '../components/Layout';
 
 const API = `/api`;
+const PAGE_SIZE = 50;
+const DELIVERY_LABELS = { '-1': 'error', 1: 'sent', 2: 'delivered', 3: 'read', 4: 'read' };
+// seq is drawn when a row is written, not when it commits, so a change can land
+// below a seq we have already seen; resume a little earlier and dedupe by id
+const RESUME_WINDOW = 1000;
 
 export default function MessageLogs({ user }) {
   const [logs, setLogs] = useState([]);
   const [loading, setLoading] = useState(true);
   const [filter, setFilter] = useState('all');
+  const [live, setLive] = useState(false);
+  const filterRef = useRef(filter);
+  const lastSeqRef = useRef(0);
 
-  useEffect(() => {
-    fetchLogs();
-    
-    // Auto-refresh every 3 seconds
-    const interval = setInterval(() => {
-      fetchLogs();
-    }, 3000);
+  const handleAuthError = (error) => {
+    if (error.response?.status === 401) {
+      localStorage.removeItem('token');
+      localStorage.removeItem('user');
+      window.location.href = '/login';
+    } else {
+      console.error('Error fetching logs:', error);
+    }
+  };
 
-    return () => clearInterval(interval);
-  }, [filter]);
+  const trackSeq = (items) => {
+    items.forEach((log) => {
+      if (log.seq > lastSeqRef.current) lastSeqRef.current = log.seq;
+    });
+  };
+
+  // Merge inserted or updated logs into the list, newest first
+  const applyChanges = useCallback((changes) => {
+    trackSeq(changes);
+    setLogs((current) => {
+      const byId = new Map(current.map((log) => [log.id, log]));
+      changes.forEach((change) => {
+        const existing = byId.get(change.id);
+        if (existing) {
+          // A replayed change from the resume window must not undo a newer one
+          if (existing.seq && change.seq && change.seq <= existing.seq) return;
+          byId.set(change.id, { ...existing, ...change });
+        } else if (change.created_at && (filterRef.current === 'all' || change.status === filterRef.current)) {
+          byId.set(change.id, change);
+        }
+      });
+      return [...byId.values()]
+        .sort((a, b) => new Date(b.created_at) - new Date(a.created_at))
+        .slice(0, PAGE_SIZE);
+    });
+  }, []);
 
-  const fetchLogs = async () => {
+  const fetchLogs = useCallback(async () => {
     try {
       const token = localStorage.getItem('token');
       if (!token) {
@@ -28,26 +63,79 @@ export default function MessageLogs({ user }) {
         return;
       }
       
-      const url = filter === 'all' 
+      const url = filterRef.current === 'all' 
         ? `${API}/messages/logs` 
-        : `${API}/messages/logs?status=${filter}`;
+        : `${API}/messages/logs?status=${filterRef.current}`;
       
       const response = await axios.get(url, {
         headers: { Authorization: `Bearer ${token}` }
       });
+      trackSeq(response.data);
       setLogs(response.data);
     } catch (error) {
-      if (error.response?.status === 401) {
-        localStorage.removeItem('token');
-        localStorage.removeItem('user');
-        window.location.href = '/login';
-      } else {
-        console.error('Error fetching logs:', error);
-      }
+      handleAuthError(error);
     } finally {
       setLoading(false);
     }
-  };
+  }, []);
+
+  // After a reconnect, fetch only the changes missed while offline
+  const resumeLogs = useCallback(async () => {
+    if (!lastSeqRef.current) {
+      fetchLogs();
+      return;
+    }
+    try {
+      const token = localStorage.getItem('token');
+      const since = Math.max(0, lastSeqRef.current - RESUME_WINDOW);
+      const response = await axios.get(`${API}/messages/logs/since?seq=${since}`, {
+        headers: { Authorization: `Bearer ${token}` }
+      });
+      if (response.data.has_more) {
+        fetchLogs();
+      } else {
+        applyChanges(response.data.logs);
+      }
+    } catch (error) {
+      handleAuthError(error);
+    }
+  }, [applyChanges, fetchLogs]);
+
+  useEffect(() => {
+    filterRef.current = filter;
+    setLoading(true);
+    fetchLogs();
+  }, [filter, fetchLogs]);
+
+  useEffect(() => {
+    const token = localStorage.getItem('token');
+    if (!token) return;
+
+    const socket = io('', {
+      path: '/api/socket.io',
+      transports: ['websocket', 'polling'],
+      reconnection: true,
+      reconnectionDelay: 1000,
+      reconnectionDelayMax: 5000
+    });
+
+    socket.on('connect', () => {
+      socket.emit('authenticate', { token });
+    });
+
+    socket.on('authenticated', () => {
+      setLive(true);
+      resumeLogs();
+    });
+
+    socket.on('message_logged', (log) => applyChanges([log]));
+    socket.on('message_status', (change) => applyChanges([change]));
+
+    socket.on('disconnect', () => setLive(false));
+    socket.on('auth_error', () => setLive(false));
+
+    return () => socket.disconnect();
+  }, [applyChanges, resumeLogs]);
 
   const formatDate = (dateStr) => {
     const date = new Date(dateStr);
@@ -66,7 +154,7 @@ export default function MessageLogs({ user }) {
           <div>
             <h3>Message History</h3>
             <p style={{ fontSize: '13px', color: '#64748b', marginTop: '4px' }}>
-              🔄 Auto-refreshing every 3 seconds
+              {live ? '🟢 Live updates' : '⏳ Reconnecting...'}
             </p>
           </div>
           <div>
@@ -120,6 +208,11 @@ export default function MessageLogs({ user }) {
                       <span className={`status-badge ${log.status}`}>
                         {log.status}
                       </span>
+                      {log.delivery_ack != null && DELIVERY_LABELS[log.delivery_ack] && (
+                        <span style={{ marginLeft: '6px', fontSize: '12px', color: '#64748b' }}>
+                          {DELIVERY_LABELS[log.delivery_ack]}
+                        </span>
+                      )}
                     </td>
                     <td>
                       <span style={{ 
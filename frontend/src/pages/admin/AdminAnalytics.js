@@ -5,6 +5,7 @@ import { BarChart3, TrendingUp, TrendingDown, Calendar, RefreshCw } from 'lucide
 import { BarChart, Bar, XAxis, YAxis, CartesianGrid, Tooltip, Legend, ResponsiveContainer } from 'recharts';
 
 const API = `/api`;
+const TZ = encodeURIComponent(Intl.DateTimeFormat().resolvedOptions().timeZone || 'UTC');
 
 export default function AdminAnalytics() {
   const [messageStats, setMessageStats] = useState([]);
@@ -24,8 +25,8 @@ export default function AdminAnalytics() {
       const headers = { Authorization: `Bearer ${token}` };
 
       const [overviewRes, messagesRes, activityRes] = await Promise.all([
-        axios.get(`${API}/admin/analytics/overview`, { headers }),
-        axios.get(`${API}/admin/analytics/messages?days=${days}`, { headers }),
+        axios.get(`${API}/admin/analytics/overview?tz=${TZ}`, { headers }),
+        axios.get(`${API}/admin/analytics/messages?days=${days}&tz=${TZ}`, { headers }),
         axios.get(`${API}/admin/analytics/users-activity?days=${days}`, { headers })
       ]);
 
@@ -160,7 +161,7 @@ export default function AdminAnalytics() {
       {/* Top Users Bar Chart */}
       <div style={{ background: 'white', borderRadius: '12px', padding: '24px', boxShadow: '0 1px 3px rgba(0,0,0,0.1)' }}>
         <h3 style={{ fontSize: '16px', fontWeight: '600', color: '#1e293b', marginBottom: '20px' }}>
-          Top 10 Active Users (Last {days} Days)
+          Top 10 Active Users (Last {days} UTC Days)
         </h3>
         {userActivity.length > 0 ? (
           <ResponsiveContainer width="100%" height={350}>
@@ -5,6 +5,7 @@ import { Users, MessageSquare, CheckCircle, XCircle, TrendingUp, Activity } from
 import { BarChart, Bar, XAxis, YAxis, CartesianGrid, Tooltip, Legend, ResponsiveContainer, PieChart, Pie, Cell } from 'recharts';
 
 const API = `/api`;
+const TZ = encodeURIComponent(Intl.DateTimeFormat().resolvedOptions().timeZone || 'UTC');
 
 const COLORS = ['#667eea', '#10b981', '#f59e0b', '#ef4444', '#ec4899', '#3b82f6'];
 
@@ -26,8 +27,8 @@ export default function AdminDashboard() {
       const headers = { Authorization: `Bearer ${token}` };
 
       const [overviewRes, messagesRes, activityRes] = await Promise.all([
-        axios.get(`${API}/admin/analytics/overview`, { headers }),
-        axios.get(`${API}/admin/analytics/messages?days=7`, { headers }),
+        axios.get(`${API}/admin/analytics/overview?tz=${TZ}`, { headers }),
+        axios.get(`${API}/admin/analytics/messages?days=7&tz=${TZ}`, { headers }),
         axios.get(`${API}/admin/analytics/users-activity?days=7`, { headers })
       ]);
 
@@ -125,6 +125,22 @@ export default function AdminSystem() {
               Connection: {systemStatus?.whatsapp_service?.health?.connected ? 'Active' : 'Inactive'}
             </p>
           )}
+          {systemStatus?.whatsapp_service?.sessions && (
+            <p style={{ color: '#64748b', fontSize: '13px', marginTop: '8px' }} data-testid="whatsapp-session-counts">
+              Sessions: {systemStatus.whatsapp_service.sessions.active} active · {systemStatus.whatsapp_service.sessions.hibernated} hibernated
+            </p>
+          )}
+          {systemStatus?.whatsapp_service?.nodes?.length > 1 && (
+            <div style={{ marginTop: '12px', display: 'flex', flexDirection: 'column', gap: '6px' }}>
+              {systemStatus.whatsapp_service.nodes.map((node) => (
+                <div key={node.url} style={{ display: 'flex', alignItems: 'center', gap: '8px', fontSize: '13px', color: '#64748b' }}>
+                  {getStatusIcon(node.status)}
+                  <span style={{ flex: 1, overflow: 'hidden', textOverflow: 'ellipsis' }}>{node.url}</span>
+                  <span>{node.activeConnections} active / {node.assignedUsers} assigned</span>
+                </div>
+              ))}
+            </div>
+          )}
         </div>
 
         {/* Database */}
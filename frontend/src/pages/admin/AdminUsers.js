@@ -8,6 +8,11 @@ const API = `/api`;
 
 export default function AdminUsers() {
   const [users, setUsers] = useState([]);
+  const [total, setTotal] = useState(0);
+  const [nextCursor, setNextCursor] = useState(null);
+  const [search, setSearch] = useState('');
+  const [statusFilter, setStatusFilter] = useState('');
+  const [sort, setSort] = useState('created_at');
   const [loading, setLoading] = useState(true);
   const [showModal, setShowModal] = useState(false);
   const [modalType, setModalType] = useState('create');
@@ -23,16 +28,25 @@ export default function AdminUsers() {
   const [resettingPasswordForUser, setResettingPasswordForUser] = useState(null);
 
   useEffect(() => {
-    fetchUsers();
-  }, []);
+    const timeout = setTimeout(() => fetchUsers(), 300);
+    return () => clearTimeout(timeout);
+  }, [search, statusFilter, sort]);
 
-  const fetchUsers = async () => {
+  const fetchUsers = async (cursor = null) => {
     try {
       const token = localStorage.getItem('admin_token');
+      const params = { sort };
+      if (search) params.q = search;
+      if (statusFilter) params.status = statusFilter;
+      if (cursor) params.cursor = cursor;
       const response = await axios.get(`${API}/admin/users`, {
-        headers: { Authorization: `Bearer ${token}` }
+        headers: { Authorization: `Bearer ${token}` },
+        params
       });
-      setUsers(response.data.users);
+      setUsers(cursor ? (prev) => [...prev, ...response.data.users] : response.data.users);
+      // Only the first page carries the total
+      if (response.data.total !== null) setTotal(response.data.total);
+      setNextCursor(response.data.next_cursor);
     } catch (error) {
       console.error('Error fetching users:', error);
     } finally {
@@ -163,7 +177,7 @@ export default function AdminUsers() {
       <div style={{ marginBottom: '32px', display: 'flex', justifyContent: 'space-between', alignItems: 'center' }}>
         <div>
           <h1 style={{ fontSize: '28px', fontWeight: '700', color: '#1e293b', marginBottom: '8px' }}>Users Management</h1>
-          <p style={{ color: '#64748b', fontSize: '15px' }}>Manage all user accounts ({users.length} total)</p>
+          <p style={{ color: '#64748b', fontSize: '15px' }}>Manage all user accounts ({total} total)</p>
         </div>
         <button
           onClick={handleCreate}
@@ -175,6 +189,36 @@ export default function AdminUsers() {
         </button>
       </div>
 
+      <div style={{ display: 'flex', gap: '12px', marginBottom: '16px' }}>
+        <input
+          type="text"
+          value={search}
+          onChange={(e) => setSearch(e.target.value)}
+          placeholder="Search by email"
+          data-testid="user-search-input"
+          style={{ flex: 1, padding: '10px 14px', border: '1px solid #e2e8f0', borderRadius: '8px', fontSize: '14px' }}
+        />
+        <select
+          value={statusFilter}
+          onChange={(e) => setStatusFilter(e.target.value)}
+          data-testid="user-status-filter"
+          style={{ padding: '10px 14px', border: '1px solid #e2e8f0', borderRadius: '8px', fontSize: '14px' }}
+        >
+          <option value="">All statuses</option>
+          <option value="active">Active</option>
+          <option value="deactive">Deactive</option>
+        </select>
+        <select
+          value={sort}
+          onChange={(e) => setSort(e.target.value)}
+          data-testid="user-sort-select"
+          style={{ padding: '10px 14px', border: '1px solid #e2e8f0', borderRadius: '8px', fontSize: '14px' }}
+        >
+          <option value="created_at">Newest first</option>
+          <option value="messages">Most messages</option>
+        </select>
+      </div>
+
       <div style={{ background: 'white', borderRadius: '12px', overflow: 'hidden', boxShadow: '0 1px 3px rgba(0,0,0,0.1)' }}>
         <div style={{ overflowX: 'auto' }}>
           <table style={{ width: '100%', borderCollapse: 'collapse', minWidth: '900px' }}>
@@ -304,6 +348,17 @@ export default function AdminUsers() {
             </tbody>
           </table>
         </div>
+        {nextCursor && (
+          <div style={{ padding: '16px', textAlign: 'center', borderTop: '1px solid #e2e8f0' }}>
+            <button
+              onClick={() => fetchUsers(nextCursor)}
+              data-testid="load-more-users-btn"
+              style={{ padding: '8px 20px', background: '#f1f5f9', color: '#475569', border: 'none', borderRadius: '8px', cursor: 'pointer', fontWeight: '600' }}
+            >
+              Load more
+            </button>
+          </div>
+        )}
       </div>
 
       {/* Modal */}
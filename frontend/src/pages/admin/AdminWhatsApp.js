@@ -1,31 +1,59 @@
-import { useState, useEffect } from 'react';
+import { useState, useEffect, useRef } from 'react';
 import axios from 'axios';
 import AdminLayout from '../../components/admin/AdminLayout';
 import { Radio, Wifi, WifiOff, RefreshCw, Power, Users } from 'lucide-react';
 
 const API = `/api`;
+const PAGE_SIZE = 100;
+const STATUS_LABELS = {
+  connected: 'Connected',
+  qr_ready: 'Waiting for QR scan',
+  initializing: 'Initializing',
+  disconnected: 'Disconnected',
+  hibernated: 'Hibernated'
+};
+const STATUS_STYLES = {
+  connected: { background: '#dcfce7', color: '#166534' },
+  qr_ready: { background: '#fef9c3', color: '#854d0e' },
+  initializing: { background: '#e0e7ff', color: '#3730a3' },
+  hibernated: { background: '#f1f5f9', color: '#475569' }
+};
 
 export default function AdminWhatsApp() {
   const [sessions, setSessions] = useState([]);
+  const [total, setTotal] = useState(0);
+  const [statusCounts, setStatusCounts] = useState({});
+  const [statusFilter, setStatusFilter] = useState('connected');
+  const [nextCursor, setNextCursor] = useState(null);
   const [loading, setLoading] = useState(true);
   const [disconnecting, setDisconnecting] = useState(null);
+  // Auto-refresh reloads everything loaded so far, not just the first page
+  const loadedRef = useRef(PAGE_SIZE);
 
   useEffect(() => {
+    loadedRef.current = PAGE_SIZE;
     fetchSessions();
-    const interval = setInterval(fetchSessions, 5000);
+    const interval = setInterval(() => fetchSessions(), 5000);
     return () => clearInterval(interval);
-  }, []);
+  }, [statusFilter]);
 
-  const fetchSessions = async () => {
+  const fetchSessions = async (cursor = null) => {
     try {
       const token = localStorage.getItem('admin_token');
-      
-      // Fetch from whatsapp service directly for admin
+      const params = { limit: cursor ? PAGE_SIZE : loadedRef.current };
+      if (statusFilter) params.status = statusFilter;
+      if (cursor) params.cursor = cursor;
       const response = await axios.get(`${API}/admin/whatsapp/sessions`, {
-        headers: { Authorization: `Bearer ${token}` }
+        headers: { Authorization: `Bearer ${token}` },
+        params
       });
       
-      setSessions(response.data.sessions || []);
+      const page = response.data.sessions || [];
+      setSessions(cursor ? (prev) => [...prev, ...page] : page);
+      if (cursor) loadedRef.current += PAGE_SIZE;
+      setTotal(response.data.total || 0);
+      setStatusCounts(response.data.status_counts || {});
+      setNextCursor(response.data.next_cursor || null);
     } catch (error) {
       console.error('Error fetching sessions:', error);
       if (error.response?.status === 401 || error.response?.status === 403) {
@@ -67,8 +95,6 @@ export default function AdminWhatsApp() {
     return `+${num}`;
   };
 
-  const connectedSessions = sessions.filter(s => s.connected);
-
   if (loading) {
     return (
       <AdminLayout>
@@ -87,7 +113,7 @@ export default function AdminWhatsApp() {
           <p style={{ color: '#64748b', fontSize: '15px' }}>Monitor and manage user WhatsApp connections</p>
         </div>
         <button
-          onClick={fetchSessions}
+          onClick={() => fetchSessions()}
           style={{ padding: '10px 20px', background: '#667eea', border: 'none', borderRadius: '8px', color: 'white', cursor: 'pointer', display: 'flex', alignItems: 'center', gap: '8px' }}
         >
           <RefreshCw size={18} />
@@ -101,7 +127,7 @@ export default function AdminWhatsApp() {
           <div style={{ display: 'flex', justifyContent: 'space-between', alignItems: 'center' }}>
             <div>
               <p style={{ color: '#64748b', fontSize: '14px', marginBottom: '4px' }}>Active Connections</p>
-              <h3 style={{ color: '#1e293b', fontSize: '32px', fontWeight: '700', margin: 0 }}>{connectedSessions.length}</h3>
+              <h3 style={{ color: '#1e293b', fontSize: '32px', fontWeight: '700', margin: 0 }}>{statusCounts.connected || 0}</h3>
             </div>
             <Wifi size={32} style={{ color: '#10b981' }} />
           </div>
@@ -110,18 +136,33 @@ export default function AdminWhatsApp() {
 
       {/* Sessions List */}
       <div style={{ background: 'white', borderRadius: '12px', overflow: 'hidden', boxShadow: '0 1px 3px rgba(0,0,0,0.1)' }}>
-        <div style={{ padding: '20px', borderBottom: '1px solid #e2e8f0' }}>
-          <h3 style={{ color: '#1e293b', fontSize: '16px', fontWeight: '600', margin: 0 }}>Connected Users</h3>
+        <div style={{ padding: '20px', borderBottom: '1px solid #e2e8f0', display: 'flex', justifyContent: 'space-between', alignItems: 'center' }}>
+          <h3 style={{ color: '#1e293b', fontSize: '16px', fontWeight: '600', margin: 0 }}>
+            Sessions ({sessions.length} of {total})
+          </h3>
+          <select
+            value={statusFilter}
+            onChange={(e) => setStatusFilter(e.target.value)}
+            data-testid="session-status-filter"
+            style={{ padding: '8px 12px', border: '1px solid #e2e8f0', borderRadius: '8px', fontSize: '14px' }}
+          >
+            <option value="">All statuses</option>
+            {[...new Set([...Object.keys(STATUS_LABELS), ...Object.keys(statusCounts)])].map((status) => (
+              <option key={status} value={status}>
+                {STATUS_LABELS[status] || status} ({statusCounts[status] || 0})
+              </option>
+            ))}
+          </select>
         </div>
         
-        {connectedSessions.length > 0 ? (
+        {sessions.length > 0 ? (
           <div>
-            {connectedSessions.map((session, index) => (
+            {sessions.map((session, index) => (
               <div
                 key={session.userId || index}
                 style={{
                   padding: '20px',
-                  borderBottom: index < connectedSessions.length - 1 ? '1px solid #e2e8f0' : 'none',
+                  borderBottom: index < sessions.length - 1 ? '1px solid #e2e8f0' : 'none',
                   display: 'flex',
                   alignItems: 'center',
                   justifyContent: 'space-between'
@@ -131,13 +172,15 @@ export default function AdminWhatsApp() {
                   <div style={{
                     width: '48px',
                     height: '48px',
-                    background: '#dcfce7',
+                    background: session.connected ? '#dcfce7' : '#f1f5f9',
                     borderRadius: '12px',
                     display: 'flex',
                     alignItems: 'center',
                     justifyContent: 'center'
                   }}>
-                    <Wifi size={24} style={{ color: '#10b981' }} />
+                    {session.connected
+                      ? <Wifi size={24} style={{ color: '#10b981' }} />
+                      : <WifiOff size={24} style={{ color: '#94a3b8' }} />}
                   </div>
                   <div>
                     <p style={{ color: '#1e293b', fontWeight: '600', margin: '0 0 4px 0' }}>
@@ -152,13 +195,12 @@ export default function AdminWhatsApp() {
                 <div style={{ display: 'flex', alignItems: 'center', gap: '12px' }}>
                   <span style={{
                     padding: '4px 12px',
-                    background: '#dcfce7',
-                    color: '#166534',
+                    ...(STATUS_STYLES[session.status] || { background: '#fee2e2', color: '#991b1b' }),
                     borderRadius: '12px',
                     fontSize: '12px',
                     fontWeight: '600'
                   }}>
-                    Connected
+                    {STATUS_LABELS[session.status] || session.status}
                   </span>
                   <button
                     onClick={() => handleDisconnect(session.userId || session.odlUserId)}
@@ -188,10 +230,21 @@ export default function AdminWhatsApp() {
         ) : (
           <div style={{ padding: '60px', textAlign: 'center', color: '#64748b' }}>
             <WifiOff size={48} style={{ marginBottom: '12px', opacity: 0.3 }} />
-            <p>No active WhatsApp connections</p>
+            <p>{statusFilter ? `No ${(STATUS_LABELS[statusFilter] || statusFilter).toLowerCase()} sessions` : 'No WhatsApp sessions'}</p>
             <p style={{ fontSize: '13px', marginTop: '8px' }}>Users can connect their WhatsApp from their dashboard</p>
           </div>
         )}
+        {nextCursor && (
+          <div style={{ padding: '16px', textAlign: 'center', borderTop: '1px solid #e2e8f0' }}>
+            <button
+              onClick={() => fetchSessions(nextCursor)}
+              data-testid="load-more-sessions-btn"
+              style={{ padding: '8px 20px', background: '#f1f5f9', color: '#475569', border: 'none', borderRadius: '8px', cursor: 'pointer', fontWeight: '600' }}
+            >
+              Load more
+            </button>
+          </div>
+        )}
       </div>
 
       {/* Info */}
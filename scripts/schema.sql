@@ -3,6 +3,10 @@
 -- ===========================================
 -- Run this SQL on your PostgreSQL database
 -- psql -U botwave_user -d botwave -f schema.sql
+--
+-- This is the original schema. Later tables, columns and indexes are
+-- versioned migrations in backend/migrations.py, applied when the backend
+-- starts or with: python manage.py migrate
 
 -- Users table
 CREATE TABLE IF NOT EXISTS users (
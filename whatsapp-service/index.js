@@ -5,8 +5,10 @@ const { Server } = require('socket.io');
 const { Client, LocalAuth } = require('whatsapp-web.js');
 const fs = require('fs');
 const path = require('path');
-const { execSync } = require('child_process');
+const { execSync, spawn } = require('child_process');
 const axios = require('axios');
+const WebSocket = require('ws');
+const crypto = require('crypto');
 
 const app = express();
 const server = http.createServer(app);
@@ -17,34 +19,105 @@ const io = new Server(server, {
   }
 });
 
+// Backend URL for Socket.IO events
+const BACKEND_URL = process.env.BACKEND_URL || 'http://127.0.0.1:8001';
+const INTERNAL_EVENT_SECRET = process.env.INTERNAL_EVENT_SECRET || '';
+const EVENT_FLUSH_MS = 20;
+const internalHeaders = { 'X-Internal-Secret': INTERNAL_EVENT_SECRET };
+
+// Without a secret the service is only safe on loopback; see the HOST check at startup
+function internalSecretValid(secret) {
+  if (!INTERNAL_EVENT_SECRET) return true;
+  const given = Buffer.from(secret || '');
+  const expected = Buffer.from(INTERNAL_EVENT_SECRET);
+  return given.length === expected.length && crypto.timingSafeEqual(given, expected);
+}
+
+// Every route, and the Socket.IO channel, is only for the backend
+function requireInternalSecret(req, res, next) {
+  if (!internalSecretValid(req.get('X-Internal-Secret'))) {
+    return res.status(401).json({ error: 'Invalid internal secret' });
+  }
+  next();
+}
+
+io.use((socket, next) => {
+  if (!internalSecretValid(socket.handshake.headers['x-internal-secret'])) {
+    return next(new Error('Invalid internal secret'));
+  }
+  next();
+});
+
 app.use(cors());
+app.use(requireInternalSecret);
 app.use(express.json());
 
-// Backend URL for Socket.IO events
-const BACKEND_URL = 'http://127.0.0.1:8001';
+// Events queued for the next flush; sent as one batch over the persistent
+// backend channel, or as a single HTTP request while it is down
+let pendingEvents = [];
+let flushTimer = null;
+let backendSocket = null;
 
 // Helper function to emit events to backend for Socket.IO broadcast
-async function emitToBackend(userId, event, data) {
+function emitToBackend(userId, event, data) {
+  if (event === 'qr_code') {
+    // Only the newest QR code is worth scanning
+    pendingEvents = pendingEvents.filter(e => !(e.userId === userId && e.event === 'qr_code'));
+  }
+  pendingEvents.push({ event, userId, data });
+  if (!flushTimer) {
+    flushTimer = setTimeout(flushEvents, EVENT_FLUSH_MS);
+  }
+}
+
+async function flushEvents() {
+  flushTimer = null;
+  const events = pendingEvents;
+  pendingEvents = [];
+  if (events.length === 0) return;
+  
+  if (backendSocket && backendSocket.readyState === WebSocket.OPEN) {
+    backendSocket.send(JSON.stringify(events));
+    return;
+  }
   try {
-    const response = await axios.post(`${BACKEND_URL}/api/internal/ws-event`, {
-      event,
-      userId,
-      data
-    }, { timeout: 5000 });
-    console.log(`[User ${userId}] Event '${event}' sent to backend via Socket.IO`);
-    return response.data;
+    await axios.post(`${BACKEND_URL}/api/internal/ws-events`, events, {
+      timeout: 5000,
+      headers: internalHeaders
+    });
+    console.log(`Sent ${events.length} event(s) to backend over HTTP`);
   } catch (error) {
-    console.error(`[User ${userId}] Failed to emit '${event}' to backend:`, error.message);
-    return null;
+    console.error(`Failed to send ${events.length} event(s) to backend:`, error.message);
   }
 }
 
+// Keep a websocket open to the backend for low-latency event delivery
+function connectBackendSocket() {
+  const url = `${BACKEND_URL.replace(/^http/, 'ws')}/api/internal/ws-events/stream`;
+  const socket = new WebSocket(url, { headers: internalHeaders });
+  
+  socket.on('open', () => {
+    backendSocket = socket;
+    console.log('Backend event channel connected');
+  });
+  socket.on('close', () => {
+    if (backendSocket === socket) {
+      backendSocket = null;
+      console.log('Backend event channel closed, falling back to HTTP');
+    }
+    setTimeout(connectBackendSocket, 2000);
+  });
+  socket.on('error', (error) => {
+    console.error('Backend event channel error:', error.message);
+  });
+}
+
 // Store clients per user
 const userClients = new Map(); // userId -> { client, status, qrCode, phoneNumber, browserPid }
 const initializingUsers = new Set(); // Track users currently initializing
 
-// Auth path
-const AUTH_PATH = '/app/whatsapp-service/.wwebjs_auth';
+// Auth path; give each node on a shared host its own
+const AUTH_PATH = process.env.AUTH_PATH || '/app/whatsapp-service/.wwebjs_auth';
 
 // Ensure auth directory exists
 if (!fs.existsSync(AUTH_PATH)) {
@@ -109,8 +182,8 @@ function deleteUserSession(userId) {
   }
 }
 
-// Full cleanup for a user
-async function cleanupUser(userId) {
+// Full cleanup for a user; keepAuth leaves the LocalAuth folder in place
+async function cleanupUser(userId, { keepAuth = false } = {}) {
   console.log(`[User ${userId}] Running full cleanup...`);
   
   const session = userClients.get(userId);
@@ -128,13 +201,15 @@ async function cleanupUser(userId) {
   
   initializingUsers.delete(userId);
   killUserChromium(userId);
-  deleteUserSession(userId);
+  if (!keepAuth) {
+    deleteUserSession(userId);
+  }
   
   console.log(`[User ${userId}] Cleanup complete`);
 }
 
-// Initialize WhatsApp for a specific user
-async function initializeUserWhatsApp(userId) {
+// Initialize WhatsApp for a specific user; resume restores the saved LocalAuth session
+async function initializeUserWhatsApp(userId, { resume = false } = {}) {
   // Check if already initializing
   if (initializingUsers.has(userId)) {
     console.log(`[User ${userId}] Already initializing, please wait...`);
@@ -158,7 +233,7 @@ async function initializeUserWhatsApp(userId) {
   initializingUsers.add(userId);
   
   // Full cleanup first
-  await cleanupUser(userId);
+  await cleanupUser(userId, { keepAuth: resume });
   
   // Wait for cleanup
   await delay(300);
@@ -171,7 +246,9 @@ async function initializeUserWhatsApp(userId) {
     status: 'initializing',
     qrCode: null,
     phoneNumber: null,
-    isConnected: false
+    isConnected: false,
+    inflight: 0,
+    draining: false
   };
   userClients.set(userId, session);
   
@@ -282,6 +359,18 @@ client.on('authenticated', () => {
     
     // Cleanup on auth failure
     cleanupUser(userId);
+    
+    emitToBackend(userId, 'whatsapp_disconnected', { 
+      status: 'disconnected', 
+      reason: 'auth_failure' 
+    });
+  });
+  
+  // Delivery ack event for messages this session sent
+  client.on('message_ack', (msg, ack) => {
+    if (msg.fromMe) {
+      emitToBackend(userId, 'message_ack', { messageId: msg.id.id, ack });
+    }
   });
   
   // Disconnected event
@@ -370,14 +459,15 @@ app.get('/qr', (req, res) => {
 
 // Initialize WhatsApp for a user
 app.post('/initialize', async (req, res) => {
-  const { userId } = req.body;
+  const { userId, resume } = req.body;
   
   if (!userId) {
     return res.status(400).json({ error: 'userId is required' });
   }
   
   try {
-    const result = await initializeUserWhatsApp(userId);
+    // resume restarts a hibernated session from its saved login
+    const result = await initializeUserWhatsApp(userId, { resume: !!resume });
     res.json({ success: true, ...result });
   } catch (error) {
     console.error(`[User ${userId}] Initialize error:`, error);
@@ -403,6 +493,11 @@ app.post('/send', async (req, res) => {
     return res.status(400).json({ error: 'WhatsApp not connected. Please scan QR code first.' });
   }
   
+  if (session.draining) {
+    return res.status(503).json({ success: false, error: 'Session is being moved, please retry' });
+  }
+  
+  session.inflight++;
   try {
     let formattedNumber = number.replace(/[^\d]/g, '');
     
@@ -451,12 +546,15 @@ app.post('/send', async (req, res) => {
     }
     
     res.status(500).json({ success: false, error: error.message });
+  } finally {
+    session.inflight--;
   }
 });
 
 // Disconnect WhatsApp for a user
+// keepAuth stops the browser without logging out, so the session can be resumed later
 app.post('/disconnect', async (req, res) => {
-  const { userId } = req.body;
+  const { userId, keepAuth } = req.body;
   
   if (!userId) {
     return res.status(400).json({ error: 'userId is required' });
@@ -471,6 +569,17 @@ app.post('/disconnect', async (req, res) => {
     return res.json({ success: true, message: 'No session to disconnect' });
   }
   
+  if (keepAuth) {
+    // Hibernation: let in-flight sends finish, then stop the browser but keep the login
+    session.draining = true;
+    const deadline = Date.now() + 30000;
+    while (session.inflight > 0 && Date.now() < deadline) {
+      await delay(100);
+    }
+    await cleanupUser(userId, { keepAuth: true });
+    return res.json({ success: true, message: 'Session stopped, auth data kept' });
+  }
+  
   try {
     // Try to logout first (this invalidates the session on WhatsApp servers)
     if (session.client) {
@@ -497,6 +606,117 @@ app.post('/disconnect', async (req, res) => {
   }
 });
 
+// Run tar with args, feeding it input (if any) and collecting stdout
+function runTar(args, input) {
+  return new Promise((resolve, reject) => {
+    const tar = spawn('tar', args);
+    const chunks = [];
+    let stderr = '';
+    tar.stdout.on('data', (chunk) => chunks.push(chunk));
+    tar.stderr.on('data', (chunk) => { stderr += chunk; });
+    tar.on('error', reject);
+    tar.on('close', (code) => {
+      if (code === 0) {
+        resolve(Buffer.concat(chunks));
+      } else {
+        reject(new Error(`tar exited with ${code}: ${stderr.trim()}`));
+      }
+    });
+    tar.stdin.end(input);
+  });
+}
+
+// Session migration between nodes (used by the backend's rebalance):
+// Stop a session once its in-flight sends finish and return its LocalAuth
+// folder as a tar.gz; the local copy is removed after a successful export
+app.post('/sessions/export', async (req, res) => {
+  const { userId } = req.body;
+  
+  if (!userId) {
+    return res.status(400).json({ error: 'userId is required' });
+  }
+  
+  const session = userClients.get(userId);
+  if (session) {
+    session.draining = true;
+    const deadline = Date.now() + 30000;
+    while (session.inflight > 0 && Date.now() < deadline) {
+      await delay(100);
+    }
+    await cleanupUser(userId, { keepAuth: true });
+  }
+  
+  const folder = `session-${userId}`;
+  if (!fs.existsSync(path.join(AUTH_PATH, folder))) {
+    return res.status(404).json({ error: 'No saved session' });
+  }
+  
+  try {
+    // Browser caches are rebuilt on the next start and only slow the transfer
+    const archive = await runTar([
+      '-czf', '-', '-C', AUTH_PATH,
+      '--exclude=Cache', '--exclude=Code Cache', '--exclude=GPUCache', '--exclude=CacheStorage',
+      folder
+    ]);
+    deleteUserSession(userId);
+    console.log(`[User ${userId}] Session exported (${archive.length} bytes)`);
+    res.type('application/gzip').send(archive);
+  } catch (error) {
+    console.error(`[User ${userId}] Export error:`, error.message);
+    res.status(500).json({ error: error.message });
+  }
+});
+
+// Unpack an exported session and resume it; start=false only unpacks it,
+// for sessions that are hibernated and resume on their next send
+app.post('/sessions/import', express.raw({ type: 'application/gzip', limit: '1gb' }), async (req, res) => {
+  const { userId, start } = req.query;
+  
+  if (!userId || !Buffer.isBuffer(req.body) || req.body.length === 0) {
+    return res.status(400).json({ error: 'userId and a session archive are required' });
+  }
+  
+  if (userClients.get(userId)?.client) {
+    return res.status(409).json({ error: 'User already has a session on this node' });
+  }
+  
+  try {
+    deleteUserSession(userId);
+    await runTar(['-xzf', '-', '-C', AUTH_PATH], req.body);
+    if (start === 'false') {
+      console.log(`[User ${userId}] Session imported, left hibernated`);
+      return res.json({ success: true, status: 'hibernated' });
+    }
+    console.log(`[User ${userId}] Session imported, resuming`);
+    
+    const result = await initializeUserWhatsApp(userId, { resume: true });
+    // Wait for the restored session to come up so sends can follow straight away
+    const session = userClients.get(userId);
+    const deadline = Date.now() + 60000;
+    while (session && session.status === 'initializing' && Date.now() < deadline) {
+      await delay(250);
+    }
+    res.json({ success: true, status: session?.status || result.status });
+  } catch (error) {
+    console.error(`[User ${userId}] Import error:`, error.message);
+    res.status(500).json({ success: false, error: error.message });
+  }
+});
+
+// Host memory from /proc/meminfo in bytes, or null where it is unavailable
+function readMemInfo() {
+  try {
+    const info = fs.readFileSync('/proc/meminfo', 'utf8');
+    const field = (name) => {
+      const match = info.match(new RegExp(`^${name}:\\s+(\\d+) kB`, 'm'));
+      return match ? Number(match[1]) * 1024 : null;
+    };
+    return { availableBytes: field('MemAvailable'), totalBytes: field('MemTotal') };
+  } catch (e) {
+    return null;
+  }
+}
+
 // Health check
 app.get('/health', (req, res) => {
   const activeUsers = [];
@@ -509,7 +729,9 @@ app.get('/health', (req, res) => {
   res.json({
     status: 'ok',
     activeConnections: activeUsers.length,
+    initializing: initializingUsers.size,
     users: activeUsers,
+    memory: readMemInfo(),
     uptime: process.uptime()
   });
 });
@@ -532,6 +754,13 @@ app.get('/admin/sessions', (req, res) => {
 
 // Start server
 const PORT = process.env.PORT || 8002;
-server.listen(PORT, '127.0.0.1', () => {
+const HOST = process.env.HOST || '127.0.0.1';
+const LOOPBACK_HOSTS = ['127.0.0.1', 'localhost', '::1'];
+if (!INTERNAL_EVENT_SECRET && !LOOPBACK_HOSTS.includes(HOST)) {
+  console.error(`[WhatsApp Service] Refusing to listen on ${HOST} without INTERNAL_EVENT_SECRET`);
+  process.exit(1);
+}
+server.listen(PORT, HOST, () => {
   console.log(`[WhatsApp Service] Ready to accept per-user connections`);
+  connectBackendSocket();
 });